@@ -10,7 +10,7 @@ warnings.filterwarnings('ignore')
 os.environ.setdefault('PYTHONIOENCODING', 'utf-8')
 
 import dash
-from dash import Dash, html, dcc, Input, State, Output, dash_table, no_update, callback_context, ALL, MATCH
+from dash import Dash, html, dcc, Input, State, Output, dash_table, no_update, callback_context, ALL, MATCH, Patch
 from dash.exceptions import PreventUpdate
 import dash_bootstrap_components as dbc
 import pandas as pd
@@ -22,6 +22,7 @@ from geopy.extra.rate_limiter import RateLimiter
 import uuid
 import random
 import json
+import hashlib
 import base64
 import io
 from datetime import datetime, timedelta
@@ -29,10 +30,16 @@ import functools
 import plotly.graph_objects as go
 
 # 從./utils導入所有自定義函數
-from utils.auth import verify_user, create_user, get_session, create_session, delete_session, clean_expired_sessions, get_user_full_details, update_profile_photo
+from utils.auth import verify_user, create_user, get_session, create_session, delete_session, setup_auth_db, start_session_sweeper, get_user_full_details, update_profile_photo
 from pages.login_page import create_login_layout, create_register_layout
 from pages.analytics_page import create_analytics_layout, load_and_prepare_data, register_analytics_callbacks
 from utils.database import get_revenue_trend, get_occupancy_status
+from utils.suggest import suggest as suggest_names
+from utils.spatial import places_in_bbox as spatial_places_in_bbox, within_radius as spatial_within_radius
+from utils.geo import ROAD_DETOUR_FACTOR, haversine_km
+from utils.server_store import ServerStore
+from utils.catalog import catalog_version
+from utils.favorites import FAVORITES, cached_favorite_ids, is_cached_favorite
 
 ########################
 #### 資料載入與前處理 ####
@@ -42,20 +49,25 @@ from utils.database import (
     get_all_restaurants,
     get_random_top_restaurants as db_get_random_top_restaurants,
     search_restaurants as db_search_restaurants,
+    count_restaurants,
     get_unique_stations,
     get_unique_cuisines,
     get_restaurants_by_category,
     get_restaurant_by_id,
     get_nearby_restaurants,
+    get_review_stats,
+    get_reviews,
     get_all_hotels,
     get_hotel_by_id,
     get_random_top_hotels,
     search_hotels,
+    count_hotels,
     get_unique_hotel_types,
     get_nearby_hotels,
     get_hotels_by_type,
     get_random_top_attractions,
     search_attractions,
+    count_attractions,
     get_unique_attraction_types,
     get_attraction_by_id,
     get_combined_analytics_data,
@@ -63,13 +75,49 @@ from utils.database import (
     get_db_connection,
     get_attraction_by_id,
     get_all_attractions,
-    get_favorite_restaurants_full,
-    get_favorite_hotels_full,
-    get_favorite_attractions_full
+    get_favorite_card,
+    get_favorite_cards,
+    start_favorites_reconciler
 )
 
 
 restaurants_df = get_all_restaurants()  # 從數據庫加載（用於選項列表）
+
+# ===== 伺服器端資料存放 =====
+# 大型資料留在伺服器，dcc.Store 只保存 token（見 utils/server_store.py）
+# SERVER_STORE 只存在於目前的行程：多個 worker 時 token 可能落到沒有該資料的 worker，
+# 淘汰或過期也隨時可能發生，因此只存放可重建的資料——取用端必須能由 store 中保存的
+# 小型參數（例如列表的篩選參數）或共用資料的建立函數重建，不可只依賴 token
+SERVER_STORE = ServerStore(maxsize=1024, ttl=1800, session_quota=16)
+SERVER_STORE_COOKIE = 'server_store_sid'
+
+def server_store_session():
+    """目前瀏覽器的 session 識別碼（存於 cookie，第一次使用時建立；不在 callback 中時為 None）"""
+    try:
+        sid = callback_context.cookies.get(SERVER_STORE_COOKIE)
+        if not sid:
+            sid = uuid.uuid4().hex
+            callback_context.response.set_cookie(SERVER_STORE_COOKIE, sid, httponly=True, samesite='Lax')
+        return sid
+    except Exception:
+        return None
+
+def store_put(value):
+    """將資料存到伺服器端，返回放入 dcc.Store 的 token"""
+    return SERVER_STORE.put(value, session=server_store_session())
+
+def store_get(token, rebuild=None):
+    """
+    由 dcc.Store 中的 token 取回資料
+
+    Args:
+        token: store_put / SERVER_STORE.share 返回的 token
+        rebuild: 資料已淘汰或過期時用來重建的函數（None 則返回 None）
+    """
+    value = SERVER_STORE.get(token)
+    if value is None and token and rebuild is not None:
+        value = rebuild()
+    return value
 hotels_df = get_all_hotels()
 analytics_df = load_and_prepare_data()
 
@@ -474,6 +522,7 @@ def create_compound_search_bar():
                     type='text',
                     value='',
                     placeholder='Search restaurants by name (English or Japanese)...',
+                    list='search-destination-suggestions',
                     className='search-input',
                     debounce=False,  # 即時搜尋
                     style={
@@ -485,7 +534,9 @@ def create_compound_search_bar():
                         'outline': 'none',
                         'paddingLeft': '0.75rem'
                     }
-                )
+                ),
+                # 名稱自動完成（選項由 update_*_suggestions 依輸入更新）
+                html.Datalist(id='search-destination-suggestions')
             ], style={'flex': '1', 'display': 'flex', 'alignItems': 'center', 'gap': '0.75rem'})
         ], className='keyword-search-bar', style={
             'display': 'flex',
@@ -1228,11 +1279,17 @@ def create_ratings_breakdown_section(data):
         'boxShadow': '0 1px 3px rgba(0, 0, 0, 0.08)'
     })
 
+def get_review_histogram(data):
+    """1~5 星的評論數與總評論數（載入時附帶的 review_stats，資料庫預先彙總）"""
+    stats = data.get('review_stats') if isinstance(data, dict) else None
+    if not stats:
+        return [0, 0, 0, 0, 0], 0
+    return list(stats['histogram']), stats['count']
+
 def create_statistics_section(data):
     """創建統計資訊區域"""
-    # Count actual reviews from the reviews list instead of using ReviewNum field
-    reviews = data.get('reviews', []) if isinstance(data, dict) else []
-    review_num = len(reviews)
+    # Count actual reviews (review_stats) instead of using ReviewNum field
+    _, review_num = get_review_histogram(data)
     rating_category = data.get('Rating_Category', 'N/A')
 
     return html.Div([
@@ -1262,22 +1319,9 @@ def create_statistics_section(data):
 
 def create_reviews_section(data):
     """創建評論區：包含星等分佈長條圖與點擊後顯示評論（含 Show all 按鈕）"""
-    reviews = data.get('reviews', []) if isinstance(data, dict) else []
-    # Build counts for 1..5
-    counts = {i: 0 for i in range(1, 6)}
-    for r in reviews:
-        try:
-            rating = r.get('rating', None)
-            if rating is None:
-                continue
-            rating_int = int(round(float(rating)))
-            if 1 <= rating_int <= 5:
-                counts[rating_int] += 1
-        except Exception:
-            continue
-
-    ratings = list(counts.keys())
-    values = [counts[r] for r in ratings]
+    # Counts for 1..5 stars
+    values, _ = get_review_histogram(data)
+    ratings = [1, 2, 3, 4, 5]
 
     # Create Plotly bar chart for visibility with enhanced interactivity
     fig = px.bar(
@@ -1341,6 +1385,7 @@ def create_reviews_section(data):
     return html.Div([
         html.H3('Reviews', style={'color': '#003580', 'marginBottom': '1rem', 'fontSize': '1.5rem', 'fontWeight': 'bold'}),
         dcc.Store(id='selected-rating-store', data=None),
+        dcc.Store(id='reviews-cursor-store', data=None),
         html.Div([
             dcc.Graph(
                 id='ratings-bar-chart',
@@ -2466,6 +2511,7 @@ def create_hotel_search_bar():
                     type='text',
                     value='',
                     placeholder='Search hotels by name (English or Japanese)...',
+                    list='search-hotel-suggestions',
                     className='search-input',
                     debounce=False,  # 即時搜尋
                     style={
@@ -2477,7 +2523,9 @@ def create_hotel_search_bar():
                         'outline': 'none',
                         'paddingLeft': '0.75rem'
                     }
-                )
+                ),
+                # 名稱自動完成（選項由 update_*_suggestions 依輸入更新）
+                html.Datalist(id='search-hotel-suggestions')
             ], style={'flex': '1', 'display': 'flex', 'alignItems': 'center', 'gap': '0.75rem'})
         ], className='keyword-search-bar', style={
             'display': 'flex',
@@ -2867,6 +2915,7 @@ def create_attraction_search_bar():
                     type='text',
                     value='',
                     placeholder='Search attractions by name (shrines, temples, parks, etc.)...',
+                    list='search-attraction-suggestions',
                     className='search-input',
                     debounce=False,
                     style={
@@ -2878,7 +2927,9 @@ def create_attraction_search_bar():
                         'outline': 'none',
                         'paddingLeft': '0.75rem'
                     }
-                )
+                ),
+                # 名稱自動完成（選項由 update_*_suggestions 依輸入更新）
+                html.Datalist(id='search-attraction-suggestions')
             ], style={'flex': '1', 'display': 'flex', 'alignItems': 'center', 'gap': '0.75rem'})
         ], className='keyword-search-bar', style={
             'display': 'flex',
@@ -3050,9 +3101,7 @@ def create_attraction_detail_page(attr_id, favorites_cache=None):
     data = get_attraction_by_id(attr_id)
 
     # 2. Check if this attraction is favorited
-    is_favorited = False
-    if favorites_cache and 'attractions' in favorites_cache and data:
-        is_favorited = data.get('ID') in favorites_cache['attractions']
+    is_favorited = bool(data) and is_cached_favorite(favorites_cache, 'attraction', data.get('ID'))
 
     # 3. 生成內容
     if data:
@@ -3810,7 +3859,10 @@ def create_advanced_analytics_layout():
         ], style={'marginBottom': '50px', 'marginTop': '50px'}),
 
         # Stores
-        dcc.Store(id='analytics-combined-data', data=df_combined.to_dict('records')),
+        dcc.Store(id='analytics-combined-data',
+                  data=SERVER_STORE.share('analytics-combined', lambda: df_combined, version=catalog_version())),
+        # 看板目前的資料範圍與輸出參數（隨頁面重建而重置）
+        dcc.Store(id='analytics-view-store', storage_type='memory'),
 
     ], style={'padding': '2rem', 'maxWidth': '1400px', 'margin': '0 auto', 'minHeight': '100vh'})
 
@@ -3826,6 +3878,15 @@ app = Dash(__name__, external_stylesheets=[
            suppress_callback_exceptions=True)
 server = app.server
 
+# 初始化使用者資料庫與預設帳號
+setup_auth_db()
+
+# 過期 sessions 由背景執行緒定期清理，不在每次換頁時寫入 users.db
+start_session_sweeper()
+
+# 收藏卡片快照：目錄版本變更後由背景執行緒更新
+start_favorites_reconciler()
+
 # Suppress React defaultProps warnings in console
 app.index_string = '''
 <!DOCTYPE html>
@@ -3920,7 +3981,7 @@ app.layout = html.Div([
     dcc.Store(id='previous-pathname', storage_type='memory'),
     dcc.Store(id='traffic-map-store', storage_type='memory', data={'points': []}),
     # ADD THIS LINE - Load all place names for traffic calculator
-    dcc.Store(id='all-places-store', data=load_all_place_names(), storage_type='memory'),
+    dcc.Store(id='all-places-store', data=SERVER_STORE.share('all-places', load_all_place_names), storage_type='memory'),
     # Favorites system stores
     dcc.Store(id='user-favorites-cache', storage_type='session'),
     dcc.Store(id='notification-queue', storage_type='memory', data=[]),
@@ -4701,8 +4762,6 @@ def create_favorites_list_page():
 )
 def display_page(pathname, session_data, current_mode, view_mode, restaurant_id_data, favorites_cache, edit_trip_id):
     """根據 session 狀態、view_mode 和 pathname 顯示對應頁面"""
-    clean_expired_sessions()
-
     ctx = callback_context
     triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
@@ -5311,9 +5370,7 @@ def populate_destinations_cards(pathname, favorites_cache):
     top_restaurants = get_random_top_restaurants(4)
 
     # Get favorited restaurant IDs
-    favorited_ids = []
-    if favorites_cache and 'restaurants' in favorites_cache:
-        favorited_ids = favorites_cache['restaurants']
+    favorited_ids = cached_favorite_ids(favorites_cache, 'restaurant')
 
     cards = []
     for _, restaurant in top_restaurants.iterrows():
@@ -5333,9 +5390,7 @@ def populate_hotels_cards(pathname, favorites_cache):
     top_hotels = get_random_top_hotels(4, min_rating=4.0)
 
     # Get favorited hotel IDs
-    favorited_ids = []
-    if favorites_cache and 'hotels' in favorites_cache:
-        favorited_ids = favorites_cache['hotels']
+    favorited_ids = cached_favorite_ids(favorites_cache, 'hotel')
 
     if len(top_hotels) > 0:
         cards = []
@@ -5370,9 +5425,10 @@ def populate_favorites_preview(pathname, favorites_cache, session_data):
         ])]
 
     # Fetch favorites (limited preview)
-    fav_restaurants_df = get_favorite_restaurants_full(user_id).head(2)
-    fav_hotels_df = get_favorite_hotels_full(user_id).head(2)
-    fav_attractions_df = get_favorite_attractions_full(user_id).head(2)
+    favorite_cards = get_favorite_cards(user_id)
+    fav_restaurants_df = favorite_cards['restaurant'].head(2)
+    fav_hotels_df = favorite_cards['hotel'].head(2)
+    fav_attractions_df = favorite_cards['attraction'].head(2)
 
     # Check if user has any favorites
     total_favorites = len(fav_restaurants_df) + len(fav_hotels_df) + len(fav_attractions_df)
@@ -5877,7 +5933,8 @@ app.clientside_callback(
 
 # Enhanced search function with advanced filters (使用數據庫查詢)
 def search_restaurants(keyword=None, cuisine=None, rating=None, price_range=None,
-                      min_reviews=None, stations=None, sort_by='rating_desc'):
+                      min_reviews=None, stations=None, sort_by='rating_desc',
+                      page=None, page_size=None):
     """
     進階餐廳搜尋功能（使用 SQL 數據庫查詢，替代 pandas 篩選）
     - keyword: 僅搜尋餐廳名稱（英文或日文）
@@ -5887,6 +5944,7 @@ def search_restaurants(keyword=None, cuisine=None, rating=None, price_range=None
     - min_reviews: 最少評論數
     - stations: 車站列表（多選）
     - sort_by: 排序方式
+    - page / page_size: 分頁（None 代表返回全部）
     """
     # 使用數據庫查詢函數（從 utils/database.py）
     return db_search_restaurants(
@@ -5896,45 +5954,119 @@ def search_restaurants(keyword=None, cuisine=None, rating=None, price_range=None
         price_range=price_range,
         min_reviews=min_reviews,
         stations=stations,
-        sort_by=sort_by
+        sort_by=sort_by,
+        page=page,
+        page_size=page_size
     )
 
-# Get search suggestions based on keyword (優化使用數據庫查詢)
-def get_search_suggestions(keyword, max_results=8):
+# ====== 列表頁分頁（每次只查詢並存儲目前頁面） ======
+LIST_PAGE_SIZE = 15
+
+# 列表類型 -> (搜尋函數, 計數函數)
+LIST_SEARCH_FUNCTIONS = {
+    'restaurant': (search_restaurants, count_restaurants),
+    'hotel': (search_hotels, count_hotels),
+    'attraction': (search_attractions, count_attractions),
+}
+
+def fetch_list_page(kind, params, page=1, total=None):
     """
-    根據關鍵字生成搜尋建議（使用數據庫查詢以提高性能）
-    僅返回餐廳名稱的匹配結果
+    查詢列表頁的某一頁
+
+    Args:
+        kind: 'restaurant' / 'hotel' / 'attraction'
+        params: 搜尋函數的篩選參數
+        page: 頁碼（從 1 開始）
+        total: 已知的總筆數（None 時以 COUNT(*) 查詢）
+
+    Returns:
+        dict: {'params', 'total', 'page', 'items'}（放入 *-search-results-store 前先經 list_store_data）
+    """
+    search_fn, count_fn = LIST_SEARCH_FUNCTIONS[kind]
+    if total is None:
+        total = count_fn(**params)
+    df = search_fn(**params, sort_by='rating_desc', page=page, page_size=LIST_PAGE_SIZE)
+    items = df.to_dict('records') if not df.empty else []
+    return {'params': params, 'total': total, 'page': page, 'items': items}
+
+def list_store_data(results):
+    """
+    列表結果放入 *-search-results-store 的內容
+
+    篩選參數、總筆數與頁碼很小，直接保存在 store 中；只有資料列存放在伺服器端（items 為 token），
+    資料列被淘汰、過期或由其他 worker 處理時可依保存的參數重新查詢
+    """
+    return {**results, 'items': store_put(results['items'])}
+
+def list_items(data):
+    """store 中目前頁面的資料列（已從伺服器端淘汰時為空列表）"""
+    return store_get((data or {}).get('items')) or []
+
+def get_list_page(kind, data, page):
+    """取得目前頁面：存放的資料列已是該頁時直接使用，否則依 store 中保存的篩選參數重新查詢"""
+    page = page or 1
+    if not data:
+        # 尚未搜尋：預設查詢
+        return fetch_list_page(kind, {}, page)
+    if data.get('page') == page:
+        items = store_get(data.get('items'))
+        if items is not None:
+            return {**data, 'items': items}
+    return fetch_list_page(kind, data['params'], page, total=data['total'])
+
+def get_list_total(kind, data):
+    """列表的總筆數（尚未搜尋時為預設查詢的筆數）"""
+    if data:
+        return data['total']
+    return LIST_SEARCH_FUNCTIONS[kind][1]()
+
+# Get search suggestions based on keyword (使用記憶體自動完成索引)
+def get_search_suggestions(keyword, max_results=8, types=None):
+    """
+    根據關鍵字生成搜尋建議（使用 utils.suggest 的記憶體索引，不查詢數據庫）
+    返回餐廳、旅館、景點名稱的匹配結果（英文或日文名稱的開頭 / 中間字串）
     """
     if not keyword or len(keyword.strip()) < 2:
         return []
 
-    # 使用數據庫查詢獲取匹配的餐廳
-    # 這比 pandas 篩選更快
-    matched_restaurants = db_search_restaurants(keyword=keyword, sort_by='rating_desc')
-
-    suggestions = []
-
-    # 從結果中提取建議（僅顯示餐廳名稱）
-    if len(matched_restaurants) > 0:
-        # 餐廳名稱建議（顯示英文名和日文名）
-        for _, row in matched_restaurants.head(max_results).iterrows():
-            # 顯示英文名稱和日文名稱
-            label = row['Name']
-            if row.get('JapaneseName') and row['JapaneseName'].strip():
-                label = f"{row['Name']} ({row['JapaneseName']})"
-
-            suggestions.append({
-                'type': 'restaurant',
-                'value': row['Name'],
-                'label': label,
-                'icon': 'fa-utensils'
-            })
+    return suggest_names(keyword, k=max_results, types=types)
+
 
-    return suggestions[:max_results]
+def create_suggestion_options(keyword, item_type):
+    """搜尋欄 datalist 的選項（選取後的值即為名稱，交給原本的名稱搜尋）"""
+    return [
+        html.Option(value=s['value'], label=s['label'])
+        for s in get_search_suggestions(keyword, types=[item_type])
+    ]
 
 # ====== Search Enhancement Callbacks ======
 
-# Search suggestions removed - users can directly search by restaurant name
+# Name autocomplete for the restaurant / hotel / attraction search bars
+@app.callback(
+    Output('search-destination-suggestions', 'children'),
+    Input('search-destination', 'value'),
+    prevent_initial_call=True
+)
+def update_restaurant_suggestions(keyword):
+    return create_suggestion_options(keyword, 'restaurant')
+
+
+@app.callback(
+    Output('search-hotel-suggestions', 'children'),
+    Input('search-hotel', 'value'),
+    prevent_initial_call=True
+)
+def update_hotel_suggestions(keyword):
+    return create_suggestion_options(keyword, 'hotel')
+
+
+@app.callback(
+    Output('search-attraction-suggestions', 'children'),
+    Input('search-attraction', 'value'),
+    prevent_initial_call=True
+)
+def update_attraction_suggestions(keyword):
+    return create_suggestion_options(keyword, 'attraction')
 
 # Toggle advanced filters panel
 @app.callback(
@@ -6233,19 +6365,15 @@ def handle_restaurant_list_search(destination, cuisine, rating, price_range, vie
     if view_mode != 'restaurant-list':
         raise PreventUpdate
 
-    # Use enhanced search function with filters
-    filtered_df = search_restaurants(
-        keyword=destination,
-        cuisine=cuisine,
-        rating=rating,
-        price_range=price_range,
-        min_reviews=None,
-        stations=None,
-        sort_by='rating_desc'
-    )
+    # Use enhanced search function with filters (只查詢第一頁與總筆數)
+    search_results = fetch_list_page('restaurant', {
+        'keyword': destination,
+        'cuisine': cuisine,
+        'rating': rating,
+        'price_range': price_range
+    })
 
     # Store search results and parameters
-    search_results = filtered_df.to_dict('records') if len(filtered_df) > 0 else []
     search_params = {
         'destination': destination,
         'cuisine': cuisine,
@@ -6254,7 +6382,7 @@ def handle_restaurant_list_search(destination, cuisine, rating, price_range, vie
     }
 
     # 返回結果，重置到第一頁
-    return search_results, 1, search_params
+    return list_store_data(search_results), 1, search_params
 
 # Update restaurant grid and pagination based on current page
 @app.callback(
@@ -6268,12 +6396,10 @@ def handle_restaurant_list_search(destination, cuisine, rating, price_range, vie
 )
 def update_restaurant_grid(search_results, current_page, favorites_cache):
     """更新餐廳網格和分頁控制"""
-    if search_results is None:
-        # Initial load, fetch default results
-        df = search_restaurants(sort_by='rating_desc')
-        search_results = df.to_dict('records')
+    # Initial load 或換頁時只查詢目前頁面
+    page_data = get_list_page('restaurant', search_results, current_page)
 
-    if not search_results:
+    if not page_data['items']:
         return (
             html.Div([
                 html.I(className='fas fa-utensils',
@@ -6286,16 +6412,17 @@ def update_restaurant_grid(search_results, current_page, favorites_cache):
         )
 
     # Pagination logic
-    items_per_page = 15
-    total_items = len(search_results)
+    items_per_page = LIST_PAGE_SIZE
+    total_items = page_data['total']
     total_pages = (total_items + items_per_page - 1) // items_per_page
 
     # Get current page items
-    start_idx = (current_page - 1) * items_per_page
+    start_idx = (page_data['page'] - 1) * items_per_page
     end_idx = min(start_idx + items_per_page, total_items)
-    current_items = search_results[start_idx:end_idx]
+    current_items = page_data['items']
 
     # Create restaurant cards in grid layout
+    favorited_ids = cached_favorite_ids(favorites_cache, 'restaurant')
     cards = []
     for restaurant in current_items:
         # 卡片內容 (without button)
@@ -6349,9 +6476,7 @@ def update_restaurant_grid(search_results, current_page, favorites_cache):
         }, className='restaurant-list-card')
 
         # Check if this restaurant is favorited
-        is_favorited = False
-        if favorites_cache and 'restaurants' in favorites_cache:
-            is_favorited = restaurant['Restaurant_ID'] in favorites_cache['restaurants']
+        is_favorited = restaurant['Restaurant_ID'] in favorited_ids
 
         # Card and button as siblings in container
         card_with_button = html.Div([
@@ -6439,22 +6564,21 @@ def handle_pagination_click(n_clicks_list, view_mode, restaurant_page, hotel_pag
     page_index = button_data['index']
 
     # Determine which page type we're on
-    items_per_page = 15
+    items_per_page = LIST_PAGE_SIZE
 
     if view_mode == 'restaurant-list':
         current_page = restaurant_page
-        search_results = restaurant_results
+        total_items = get_list_total('restaurant', restaurant_results)
     elif view_mode == 'hotel-list':
         current_page = hotel_page
-        search_results = hotel_results
+        total_items = get_list_total('hotel', hotel_results)
     elif view_mode == 'attraction-list':
         current_page = attraction_page
-        search_results = attraction_results
+        total_items = get_list_total('attraction', attraction_results)
     else:
         raise PreventUpdate
 
     # Calculate total pages
-    total_items = len(search_results) if search_results else 0
     total_pages = (total_items + items_per_page - 1) // items_per_page
 
     # Handle different button types
@@ -7184,14 +7308,12 @@ def handle_hotel_list_search(keyword, hotel_type, view_mode):
     if view_mode != 'hotel-list':
         raise PreventUpdate
 
-    filtered_hotels = search_hotels(
-        keyword=keyword,
-        hotel_type=hotel_type,
-        sort_by='rating_desc'
-    )
-
-    search_results = filtered_hotels.to_dict('records') if len(filtered_hotels) > 0 else []
-    return search_results, 1
+    # 只查詢第一頁與總筆數
+    search_results = fetch_list_page('hotel', {
+        'keyword': keyword,
+        'hotel_type': hotel_type
+    })
+    return list_store_data(search_results), 1
 
 # Update hotel grid
 @app.callback(
@@ -7205,11 +7327,9 @@ def handle_hotel_list_search(keyword, hotel_type, view_mode):
 )
 def update_hotel_grid(search_results, current_page, favorites_cache):
     """更新旅館網格和分頁"""
-    if search_results is None:
-        df = search_hotels(sort_by='rating_desc')
-        search_results = df.to_dict('records')
-    
-    if not search_results:
+    page_data = get_list_page('hotel', search_results, current_page)
+
+    if not page_data['items']:
         return (
             html.Div([
                 html.I(className='fas fa-hotel', style={'fontSize': '4rem', 'color': '#003580', 'marginBottom': '2rem'}),
@@ -7221,15 +7341,16 @@ def update_hotel_grid(search_results, current_page, favorites_cache):
         )
     
     # 分頁邏輯
-    items_per_page = 15
-    total_items = len(search_results)
+    items_per_page = LIST_PAGE_SIZE
+    total_items = page_data['total']
     total_pages = (total_items + items_per_page - 1) // items_per_page
     
-    start_idx = (current_page - 1) * items_per_page
+    start_idx = (page_data['page'] - 1) * items_per_page
     end_idx = min(start_idx + items_per_page, total_items)
-    current_items = search_results[start_idx:end_idx]
+    current_items = page_data['items']
     
     # 創建旅館卡片
+    favorited_ids = cached_favorite_ids(favorites_cache, 'hotel')
     cards = []
     for hotel in current_items:
         types_text = ', '.join(hotel['Types'][:2]) if isinstance(hotel['Types'], list) and hotel['Types'] else 'Hotel'
@@ -7279,9 +7400,7 @@ def update_hotel_grid(search_results, current_page, favorites_cache):
         })
 
         # Check if this hotel is favorited
-        is_favorited = False
-        if favorites_cache and 'hotels' in favorites_cache:
-            is_favorited = hotel['Hotel_ID'] in favorites_cache['hotels']
+        is_favorited = hotel['Hotel_ID'] in favorited_ids
 
         # Card and button as siblings
         card_with_button = html.Div([
@@ -7370,7 +7489,7 @@ def detect_restaurant_route(pathname):
     prevent_initial_call=True
 )
 def load_restaurant_detail(restaurant_id_data):
-    """從數據庫獲取餐廳詳細資料並附帶 ALL 評論（若存在）"""
+    """從數據庫獲取餐廳詳細資料與評論統計（資料很小，直接存在 store 中）"""
     if not restaurant_id_data or not restaurant_id_data.get('id'):
         raise PreventUpdate
 
@@ -7388,37 +7507,8 @@ def load_restaurant_detail(restaurant_id_data):
         except Exception:
             restaurant_data = {'error': 'Invalid restaurant data format', 'id': restaurant_id}
 
-        # Load reviews from CSV if available and attach ALL comments for this restaurant
-        reviews_list = []
-        try:
-            reviews_df = pd.read_csv('data/Reviews.csv', encoding='utf-8-sig')
-            # detect restaurant id column
-            id_cols = [c for c in reviews_df.columns if c.lower().replace('-', '_') in ('restaurant_id', 'restaurantid')]
-            if id_cols:
-                id_col = id_cols[0]
-                filt = reviews_df[reviews_df[id_col] == restaurant_id]
-            else:
-                filt = pd.DataFrame()
-
-            for _, row in filt.iterrows():
-                # detect rating and comment columns with common names
-                rating = None
-                for rc in ('Review_Rating', 'ReviewRating', 'Rating', 'rating', 'review_rating'):
-                    if rc in row.index:
-                        rating = row[rc]
-                        break
-                comment = None
-                for cc in ('Review_Text', 'ReviewText', 'Comment', 'comment', 'Review'):
-                    if cc in row.index:
-                        comment = row[cc]
-                        break
-                reviews_list.append({'rating': rating, 'comment': comment})
-        except FileNotFoundError:
-            reviews_list = []
-        except Exception:
-            reviews_list = []
-
-        restaurant_data['reviews'] = reviews_list
+        # 只附帶評論統計；評論內容由評論區依星等分頁讀取（get_reviews）
+        restaurant_data['review_stats'] = get_review_stats('restaurant', restaurant_id)
         return restaurant_data
 
     except Exception as e:
@@ -7440,9 +7530,7 @@ def render_restaurant_detail(restaurant_data, favorites_cache):
         return create_error_state(restaurant_data.get('error', 'An error occurred'))
 
     # Check if this restaurant is favorited
-    is_favorited = False
-    if favorites_cache and 'restaurants' in favorites_cache and 'Restaurant_ID' in restaurant_data:
-        is_favorited = restaurant_data['Restaurant_ID'] in favorites_cache['restaurants']
+    is_favorited = is_cached_favorite(favorites_cache, 'restaurant', restaurant_data.get('Restaurant_ID'))
 
     # 渲染完整的詳細頁面
     return create_restaurant_detail_content(restaurant_data, is_favorited=is_favorited)
@@ -7455,7 +7543,7 @@ def render_restaurant_detail(restaurant_data, favorites_cache):
     prevent_initial_call=True
 )
 def load_hotel_detail_data(pathname):
-    """從資料庫獲取旅館詳細資料並附帶所有評論（若存在）"""
+    """從資料庫獲取旅館詳細資料與評論統計（資料很小，直接存在 store 中）"""
     if not (pathname and pathname.startswith('/hotel/')):
         raise PreventUpdate
 
@@ -7478,36 +7566,8 @@ def load_hotel_detail_data(pathname):
         except Exception:
             hotel_data = {'error': 'Invalid hotel data format', 'id': hotel_id}
 
-        # Load hotel reviews CSV if present
-        reviews_list = []
-        try:
-            reviews_df = pd.read_csv('data/HotelReviews.csv', encoding='utf-8-sig')
-            # detect hotel id column name
-            id_cols = [c for c in reviews_df.columns if c.lower().replace('-', '_') in ('hotel_id', 'hotelid')]
-            if id_cols:
-                id_col = id_cols[0]
-                filt = reviews_df[reviews_df[id_col] == hotel_id]
-            else:
-                filt = pd.DataFrame()
-
-            for _, row in filt.iterrows():
-                rating = None
-                for rc in ('Review_Rating', 'ReviewRating', 'Rating', 'rating', 'review_rating'):
-                    if rc in row.index:
-                        rating = row[rc]
-                        break
-                comment = None
-                for cc in ('Review_Text', 'ReviewText', 'Comment', 'comment', 'Review'):
-                    if cc in row.index:
-                        comment = row[cc]
-                        break
-                reviews_list.append({'rating': rating, 'comment': comment})
-        except FileNotFoundError:
-            reviews_list = []
-        except Exception:
-            reviews_list = []
-
-        hotel_data['reviews'] = reviews_list
+        # 只附帶評論統計；評論內容由評論區依星等分頁讀取（get_reviews）
+        hotel_data['review_stats'] = get_review_stats('hotel', hotel_id)
         return hotel_data
     except Exception as e:
         return {'error': str(e), 'id': hotel_id}
@@ -7710,19 +7770,43 @@ def logout_from_hotel_detail_page(n_clicks, session_data):
 
     return None
 
-# 點擊星等長條圖顯示該星級部分評論，並提供 Show all 按鈕
+# 評論區分頁：點擊星等先顯示前幾筆，Load more 每次再讀取一頁
+REVIEWS_FIRST_PAGE = 6
+REVIEWS_PAGE_SIZE = 20
+
+def create_review_items(reviews, star):
+    """評論列表項目"""
+    items = []
+    for r in reviews:
+        text = r.get('comment') or 'No comment text'
+        items.append(html.Div([
+            html.Div(f"★ {star}", style={'color': '#003580', 'fontWeight': '600', 'marginRight': '8px', 'display': 'inline-block', 'width': '48px'}),
+            html.Div(text, style={'color': '#1A1A1A', 'display': 'inline-block', 'verticalAlign': 'top', 'maxWidth': 'calc(100% - 60px)'})
+        ], style={'padding': '8px 0', 'borderBottom': '1px solid #222', 'animation': 'fadeIn 0.3s ease'}))
+    return items
+
+def create_load_more_reviews_button(star):
+    return html.Div([
+        html.Button('Load more comments', id={'type': 'load-more-reviews', 'index': star}, n_clicks=0, className='btn-primary', style={'marginTop': '10px'})
+    ], style={'textAlign': 'center'})
+
+# 點擊星等長條圖顯示該星級部分評論，並提供 Load more 按鈕
 @app.callback(
     [Output('reviews-comments', 'children'),
-     Output('selected-rating-store', 'data')],
+     Output('selected-rating-store', 'data'),
+     Output('reviews-cursor-store', 'data')],
     [Input('ratings-bar-chart', 'clickData'),
-     Input({'type': 'show-all-comments', 'index': ALL}, 'n_clicks')],
+     Input({'type': 'load-more-reviews', 'index': ALL}, 'n_clicks')],
     [State('restaurant-detail-data', 'data'),
-     State('hotel-detail-data', 'data')],
+     State('hotel-detail-data', 'data'),
+     State('reviews-cursor-store', 'data')],
     prevent_initial_call=True
 )
-def handle_reviews_interaction(clickData, show_all_n_clicks, restaurant_data, hotel_data):
-    """Handle both rating-bar clicks (show sample + Show all button) and Show all button clicks.
+def handle_reviews_interaction(clickData, load_more_clicks, restaurant_data, hotel_data, cursor_data):
+    """Handle rating-bar clicks (first page + Load more button) and Load more clicks.
 
+    Reviews are fetched page by page with get_reviews; Load more appends the next
+    page with a Patch instead of re-sending the comments already shown.
     Supports both restaurant and hotel detail stores (prefers restaurant data if present).
     """
     ctx = callback_context
@@ -7732,16 +7816,12 @@ def handle_reviews_interaction(clickData, show_all_n_clicks, restaurant_data, ho
     triggered_id = ctx.triggered[0]['prop_id'].split('.')[0]
 
     # Choose which detail data to use (restaurant preferred)
-    detail_data = None
-    if isinstance(restaurant_data, dict) and restaurant_data:
-        detail_data = restaurant_data
-    elif isinstance(hotel_data, dict) and hotel_data:
-        detail_data = hotel_data
+    if isinstance(restaurant_data, dict) and restaurant_data.get('Restaurant_ID') is not None:
+        item_type, item_id = 'restaurant', restaurant_data['Restaurant_ID']
+    elif isinstance(hotel_data, dict) and hotel_data.get('Hotel_ID') is not None:
+        item_type, item_id = 'hotel', hotel_data['Hotel_ID']
     else:
-        detail_data = {}
-
-    # Safely get reviews list
-    reviews = detail_data.get('reviews', []) if isinstance(detail_data, dict) else []
+        raise PreventUpdate
 
     # If the ratings bar was clicked
     if triggered_id == 'ratings-bar-chart':
@@ -7750,55 +7830,41 @@ def handle_reviews_interaction(clickData, show_all_n_clicks, restaurant_data, ho
         try:
             clicked_star = int(clickData['points'][0]['x'])
         except Exception:
-            return html.Div('Unable to parse clicked rating', style={'color': '#888888'}), None
-
-        matched = [r for r in reviews if r and r.get('rating') is not None and int(round(float(r['rating']))) == clicked_star]
-
-        if not matched:
-            return html.Div(f'No comments for {clicked_star}★', style={'color': '#888888'}), clicked_star
+            return [html.Div('Unable to parse clicked rating', style={'color': '#888888'})], None, None
 
-        items = []
-        for r in matched[:6]:
-            text = r.get('comment') or 'No comment text'
-            items.append(html.Div([
-                html.Div(f"★ {clicked_star}", style={'color': '#003580', 'fontWeight': '600', 'marginRight': '8px', 'display': 'inline-block', 'width': '48px'}),
-                html.Div(text, style={'color': '#1A1A1A', 'display': 'inline-block', 'verticalAlign': 'top', 'maxWidth': 'calc(100% - 60px)'})
-            ], style={'padding': '8px 0', 'borderBottom': '1px solid #222', 'animation': 'fadeIn 0.3s ease'}))
+        page = get_reviews(item_type, item_id, star=clicked_star, limit=REVIEWS_FIRST_PAGE)
+        if not page['reviews']:
+            return [html.Div(f'No comments for {clicked_star}★', style={'color': '#888888'})], clicked_star, None
 
-        # Add Show all button if more comments exist
-        if len(matched) > 6:
-            items.append(html.Div([
-                html.Button('Show all comments', id={'type': 'show-all-comments', 'index': clicked_star}, n_clicks=0, className='btn-primary', style={'marginTop': '10px'})
-            ], style={'textAlign': 'center'}))
+        items = create_review_items(page['reviews'], clicked_star)
+        if page['next_cursor'] is not None:
+            items.append(create_load_more_reviews_button(clicked_star))
 
-        return html.Div(items), clicked_star
+        return items, clicked_star, {'star': clicked_star, 'cursor': page['next_cursor']}
 
-    # Otherwise a "Show all" button was clicked (pattern-matching id)
-    else:
-        try:
-            triggered_obj = json.loads(triggered_id)
-        except Exception:
-            raise PreventUpdate
-
-        if triggered_obj.get('type') != 'show-all-comments':
-            raise PreventUpdate
+    # Otherwise a "Load more" button was clicked (pattern-matching id)
+    try:
+        triggered_obj = json.loads(triggered_id)
+    except Exception:
+        raise PreventUpdate
 
-        star = int(triggered_obj['index'])
+    if triggered_obj.get('type') != 'load-more-reviews' or not ctx.triggered[0]['value']:
+        raise PreventUpdate
 
-        matched = [r for r in reviews if r and r.get('rating') is not None and int(round(float(r['rating']))) == star]
+    star = int(triggered_obj['index'])
+    if not cursor_data or cursor_data.get('star') != star or cursor_data.get('cursor') is None:
+        raise PreventUpdate
 
-        if not matched:
-            return html.Div(f'No comments for {star}★', style={'color': '#888888'}), star
+    page = get_reviews(item_type, item_id, star=star, cursor=cursor_data['cursor'], limit=REVIEWS_PAGE_SIZE)
 
-        items = []
-        for r in matched:
-            text = r.get('comment') or 'No comment text'
-            items.append(html.Div([
-                html.Div(f"★ {star}", style={'color': '#003580', 'fontWeight': '600', 'marginRight': '8px', 'display': 'inline-block', 'width': '48px'}),
-                html.Div(text, style={'color': '#1A1A1A', 'display': 'inline-block', 'verticalAlign': 'top', 'maxWidth': 'calc(100% - 60px)'})
-            ], style={'padding': '8px 0', 'borderBottom': '1px solid #222', 'animation': 'fadeIn 0.3s ease'}))
+    # 移除舊的 Load more 按鈕，附加下一頁（有更多時再放回按鈕）
+    comments = Patch()
+    del comments[-1]
+    comments.extend(create_review_items(page['reviews'], star))
+    if page['next_cursor'] is not None:
+        comments.append(create_load_more_reviews_button(star))
 
-        return html.Div(items), star
+    return comments, no_update, {'star': star, 'cursor': page['next_cursor']}
 
 # Callback to update bar chart colors when a rating is selected
 @app.callback(
@@ -7819,23 +7885,9 @@ def update_bar_chart_selection(selected_rating, restaurant_data, hotel_data):
     else:
         raise PreventUpdate
 
-    # Get reviews and count ratings
-    reviews = detail_data.get('reviews', []) if isinstance(detail_data, dict) else []
-    counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-
-    for review in reviews:
-        try:
-            rating = review.get('rating')
-            if rating is None:
-                continue
-            rating_int = int(round(float(rating)))
-            if 1 <= rating_int <= 5:
-                counts[rating_int] += 1
-        except Exception:
-            continue
-
-    ratings = list(counts.keys())
-    values = [counts[r] for r in ratings]
+    # Rating counts (review_stats)
+    values, _ = get_review_histogram(detail_data)
+    ratings = [1, 2, 3, 4, 5]
 
     # Create colors array - highlight selected bar
     colors = []
@@ -7949,9 +8001,7 @@ def render_hotel_detail(hotel_data, favorites_cache):
         return create_error_state(hotel_data.get('error', 'An error occurred'))
 
     # Check if this hotel is favorited
-    is_favorited = False
-    if favorites_cache and 'hotels' in favorites_cache and 'Hotel_ID' in hotel_data:
-        is_favorited = hotel_data['Hotel_ID'] in favorites_cache['hotels']
+    is_favorited = is_cached_favorite(favorites_cache, 'hotel', hotel_data.get('Hotel_ID'))
 
     return create_hotel_detail_content(hotel_data, is_favorited=is_favorited)
 
@@ -8149,20 +8199,16 @@ def search_and_store_attractions(keyword, attr_type, rating_range, view_mode):
         elif rating_range == '1-2':
             min_rating, max_rating = 1.0, 2.0
 
-    # Search attractions with filters
-    df = search_attractions(
-        keyword=keyword,
-        attr_type=attr_type,
-        min_rating=min_rating,
-        max_rating=max_rating,
-        sort_by='rating_desc'
-    )
-
-    # Convert to dict for storage
-    results = df.to_dict('records') if not df.empty else []
+    # Search attractions with filters (只查詢第一頁與總筆數)
+    results = fetch_list_page('attraction', {
+        'keyword': keyword,
+        'attr_type': attr_type,
+        'min_rating': min_rating,
+        'max_rating': max_rating
+    })
 
     # Reset to page 1 when search changes
-    return results, 1
+    return list_store_data(results), 1
 
 # Callback 3: Update attraction grid and pagination
 @app.callback(
@@ -8175,12 +8221,10 @@ def search_and_store_attractions(keyword, attr_type, rating_range, view_mode):
 )
 def update_attraction_grid(search_results, current_page):
     """更新景點網格和分頁控制"""
-    if search_results is None:
-        # Initial load, fetch default results
-        df = search_attractions(sort_by='rating_desc')
-        search_results = df.to_dict('records')
+    # Initial load 或換頁時只查詢目前頁面
+    page_data = get_list_page('attraction', search_results, current_page)
 
-    if not search_results:
+    if not page_data['items']:
         return (
             html.Div([
                 html.I(className='fas fa-landmark',
@@ -8193,14 +8237,14 @@ def update_attraction_grid(search_results, current_page):
         )
 
     # Pagination logic
-    items_per_page = 15
-    total_items = len(search_results)
+    items_per_page = LIST_PAGE_SIZE
+    total_items = page_data['total']
     total_pages = (total_items + items_per_page - 1) // items_per_page
 
     # Get current page items
-    start_idx = (current_page - 1) * items_per_page
+    start_idx = (page_data['page'] - 1) * items_per_page
     end_idx = min(start_idx + items_per_page, total_items)
-    current_items = search_results[start_idx:end_idx]
+    current_items = page_data['items']
 
     # Create attraction cards
     cards = []
@@ -8383,10 +8427,11 @@ def update_favorites_content(view_mode, favorites_cache, selected_filter, sort_b
 
     print(f"[FAVORITES VIEW ALL] Fetching favorites for user_id={user_id}")
 
-    # Fetch all favorites with full data
-    fav_restaurants_df = get_favorite_restaurants_full(user_id)
-    fav_hotels_df = get_favorite_hotels_full(user_id)
-    fav_attractions_df = get_favorite_attractions_full(user_id)
+    # Fetch all favorites from their stored card snapshots
+    favorite_cards = get_favorite_cards(user_id)
+    fav_restaurants_df = favorite_cards['restaurant']
+    fav_hotels_df = favorite_cards['hotel']
+    fav_attractions_df = favorite_cards['attraction']
 
     # Debug: Print column names
     if len(fav_restaurants_df) > 0:
@@ -8695,10 +8740,11 @@ def update_favorites_content(view_mode, favorites_cache, selected_filter, sort_b
     [Input('favorites-remove-all-btn', 'n_clicks')],
     [State('favorites-filter', 'data'),
      State('session-store', 'data'),
-     State('notification-queue', 'data')],
+     State('notification-queue', 'data'),
+     State('user-favorites-cache', 'data')],
     prevent_initial_call=True
 )
-def handle_remove_all_favorites(n_clicks, selected_filter, session_data, notification_queue):
+def handle_remove_all_favorites(n_clicks, selected_filter, session_data, notification_queue, favorites_cache):
     """Handle Remove All favorites button click"""
     if not n_clicks:
         raise PreventUpdate
@@ -8718,17 +8764,14 @@ def handle_remove_all_favorites(n_clicks, selected_filter, session_data, notific
 
     # Clear favorites using the utility function
     from utils.favorites import clear_user_favorites
+    base_version = FAVORITES.version(user_id)
     success, message = clear_user_favorites(user_id, item_type)
 
     if success:
-        # Update cache by reloading favorites
-        from utils.favorites import get_favorites_by_ids
-        updated_cache = {
-            'restaurants': get_favorites_by_ids(user_id, 'restaurant'),
-            'hotels': get_favorites_by_ids(user_id, 'hotel'),
-            'attractions': get_favorites_by_ids(user_id, 'attraction'),
-            'last_updated': datetime.now().isoformat()
-        }
+        # Empty the cleared types with a Patch (full snapshot if the client cache is stale)
+        updated_cache = FAVORITES.clear_update(
+            user_id, (favorites_cache or {}).get('version'), base_version, item_type
+        )
 
         # Add success notification
         if not notification_queue:
@@ -9513,9 +9556,6 @@ def toggle_calculator_mode(text_clicks, map_clicks, current_mode):
         )
 
 
-# Add Store for place names at the top of app.layout (around line 1560)
-# Add this line inside the app.layout = html.Div([ ... ]) section:
-dcc.Store(id='all-places-store', data=load_all_place_names(), storage_type='memory'),
 # Find this callback (around line 2870) and modify the RETURN statement at the end:
 @app.callback(
     [Output('traffic-map-store', 'data'),
@@ -9587,15 +9627,8 @@ def handle_distance_calculation(click_data, store_data):
         
         try:
             # Haversine distance calculation
-            R = 6371
             lat1, lon1, lat2, lon2 = float(p1['lat']), float(p1['lon']), float(p2['lat']), float(p2['lon'])
-            lat1_rad, lon1_rad, lat2_rad, lon2_rad = map(np.radians, [lat1, lon1, lat2, lon2])
-            
-            dlon = lon2_rad - lon1_rad
-            dlat = lat2_rad - lat1_rad
-            a = np.sin(dlat / 2.0)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2.0)**2
-            c = 2 * np.arcsin(np.sqrt(a))
-            distance = R * c * 1.3
+            distance = haversine_km(lat1, lon1, lat2, lon2) * ROAD_DETOUR_FACTOR
             
              # Use the same UI component as the text calculator
             result_content = create_travel_time_cards(
@@ -9693,39 +9726,19 @@ def update_point_instruction(store_data):  # â† Removed the extra parameter
 #  Advanced Analytics Interactive Callbacks
 # ==========================================
 
-# Helper: 計算兩點距離 (Haversine)
-# Helper: 計算兩點距離 (Haversine) - 修復版
 # ==========================================
-#  Helper Function: 計算兩點距離 (Haversine)
+#  Helper Function: 空間索引結果對應分析資料
 # ==========================================
-def calculate_distances(df, center_lat, center_lon):
-    """計算 DataFrame 中所有點與中心點的距離 (km)"""
-    import numpy as np # 確保 numpy 有被引入
-    R = 6371  # 地球半徑 (km)
-    
-    # 確保資料是數值型態，並處理 NaN
-    try:
-        lat2 = pd.to_numeric(df['Lat'], errors='coerce').fillna(0)
-        lon2 = pd.to_numeric(df['Long'], errors='coerce').fillna(0)
-        
-        # 將角度轉為弧度
-        lat1_rad = np.radians(float(center_lat))
-        lon1_rad = np.radians(float(center_lon))
-        lat2_rad = np.radians(lat2)
-        lon2_rad = np.radians(lon2)
-        
-        dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
-        
-        a = np.sin(dlat/2)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon/2)**2
-        # 防止浮點數誤差導致 sqrt 內出現負數
-        a = np.clip(a, 0, 1)
-        
-        c = 2 * np.arctan2(np.sqrt(a), np.sqrt(1-a))
-        return R * c
-    except Exception as e:
-        print(f"Error in calculate_distances: {e}")
-        return pd.Series([9999] * len(df)) # 發生錯誤時回傳大距離，避免崩潰
+def join_spatial_results(df, places):
+    """以 (Type, ID) 將空間索引的查詢結果對應回分析資料（含 dist 欄位）"""
+    keys = pd.DataFrame(places, columns=['type', 'id', 'distance'])
+    keys = pd.DataFrame({
+        'Type': keys['type'].str.capitalize(),
+        'ID': keys['id'],
+        'dist': keys['distance'],
+    })
+    df = df.assign(ID=pd.to_numeric(df['ID'], errors='coerce'))
+    return df.merge(keys, on=['Type', 'ID'], how='inner')
 
 # ==========================================
 #  Sync Map Click to Search Dropdown
@@ -9754,189 +9767,272 @@ def sync_map_click_to_dropdown(click_data, current_search_value):
 # ==========================================
 #  Advanced Analytics Callback (Final Logic Fix)
 # ==========================================
+ANALYTICS_COLOR_MAP = {'Restaurant': '#32CD32', 'Hotel': '#FF4500', 'Attraction': '#9370DB', 'Unknown': '#888888'}
+ANALYTICS_MAP_CENTER = {"lat": 35.0116, "lon": 135.7681}
+ANALYTICS_MAP_ZOOM = 11
+
+@functools.lru_cache(maxsize=2)
+def get_analytics_frame(token):
+    """
+    取得分析資料的型別化 DataFrame（每個資料版本 / token 只準備一次）
+
+    回傳的 DataFrame 為共用物件，呼叫端不可原地修改
+    """
+    df = store_get(token, rebuild=get_combined_analytics_data)
+    if df is None or df.empty:
+        return pd.DataFrame(columns=['ID', 'Name', 'Lat', 'Long', 'Rating', 'Price', 'Type', 'SubCategory', 'Key'])
+    df = df.copy()
+    df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').fillna(0.1)
+    df['Price'] = pd.to_numeric(df['Price'], errors='coerce').fillna(0)
+    df['Key'] = df['ID'].astype(str) + '_' + df['Type']
+    return df
+
+def relayout_bbox(relayout_data):
+    """由地圖 relayoutData 取得可視範圍 [min_lat, max_lat, min_lon, max_lon]（沒有範圍資訊時為 None）"""
+    if not relayout_data or 'mapbox._derived' not in relayout_data:
+        return None
+    coords = relayout_data['mapbox._derived'].get('coordinates')
+    if not coords:
+        return None
+    lons = [c[0] for c in coords]
+    lats = [c[1] for c in coords]
+    return [min(lats), max(lats), min(lons), max(lons)]
+
+def resolve_analytics_view(df, search_id, selected_data, bbox):
+    """
+    決定目前要分析的資料範圍：聚焦景點 2km > 手動框選 > 地圖可視範圍 > 全部
+
+    Returns:
+        (view_df, target_point, status_msg)
+    """
+    if search_id:
+        target = df[(df['ID'] == search_id) & (df['Type'] == 'Attraction')]
+        if not target.empty:
+            target_point = target.iloc[0]
+            # 由空間索引取得 2km 內的所有周邊資料（只計算附近網格的距離）
+            view_df = join_spatial_results(df, spatial_within_radius(target_point['Lat'], target_point['Long'], 2.0))
+            return view_df, target_point, f"🎯 Focused on {target_point['Name']} (2km radius)"
+
+    if selected_data and 'points' in selected_data:
+        selected_keys = [f"{p['customdata'][0]}_{p['customdata'][1]}" for p in selected_data['points'] if 'customdata' in p]
+        if selected_keys:
+            view_df = df[df['Key'].isin(selected_keys)]
+            return view_df, None, f"Selected {len(view_df)} items manually"
+
+    if bbox:
+        # 由空間索引取得可視範圍內的地點，只檢查範圍涵蓋的網格
+        return join_spatial_results(df, spatial_places_in_bbox(*bbox)), None, "Filtering by current map view"
+
+    return df, None, "Explore mode: Drag map or search to filter."
+
+def view_signature(view_df):
+    """資料範圍的指紋（可視集合相同的平移不需重新計算）"""
+    return hashlib.sha1('\n'.join(sorted(view_df['Key'])).encode('utf-8')).hexdigest()[:16]
+
+def figure_patch(fig, layout_keys):
+    """只更新圖表的 data 與指定的 layout 屬性（其餘 layout 沿用前端現有的值）"""
+    layout = fig.layout.to_plotly_json()
+    patch = Patch()
+    patch['data'] = [trace.to_plotly_json() for trace in fig.data]
+    for key in layout_keys:
+        patch['layout'][key] = layout.get(key)
+    return patch
+
+def create_analytics_map(df, target_point):
+    """探索模式顯示全部地點，聚焦模式顯示 2km 內地點與目標景點"""
+    if target_point is not None:
+        center = {"lat": target_point['Lat'], "lon": target_point['Long']}
+        zoom = 13.5
+    else:
+        center, zoom = ANALYTICS_MAP_CENTER, ANALYTICS_MAP_ZOOM
+
+    fig_map = px.scatter_mapbox(
+        df, lat="Lat", lon="Long", color="Type", size="Rating", size_max=12,
+        hover_name="Name", hover_data={"ID":True, "Type":True, "Price":True},
+        color_discrete_map=ANALYTICS_COLOR_MAP, zoom=zoom, center=center, height=500
+    )
+    if target_point is not None:
+        fig_map.add_trace(go.Scattermapbox(
+            lat=[target_point['Lat']], lon=[target_point['Long']], mode='markers+text',
+            marker=go.scattermapbox.Marker(size=25, color='red', opacity=0.9),
+            text=[target_point['Name']], textposition="top center", name='Target'
+        ))
+    fig_map.update_layout(mapbox_style="carto-positron", margin={"r":0,"t":0,"l":0,"b":0}, clickmode='event+select', uirevision='constant')
+    return fig_map
+
+@functools.lru_cache(maxsize=2)
+def get_explore_map(token):
+    """探索模式的地圖（全部地點，每個資料版本只建立一次）"""
+    return create_analytics_map(get_analytics_frame(token), None)
+
+# 空矩陣與一般矩陣的模板、高度、圖例不同，切換時都要一併更新
+MATRIX_LAYOUT_KEYS = ['title', 'xaxis', 'yaxis', 'shapes', 'annotations', 'template', 'height', 'legend']
+
+def create_matrix_figure(matrix_df):
+    """CP 值矩陣（價格 x 評分）"""
+    if matrix_df.empty:
+        fig_matrix = px.scatter(title="No matching data")
+        fig_matrix.update_layout(xaxis={'visible': False}, yaxis={'visible': False})
+        return fig_matrix
+
+    fig_matrix = px.scatter(
+        matrix_df, x="Price", y="Rating", color="Type", hover_name="Name",
+        size="Rating", color_discrete_map=ANALYTICS_COLOR_MAP, template="plotly_white", height=450
+    )
+    try:
+        avg_price = matrix_df['Price'].median()
+        fig_matrix.add_vline(x=avg_price, line_dash="dash", line_color="gray", annotation_text="Median")
+        fig_matrix.add_hline(y=4.0, line_dash="dash", line_color="green", annotation_text="High Rating")
+    except: pass
+    return fig_matrix
+
+def create_analytics_list(matrix_df, target_type):
+    """High CP 推薦列表（最多 8 張卡片）"""
+    # 分開計算 CP 值，避免飯店被過濾光
+    type_df = matrix_df[matrix_df['Type'] == target_type]
+
+    list_df = pd.DataFrame()
+    if not type_df.empty:
+        # 針對該類型計算平均價
+        type_avg_price = type_df['Price'].mean()
+
+        # 篩選 High CP (評分高 且 價格 < 平均價 * 1.5) -> 放寬一點係數
+        recommendations = type_df[(type_df['Rating'] >= 4.0) & (type_df['Price'] <= type_avg_price * 1.5)]
+
+        if recommendations.empty:
+            recommendations = type_df[type_df['Rating'] >= 3.8] # 如果沒結果，放寬到 3.8 分
+        if recommendations.empty:
+            recommendations = type_df # 還是沒結果，顯示全部
+
+        list_df = recommendations.sort_values('Rating', ascending=False)
+
+    if list_df.empty:
+        return html.Div([
+            html.I(className="fas fa-search", style={'fontSize':'2rem', 'color':'#ccc', 'marginBottom':'10px'}),
+            html.P(f"No {target_type.lower()}s found nearby.", style={'color':'#888'})
+        ], style={'textAlign':'center', 'padding':'20px'})
+
+    cards = []
+    for row in list_df.head(8).to_dict('records'):
+        try:
+            if target_type == 'Restaurant':
+                r_data = {'Restaurant_ID': row['ID'], 'Name': row['Name'], 'FirstCategory': row['SubCategory'], 'TotalRating': row['Rating']}
+                # 明確傳入 ID 類型，讓導航 Callback 能夠捕捉
+                cards.append(create_destination_card(r_data, id_type='analytics-restaurant-card'))
+            else:
+                h_data = {'Hotel_ID': row['ID'], 'HotelName': row['Name'], 'Types': [row['SubCategory']], 'Rating': row['Rating'], 'Address': 'Kyoto'}
+                cards.append(create_hotel_card(h_data, id_type='analytics-hotel-card'))
+        except: pass
+
+    return html.Div(cards, style={'display': 'grid', 'gridTemplateColumns': 'repeat(auto-fill, minmax(300px, 1fr))', 'gap': '1.5rem'})
+
+def create_attraction_info_card(target_point):
+    """聚焦景點的資訊卡"""
+    if target_point is None:
+        return None
+    sub_cat = target_point.get('SubCategory') or 'Tourist Attraction'
+    return dbc.Card([
+        dbc.CardBody([
+            html.H4([html.I(className="fas fa-map-marker-alt me-2", style={'color':'#d9534f'}), target_point['Name']], className="card-title"),
+            html.Hr(),
+            dbc.Row([
+                dbc.Col([html.Strong("Type: "), html.Span(sub_cat), html.Br(), html.Strong("Rating: "), html.Span(f"⭐ {target_point['Rating']}")], width=6),
+                dbc.Col([html.Strong("Location: "), html.Span(f"{target_point['Lat']:.4f}, {target_point['Long']:.4f}")], width=6),
+            ]),
+        ])
+    ], className="shadow-sm", style={'borderLeft': '5px solid #d9534f', 'backgroundColor': '#fff5f5'})
+
 @app.callback(
     [Output('interactive-map', 'figure'),
      Output('cp-matrix-graph', 'figure'),
      Output('matrix-status-text', 'children'),
      Output('analytics-list-content', 'children'),
-     Output('analytics-attraction-info', 'children')], 
+     Output('analytics-attraction-info', 'children'),
+     Output('analytics-view-store', 'data')],
     [Input('analytics-attraction-search', 'value'), # 直接監聽 Dropdown
-     Input('interactive-map', 'relayoutData'),           
-     Input('interactive-map', 'selectedData'),           
+     Input('interactive-map', 'relayoutData'),
+     Input('interactive-map', 'selectedData'),
      Input('analytics-type-filter', 'value'),
      Input('analytics-tabs', 'active_tab')],
     [State('analytics-combined-data', 'data'),
-     State('interactive-map', 'figure')]                 
+     State('analytics-view-store', 'data')]
 )
-def update_analytics_dashboard(search_id, relayout_data, selected_data, type_filter, active_tab, data, current_fig):
-    try:
-        if not data: return no_update, no_update, "Loading...", html.Div("Loading..."), None
-        df = pd.DataFrame(data)
-        if df.empty: return no_update, no_update, "No data.", html.Div("No data."), None
+def update_analytics_dashboard(search_id, relayout_data, selected_data, type_filter, active_tab, data, view_state):
+    """
+    分析看板：只重新計算觸發來源影響到的輸出
 
-        # 預處理
-        df['Rating'] = pd.to_numeric(df['Rating'], errors='coerce').fillna(0.1)
-        df['Price'] = pd.to_numeric(df['Price'], errors='coerce').fillna(0)
+    view_state 記錄上次的可視範圍、資料範圍指紋與矩陣 / 列表的參數；
+    可視集合不變的平移直接略過，圖表以 Patch 更新（頁面第一次載入時送出完整圖表）
+    """
+    try:
+        if not data: return no_update, no_update, "Loading...", html.Div("Loading..."), None, no_update
+        df = get_analytics_frame(data)
+        if df.empty: return no_update, no_update, "No data.", html.Div("No data."), None, no_update
 
         ctx = callback_context
-        trigger_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else 'init'
+        trigger_id = ctx.triggered[0]['prop_id'].split('.')[0] if ctx.triggered else ''
+        first_render = not view_state
+        state = dict(view_state or {})
+
+        # --- 1. 資料範圍 ---
+        if trigger_id == 'interactive-map' and not search_id:
+            bbox = relayout_bbox(relayout_data)
+            if bbox is not None:
+                state['bbox'] = bbox
+        view_df, target_point, status_msg = resolve_analytics_view(df, search_id, selected_data, state.get('bbox'))
+        view_key = view_signature(view_df)
+        search_changed = first_render or state.get('search') != search_id
+
+        if trigger_id == 'interactive-map' and not first_render and state.get('view') == view_key:
+            # 平移後可視集合不變：不需更新任何輸出
+            raise PreventUpdate
 
-        full_df = df.copy() # 保留完整資料用於計算距離
-        filtered_df = df.copy() # 這是最後要顯示在地圖上的資料
-        
-        map_center = {"lat": 35.0116, "lon": 135.7681} 
-        map_zoom = 11
-        status_msg = "Explore mode: Drag map or search to filter."
-        target_point = None 
-        is_focus_mode = False
-        attraction_info_card = None 
-
-        # --- 1. 篩選邏輯 ---
-        if search_id:
-            # 找到目標點
-            target = df[(df['ID'] == search_id) & (df['Type'] == 'Attraction')]
-            if not target.empty:
-                target_point = target.iloc[0]
-                is_focus_mode = True
-        
-        # 如果進入聚焦模式 (Focus Mode)
-        if is_focus_mode and target_point is not None:
-            t_lat, t_lon = target_point['Lat'], target_point['Long']
-            
-            # [關鍵修復 1]：在 "完整 df" 上計算距離，保留所有周邊資料
-            full_df['dist'] = calculate_distances(full_df, t_lat, t_lon)
-            
-            # 篩選 2km 內的資料
-            filtered_df = full_df[full_df['dist'] <= 2.0].copy()
-            
-            map_center = {"lat": t_lat, "lon": t_lon}
-            map_zoom = 13.5
-            status_msg = f"🎯 Focused on {target_point['Name']} (2km radius)"
-
-            # 產生景點資訊卡
-            sub_cat = target_point.get('SubCategory') or 'Tourist Attraction'
-            attraction_info_card = dbc.Card([
-                dbc.CardBody([
-                    html.H4([html.I(className="fas fa-map-marker-alt me-2", style={'color':'#d9534f'}), target_point['Name']], className="card-title"),
-                    html.Hr(),
-                    dbc.Row([
-                        dbc.Col([html.Strong("Type: "), html.Span(sub_cat), html.Br(), html.Strong("Rating: "), html.Span(f"⭐ {target_point['Rating']}")], width=6),
-                        dbc.Col([html.Strong("Location: "), html.Span(f"{t_lat:.4f}, {t_lon:.4f}")], width=6),
-                    ]),
-                ])
-            ], className="shadow-sm", style={'borderLeft': '5px solid #d9534f', 'backgroundColor': '#fff5f5'})
-
-        # 手動框選邏輯
-        elif trigger_id == 'interactive-map' and selected_data and 'points' in selected_data:
-             try:
-                df['temp_key'] = df['ID'].astype(str) + '_' + df['Type']
-                selected_keys = [f"{p['customdata'][0]}_{p['customdata'][1]}" for p in selected_data['points'] if 'customdata' in p]
-                if selected_keys:
-                    filtered_df = df[df['temp_key'].isin(selected_keys)]
-                    status_msg = f"Selected {len(filtered_df)} items manually"
-             except: pass
-
-        # 移動邏輯 (只有在非 Focus 模式下才生效)
-        elif trigger_id == 'interactive-map' and relayout_data and not is_focus_mode:
-            if 'mapbox._derived' in relayout_data and 'coordinates' in relayout_data['mapbox._derived']:
-                coords = relayout_data['mapbox._derived']['coordinates']
-                lons = [c[0] for c in coords]
-                lats = [c[1] for c in coords]
-                filtered_df = df[
-                    (df['Lat'] >= min(lats)) & (df['Lat'] <= max(lats)) &
-                    (df['Long'] >= min(lons)) & (df['Long'] <= max(lons))
-                ]
-                status_msg = "Filtering by current map view"
-            if 'mapbox.center' in relayout_data:
-                map_center = relayout_data['mapbox.center']
-            if 'mapbox.zoom' in relayout_data:
-                map_zoom = relayout_data['mapbox.zoom']
-
-        # --- 2. 產生地圖 ---
-        color_map = {'Restaurant': '#32CD32', 'Hotel': '#FF4500', 'Attraction': '#9370DB', 'Unknown': '#888888'}
-        
-        fig_map = px.scatter_mapbox(
-            filtered_df, lat="Lat", lon="Long", color="Type", size="Rating", size_max=12,
-            hover_name="Name", hover_data={"ID":True, "Type":True, "Price":True}, 
-            color_discrete_map=color_map, zoom=map_zoom, center=map_center, height=500
-        )
-        if target_point is not None:
-            fig_map.add_trace(go.Scattermapbox(
-                lat=[target_point['Lat']], lon=[target_point['Long']], mode='markers+text',
-                marker=go.scattermapbox.Marker(size=25, color='red', opacity=0.9),
-                text=[target_point['Name']], textposition="top center", name='Target'
-            ))
-        fig_map.update_layout(mapbox_style="carto-positron", margin={"r":0,"t":0,"l":0,"b":0}, clickmode='event+select', uirevision='constant')
-
-        # --- 3. 產生矩陣 ---
-        if type_filter is None: type_filter = []
-        matrix_df = filtered_df[filtered_df['Type'].isin(type_filter)]
-        matrix_df = matrix_df[matrix_df['Price'] > 0]
-
-        if matrix_df.empty:
-            fig_matrix = px.scatter(title="No matching data")
-            fig_matrix.update_layout(xaxis={'visible': False}, yaxis={'visible': False})
-        else:
-            fig_matrix = px.scatter(
-                matrix_df, x="Price", y="Rating", color="Type", hover_name="Name",
-                size="Rating", color_discrete_map=color_map, template="plotly_white", height=450
+        state['view'] = view_key
+        state['search'] = search_id
+
+        # --- 2. 地圖（只在聚焦景點變更時更新）---
+        if first_render:
+            fig_map = create_analytics_map(view_df, target_point) if target_point is not None else get_explore_map(data)
+        elif search_changed:
+            fig_map = figure_patch(
+                create_analytics_map(view_df, target_point) if target_point is not None else get_explore_map(data),
+                ['mapbox']
             )
-            try:
-                avg_price = matrix_df['Price'].median()
-                fig_matrix.add_vline(x=avg_price, line_dash="dash", line_color="gray", annotation_text="Median")
-                fig_matrix.add_hline(y=4.0, line_dash="dash", line_color="green", annotation_text="High Rating")
-            except: pass
+        else:
+            fig_map = no_update
+
+        # --- 3. 矩陣 ---
+        type_filter = sorted(type_filter or [])
+        matrix_df = view_df[view_df['Type'].isin(type_filter) & (view_df['Price'] > 0)]
+        matrix_key = [view_key, type_filter]
+        if first_render:
+            fig_matrix = create_matrix_figure(matrix_df)
+        elif state.get('matrix') != matrix_key:
+            fig_matrix = figure_patch(create_matrix_figure(matrix_df), MATRIX_LAYOUT_KEYS)
+        else:
+            fig_matrix = no_update
+        state['matrix'] = matrix_key
 
-        # --- 4. 產生詳細列表 ---
-        list_content = []
+        # --- 4. 詳細列表 ---
         target_type = 'Restaurant' if active_tab == 'tab-analytics-restaurants' else 'Hotel'
-        
-        # [關鍵修復 2]：分開計算 CP 值，避免飯店被過濾光
-        type_df = matrix_df[matrix_df['Type'] == target_type].copy()
-        
-        list_df = pd.DataFrame()
-        if not type_df.empty:
-            # 針對該類型計算平均價
-            type_avg_price = type_df['Price'].mean()
-            
-            # 篩選 High CP (評分高 且 價格 < 平均價 * 1.5) -> 放寬一點係數
-            recommendations = type_df[(type_df['Rating'] >= 4.0) & (type_df['Price'] <= type_avg_price * 1.5)]
-            
-            if recommendations.empty: 
-                recommendations = type_df[type_df['Rating'] >= 3.8] # 如果沒結果，放寬到 3.8 分
-            if recommendations.empty:
-                recommendations = type_df # 還是沒結果，顯示全部
-            
-            list_df = recommendations.sort_values('Rating', ascending=False)
-        
-        if list_df.empty:
-            list_content = html.Div([
-                html.I(className="fas fa-search", style={'fontSize':'2rem', 'color':'#ccc', 'marginBottom':'10px'}),
-                html.P(f"No {target_type.lower()}s found nearby.", style={'color':'#888'})
-            ], style={'textAlign':'center', 'padding':'20px'})
+        list_key = [view_key, target_type in type_filter, target_type]
+        if first_render or state.get('list') != list_key:
+            list_content = create_analytics_list(matrix_df, target_type)
         else:
-            cards = []
-            for _, row in list_df.head(8).iterrows():
-                try:
-                    if target_type == 'Restaurant':
-                        r_data = {'Restaurant_ID': row['ID'], 'Name': row['Name'], 'FirstCategory': row['SubCategory'], 'TotalRating': row['Rating']}
-                        # 🔥 [關鍵修復 3]：明確傳入 ID 類型，讓導航 Callback 能夠捕捉！
-                        cards.append(create_destination_card(r_data, id_type='analytics-restaurant-card'))
-                    else:
-                        h_data = {'Hotel_ID': row['ID'], 'HotelName': row['Name'], 'Types': [row['SubCategory']], 'Rating': row['Rating'], 'Address': 'Kyoto'}
-                        # 🔥 [關鍵修復 3]：明確傳入 ID 類型
-                        cards.append(create_hotel_card(h_data, id_type='analytics-hotel-card'))
-                except: pass
+            list_content = no_update
+        state['list'] = list_key
 
-            list_content = html.Div(cards, style={'display': 'grid', 'gridTemplateColumns': 'repeat(auto-fill, minmax(300px, 1fr))', 'gap': '1.5rem'})
+        attraction_info_card = create_attraction_info_card(target_point) if search_changed else no_update
 
-        return fig_map, fig_matrix, status_msg, list_content, attraction_info_card
+        return fig_map, fig_matrix, status_msg, list_content, attraction_info_card, state
 
+    except PreventUpdate:
+        raise
     except Exception as e:
         print(f"❌ ERROR: {e}")
         import traceback
         traceback.print_exc()
-        return px.scatter(), px.scatter(), "Error", html.Div("System Error"), None
+        return px.scatter(), px.scatter(), "Error", html.Div("System Error"), None, None
     
 # =========================================================
 #  NEW: Analytics Navigation Logic (Fix Back Button)
@@ -9992,6 +10088,7 @@ def handle_analytics_hotel_click(n_clicks_list):
 )
 def populate_location_dropdowns(places_data):
     """Populate both dropdown menus with all available places"""
+    places_data = store_get(places_data, rebuild=load_all_place_names)
     if not places_data:
         return [], []
     
@@ -10033,6 +10130,7 @@ def populate_location_dropdowns(places_data):
 )
 def filter_location_options(start_search, end_search, places_data):
     """Filter dropdown options based on user's search input"""
+    places_data = store_get(places_data, rebuild=load_all_place_names)
     if not places_data:
         return [], []
     
@@ -10090,6 +10188,7 @@ def filter_location_options(start_search, end_search, places_data):
 )
 def calculate_text_distance(n_clicks, start_value, end_value, places_data):
     """Calculate distance between two text-selected locations"""
+    places_data = store_get(places_data, rebuild=load_all_place_names)
     if not n_clicks or not start_value or not end_value:
         return html.Div([
             html.I(className='fas fa-info-circle', style={'fontSize': '2rem', 'color': '#888', 'marginBottom': '1rem'}),
@@ -10122,17 +10221,9 @@ def calculate_text_distance(n_clicks, start_value, end_value, places_data):
         return html.Div('Could not find selected locations', style={'color': '#FF0000'})
     
     try:
-        R = 6371
         lat1, lon1 = float(start_place['lat']), float(start_place['lon'])
         lat2, lon2 = float(end_place['lat']), float(end_place['lon'])
-        
-        lat1_rad, lon1_rad, lat2_rad, lon2_rad = map(np.radians, [lat1, lon1, lat2, lon2])
-        
-        dlon = lon2_rad - lon1_rad
-        dlat = lat2_rad - lat1_rad
-        a = np.sin(dlat / 2.0)**2 + np.cos(lat1_rad) * np.cos(lat2_rad) * np.sin(dlon / 2.0)**2
-        c = 2 * np.arcsin(np.sqrt(a))
-        distance = R * c * 1.3
+        distance = haversine_km(lat1, lon1, lat2, lon2) * ROAD_DETOUR_FACTOR
         
         # Pass coordinates to create_travel_time_cards
         return create_travel_time_cards(distance, start_place['name'], end_place['name'], lat1, lon1, lat2, lon2)
@@ -10159,20 +10250,10 @@ def initialize_favorites_cache(session_data):
     if not user_id:
         raise PreventUpdate
 
-    from utils.favorites import get_favorites_by_ids
-    from datetime import datetime
-
     print(f"[FAVORITES] Loading favorites cache for user {user_id}")
 
-    # Load favorites by type
-    cache = {
-        'restaurants': get_favorites_by_ids(user_id, 'restaurant'),
-        'hotels': get_favorites_by_ids(user_id, 'hotel'),
-        'attractions': get_favorites_by_ids(user_id, 'attraction'),
-        'last_updated': datetime.now().isoformat()
-    }
-
-    return cache
+    # All types in one query; {'restaurants': {'<id>': 1}, ..., 'version': n}
+    return FAVORITES.snapshot(user_id)
 
 
 # TEST: Simple callback with normal button ID
@@ -10265,7 +10346,7 @@ def handle_favorite_toggle(n_clicks_list, btn_ids, session_data, favorites_cache
         # Try to get from search results first
         restaurant_data = None
         if restaurant_results:
-            for r in restaurant_results:
+            for r in list_items(restaurant_results):
                 if r.get('Restaurant_ID') == item_id:
                     restaurant_data = r
                     break
@@ -10286,7 +10367,7 @@ def handle_favorite_toggle(n_clicks_list, btn_ids, session_data, favorites_cache
         # Try to get from search results first
         hotel_data = None
         if hotel_results:
-            for h in hotel_results:
+            for h in list_items(hotel_results):
                 if h.get('Hotel_ID') == item_id:
                     hotel_data = h
                     break
@@ -10340,25 +10421,25 @@ def handle_favorite_toggle(n_clicks_list, btn_ids, session_data, favorites_cache
                     'type': attr_data.get('Type')
                 }
 
+    # Card snapshot so the favorites pages render without querying the catalog
+    card = get_favorite_card(item_type, item_id)
+    if card is not None:
+        item_metadata['card'] = card
+
     # Toggle favorite in database
+    base_version = FAVORITES.version(user_id)
     success, is_favorited, message = toggle_favorite(
         user_id, item_type, item_id, item_name, item_metadata
     )
 
-    # Update cache
-    if favorites_cache is None:
-        favorites_cache = {'restaurants': [], 'hotels': [], 'attractions': []}
-
-    type_key = f"{item_type}s"  # restaurant -> restaurants
-    current_favs = favorites_cache.get(type_key, [])
-
-    if is_favorited and item_id not in current_favs:
-        current_favs.append(item_id)
-    elif not is_favorited and item_id in current_favs:
-        current_favs.remove(item_id)
-
-    favorites_cache[type_key] = current_favs
-    favorites_cache['last_updated'] = datetime.now().isoformat()
+    # Send only the changed entry; a failed toggle or a stale client cache gets a full snapshot
+    client_version = (favorites_cache or {}).get('version')
+    if success:
+        favorites_update = FAVORITES.toggle_update(
+            user_id, client_version, base_version, item_type, item_id, is_favorited
+        )
+    else:
+        favorites_update = FAVORITES.snapshot(user_id)
 
     # Add notification
     if notification_queue is None:
@@ -10370,7 +10451,7 @@ def handle_favorite_toggle(n_clicks_list, btn_ids, session_data, favorites_cache
         'id': str(datetime.now().timestamp())
     })
 
-    return favorites_cache, notification_queue
+    return favorites_update, notification_queue
 
 
 # 3. Display toast notifications
@@ -10455,8 +10536,8 @@ app.clientside_callback(
 
                 // Check if this item is favorited
                 const cacheKey = itemType + 's'; // restaurant -> restaurants
-                const favoriteIds = favorites_cache[cacheKey] || [];
-                const isFavorited = favoriteIds.includes(itemId);
+                const favoriteIds = favorites_cache[cacheKey] || {};
+                const isFavorited = Object.prototype.hasOwnProperty.call(favoriteIds, String(itemId));
 
                 // Get the icon element (child of button)
                 const icon = button.querySelector('i');
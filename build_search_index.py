@@ -0,0 +1,147 @@
+"""
+Build FTS5 keyword search indexes in travel.db
+Run this once, and again after re-running migrate_hotels_to_db.py
+(dropping the hotels table also drops its sync triggers)
+
+Creates restaurants_fts, hotels_fts and attractions_fts with the trigram
+tokenizer (substring matching that also works for Japanese names).
+Each index row uses the item ID as rowid and has the columns:
+    title      English / display name
+    title_alt  Japanese name (restaurants only)
+    location   station or address
+    category   cuisine, hotel types or attraction type
+Triggers on the base tables keep the indexes in sync.
+"""
+import sqlite3
+import os
+
+DB_PATH = os.path.join('data', 'travel.db')
+
+FTS_COLUMNS = 'title, title_alt, location, category'
+
+# (fts table, SELECT producing rowid + FTS_COLUMNS)
+SOURCES = {
+    'restaurants_fts': '''
+        SELECT Restaurant_ID, Name, JapaneseName, Station,
+               TRIM(COALESCE(FirstCategory, '') || ' ' || COALESCE(SecondCategory, ''))
+        FROM restaurants
+    ''',
+    'hotels_fts': '''
+        SELECT h.Hotel_ID, h.HotelName, NULL, h.Address,
+               (SELECT GROUP_CONCAT(t.TypeName, ' ')
+                FROM hotel_types ht JOIN types t ON t.Type_ID = ht.Type_ID
+                WHERE ht.Hotel_ID = h.Hotel_ID)
+        FROM hotels h
+    ''',
+    'attractions_fts': '''
+        SELECT ID, Name, NULL, Address, Type
+        FROM attractions
+    ''',
+}
+
+TRIGGERS = [
+    # ----- restaurants -----
+    '''CREATE TRIGGER restaurants_fts_ai AFTER INSERT ON restaurants BEGIN
+        INSERT INTO restaurants_fts (rowid, title, title_alt, location, category)
+        VALUES (new.Restaurant_ID, new.Name, new.JapaneseName, new.Station,
+                TRIM(COALESCE(new.FirstCategory, '') || ' ' || COALESCE(new.SecondCategory, '')));
+    END''',
+    '''CREATE TRIGGER restaurants_fts_ad AFTER DELETE ON restaurants BEGIN
+        DELETE FROM restaurants_fts WHERE rowid = old.Restaurant_ID;
+    END''',
+    '''CREATE TRIGGER restaurants_fts_au
+    AFTER UPDATE OF Restaurant_ID, Name, JapaneseName, Station, FirstCategory, SecondCategory ON restaurants BEGIN
+        DELETE FROM restaurants_fts WHERE rowid = old.Restaurant_ID;
+        INSERT INTO restaurants_fts (rowid, title, title_alt, location, category)
+        VALUES (new.Restaurant_ID, new.Name, new.JapaneseName, new.Station,
+                TRIM(COALESCE(new.FirstCategory, '') || ' ' || COALESCE(new.SecondCategory, '')));
+    END''',
+    # ----- hotels -----
+    '''CREATE TRIGGER hotels_fts_ai AFTER INSERT ON hotels BEGIN
+        INSERT INTO hotels_fts (rowid, title, title_alt, location, category)
+        VALUES (new.Hotel_ID, new.HotelName, NULL, new.Address, NULL);
+    END''',
+    '''CREATE TRIGGER hotels_fts_ad AFTER DELETE ON hotels BEGIN
+        DELETE FROM hotels_fts WHERE rowid = old.Hotel_ID;
+    END''',
+    '''CREATE TRIGGER hotels_fts_au AFTER UPDATE OF Hotel_ID, HotelName, Address ON hotels BEGIN
+        UPDATE hotels_fts SET rowid = new.Hotel_ID, title = new.HotelName, location = new.Address
+        WHERE rowid = old.Hotel_ID;
+    END''',
+    '''CREATE TRIGGER hotel_types_fts_ai AFTER INSERT ON hotel_types BEGIN
+        UPDATE hotels_fts SET category = (
+            SELECT GROUP_CONCAT(t.TypeName, ' ')
+            FROM hotel_types ht JOIN types t ON t.Type_ID = ht.Type_ID
+            WHERE ht.Hotel_ID = new.Hotel_ID)
+        WHERE rowid = new.Hotel_ID;
+    END''',
+    '''CREATE TRIGGER hotel_types_fts_ad AFTER DELETE ON hotel_types BEGIN
+        UPDATE hotels_fts SET category = (
+            SELECT GROUP_CONCAT(t.TypeName, ' ')
+            FROM hotel_types ht JOIN types t ON t.Type_ID = ht.Type_ID
+            WHERE ht.Hotel_ID = old.Hotel_ID)
+        WHERE rowid = old.Hotel_ID;
+    END''',
+    # ----- attractions -----
+    '''CREATE TRIGGER attractions_fts_ai AFTER INSERT ON attractions BEGIN
+        INSERT INTO attractions_fts (rowid, title, title_alt, location, category)
+        VALUES (new.ID, new.Name, NULL, new.Address, new.Type);
+    END''',
+    '''CREATE TRIGGER attractions_fts_ad AFTER DELETE ON attractions BEGIN
+        DELETE FROM attractions_fts WHERE rowid = old.ID;
+    END''',
+    '''CREATE TRIGGER attractions_fts_au AFTER UPDATE OF ID, Name, Address, Type ON attractions BEGIN
+        DELETE FROM attractions_fts WHERE rowid = old.ID;
+        INSERT INTO attractions_fts (rowid, title, title_alt, location, category)
+        VALUES (new.ID, new.Name, NULL, new.Address, new.Type);
+    END''',
+]
+
+TRIGGER_NAMES = [t.split()[2] for t in TRIGGERS]
+
+
+def build_search_index():
+    """(Re)create the FTS5 tables, fill them and install the sync triggers"""
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        for name in TRIGGER_NAMES:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+        for table, source in SOURCES.items():
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            cursor.execute(f'''
+                CREATE VIRTUAL TABLE {table}
+                USING fts5({FTS_COLUMNS}, tokenize = 'trigram')
+            ''')
+            cursor.execute(f'INSERT INTO {table} (rowid, {FTS_COLUMNS}) {source}')
+            cursor.execute(f"INSERT INTO {table} ({table}) VALUES ('optimize')")
+            count = cursor.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+            print(f"[OK] {table}: {count} rows indexed")
+
+        for trigger in TRIGGERS:
+            cursor.execute(trigger)
+        print(f"[OK] {len(TRIGGERS)} sync triggers created")
+
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"[ERROR] Building search index failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("FTS5 Search Index Build")
+    print("=" * 60)
+    print(f"Database: {DB_PATH}\n")
+
+    build_search_index()
+
+    print("\n" + "=" * 60)
+    print("Build complete!")
+    print("=" * 60)
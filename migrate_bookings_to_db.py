@@ -0,0 +1,183 @@
+"""
+Migrate bookings.csv into travel.db
+Run this once (or again after regenerating bookings.csv with
+generate_bookings.py / generate_hotelReviews_all.py)
+
+Loads the bookings into a bookings table clustered by hotel:
+the WITHOUT ROWID primary key (hotel_id, check_in_date, booking_id)
+stores each hotel's bookings together in check-in order, so
+utils.database.get_booking_data reads one hotel / date range with a
+single index range scan instead of parsing the whole CSV.
+Dates are stored as ISO 'YYYY-MM-DD' text and parsed to datetime on load.
+
+Also builds booking_cube, one row per (hotel_id, month, status) with the
+booking count, priced booking count, revenue and average price (over
+priced bookings), aggregated in one vectorized pass; triggers on bookings
+keep it current as bookings are appended, updated or removed, so the revenue / occupancy charts and market analysis read the
+pre-aggregated rows instead of grouping raw bookings.
+"""
+import sqlite3
+import os
+
+import pandas as pd
+
+DB_PATH = os.path.join('data', 'travel.db')
+BOOKINGS_CSV = os.path.join('data', 'bookings.csv')
+
+COLUMNS = ['booking_id', 'hotel_id', 'booking_date', 'check_in_date', 'price_paid', 'status', 'room_type']
+
+# Bookings without a status are grouped under this value (booking_cube.status is NOT NULL)
+UNKNOWN_STATUS = 'Unknown'
+
+
+def _cube_key(ref):
+    """booking_cube key expressions for the old / new row of a bookings trigger"""
+    return f"{ref}.hotel_id", f"substr({ref}.check_in_date, 1, 7)", f"COALESCE({ref}.status, '{UNKNOWN_STATUS}')"
+
+
+def _cube_add(ref):
+    """Add one booking to its cube row (bookings without a price count toward booking_count only)"""
+    hotel_id, month, status = _cube_key(ref)
+    return f'''INSERT INTO booking_cube (hotel_id, month, status, booking_count, priced_count, revenue, avg_price)
+        VALUES ({hotel_id}, {month}, {status}, 1,
+                {ref}.price_paid IS NOT NULL, COALESCE({ref}.price_paid, 0), {ref}.price_paid)
+        ON CONFLICT (hotel_id, month, status) DO UPDATE SET
+            booking_count = booking_count + 1,
+            priced_count = priced_count + excluded.priced_count,
+            revenue = revenue + excluded.revenue,
+            avg_price = (revenue + excluded.revenue) / NULLIF(priced_count + excluded.priced_count, 0);'''
+
+
+def _cube_remove(ref):
+    """Back one booking out of its cube row, dropping the row once it is empty"""
+    hotel_id, month, status = _cube_key(ref)
+    where = f"hotel_id = {hotel_id} AND month = {month} AND status = {status}"
+    return f'''UPDATE booking_cube SET
+            booking_count = booking_count - 1,
+            priced_count = priced_count - ({ref}.price_paid IS NOT NULL),
+            revenue = revenue - COALESCE({ref}.price_paid, 0),
+            avg_price = (revenue - COALESCE({ref}.price_paid, 0))
+                / NULLIF(priced_count - ({ref}.price_paid IS NOT NULL), 0)
+        WHERE {where};
+        DELETE FROM booking_cube WHERE {where} AND booking_count <= 0;'''
+
+
+CUBE_TRIGGERS = [
+    f'''CREATE TRIGGER bookings_cube_ai AFTER INSERT ON bookings BEGIN
+        {_cube_add('new')}
+    END''',
+    f'''CREATE TRIGGER bookings_cube_ad AFTER DELETE ON bookings BEGIN
+        {_cube_remove('old')}
+    END''',
+    f'''CREATE TRIGGER bookings_cube_au
+    AFTER UPDATE OF hotel_id, check_in_date, price_paid, status ON bookings BEGIN
+        {_cube_remove('old')}
+        {_cube_add('new')}
+    END''',
+]
+
+
+def build_booking_cube(bookings):
+    """Aggregate bookings into (hotel_id, month, status) rows in one vectorized groupby"""
+    cube = (
+        bookings.assign(month=bookings['check_in_date'].str[:7],
+                        status=bookings['status'].fillna(UNKNOWN_STATUS))
+        .groupby(['hotel_id', 'month', 'status'], sort=True)['price_paid']
+        .agg(booking_count='size', priced_count='count', revenue='sum')
+        .reset_index()
+    )
+    # Average over priced bookings only; a missing price is not a zero price
+    cube['avg_price'] = cube['revenue'] / cube['priced_count'].where(cube['priced_count'] > 0)
+    return cube
+
+
+def migrate_bookings():
+    """Create the bookings table and indexes, then (re)load it from the CSV"""
+
+    if not os.path.exists(BOOKINGS_CSV):
+        print(f"[ERROR] {BOOKINGS_CSV} not found. Please run generate_bookings.py first.")
+        return
+
+    bookings = pd.read_csv(BOOKINGS_CSV)
+    bookings['hotel_id'] = pd.to_numeric(bookings['hotel_id'], errors='coerce')
+    bookings = bookings.dropna(subset=['hotel_id', 'check_in_date']).drop_duplicates('booking_id')
+    bookings['hotel_id'] = bookings['hotel_id'].astype(int)
+    for column in ('booking_date', 'check_in_date'):
+        bookings[column] = pd.to_datetime(bookings[column], errors='coerce').dt.strftime('%Y-%m-%d')
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('DROP TABLE IF EXISTS bookings')
+        cursor.execute('''
+            CREATE TABLE bookings (
+                booking_id TEXT NOT NULL,
+                hotel_id INTEGER NOT NULL,
+                booking_date TEXT,
+                check_in_date TEXT NOT NULL,
+                price_paid REAL,
+                status TEXT,
+                room_type TEXT,
+                PRIMARY KEY (hotel_id, check_in_date, booking_id)
+            ) WITHOUT ROWID
+        ''')
+        print("[OK] Table bookings created")
+
+        rows = bookings[COLUMNS].astype(object).where(bookings[COLUMNS].notna(), None)
+        cursor.executemany(
+            f'INSERT INTO bookings ({", ".join(COLUMNS)}) VALUES ({", ".join(["?"] * len(COLUMNS))})',
+            rows.itertuples(index=False, name=None)
+        )
+        print(f"[OK] {len(rows)} bookings loaded")
+
+        cursor.execute('CREATE UNIQUE INDEX idx_bookings_id ON bookings(booking_id)')
+        cursor.execute('CREATE INDEX idx_bookings_checkin ON bookings(check_in_date)')
+        print("[OK] Indexes idx_bookings_id, idx_bookings_checkin created")
+
+        cursor.execute('DROP TABLE IF EXISTS booking_cube')
+        cursor.execute('''
+            CREATE TABLE booking_cube (
+                hotel_id INTEGER NOT NULL,
+                month TEXT NOT NULL,
+                status TEXT NOT NULL,
+                booking_count INTEGER NOT NULL,
+                priced_count INTEGER NOT NULL,
+                revenue REAL NOT NULL,
+                avg_price REAL,
+                PRIMARY KEY (hotel_id, month, status)
+            ) WITHOUT ROWID
+        ''')
+        cube = build_booking_cube(bookings)
+        cube_columns = ['hotel_id', 'month', 'status', 'booking_count', 'priced_count', 'revenue', 'avg_price']
+        cube_rows = cube[cube_columns].astype(object).where(cube[cube_columns].notna(), None)
+        cursor.executemany(
+            f'INSERT INTO booking_cube ({", ".join(cube_columns)}) VALUES ({", ".join(["?"] * len(cube_columns))})',
+            cube_rows.itertuples(index=False, name=None)
+        )
+        for trigger in CUBE_TRIGGERS:
+            cursor.execute(trigger)
+        print(f"[OK] booking_cube: {len(cube)} rows, {len(CUBE_TRIGGERS)} triggers created")
+
+        conn.commit()
+        cursor.execute('ANALYZE')
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"[ERROR] Booking migration failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Booking Migration")
+    print("=" * 60)
+    print(f"Database: {DB_PATH}\n")
+
+    migrate_bookings()
+
+    print("\n" + "=" * 60)
+    print("Migration complete!")
+    print("=" * 60)
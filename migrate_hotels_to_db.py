@@ -0,0 +1,103 @@
+"""
+Migrate hotel CSVs into travel.db
+Run this once (or again after the CSVs change)
+
+Loads Hotels.csv, HotelTypes.csv and Types.csv into the hotels,
+hotel_types and types tables and creates the indexes used by
+utils.database.search_hotels
+"""
+import sqlite3
+import os
+
+import pandas as pd
+
+DB_PATH = os.path.join('data', 'travel.db')
+
+
+def migrate_hotels():
+    """Create hotel tables and indexes, then (re)load them from the CSVs"""
+
+    hotels = pd.read_csv(os.path.join('data', 'Hotels.csv'))
+    hotel_types = pd.read_csv(os.path.join('data', 'HotelTypes.csv')).drop_duplicates()
+    types = pd.read_csv(os.path.join('data', 'Types.csv'))
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('DROP TABLE IF EXISTS hotel_types')
+        cursor.execute('DROP TABLE IF EXISTS hotels')
+        cursor.execute('DROP TABLE IF EXISTS types')
+
+        cursor.execute('''
+            CREATE TABLE hotels (
+                Hotel_ID INTEGER PRIMARY KEY,
+                HotelName TEXT NOT NULL,
+                Address TEXT,
+                Rating REAL,
+                UserRatingsTotal REAL,
+                Lat REAL,
+                Long REAL,
+                Place_ID TEXT
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE types (
+                Type_ID INTEGER PRIMARY KEY,
+                TypeName TEXT NOT NULL UNIQUE
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE hotel_types (
+                Hotel_ID INTEGER NOT NULL,
+                Type_ID INTEGER NOT NULL,
+                PRIMARY KEY (Hotel_ID, Type_ID),
+                FOREIGN KEY (Hotel_ID) REFERENCES hotels (Hotel_ID),
+                FOREIGN KEY (Type_ID) REFERENCES types (Type_ID)
+            ) WITHOUT ROWID
+        ''')
+        print("[OK] Tables hotels, types, hotel_types created")
+
+        cursor.executemany(
+            'INSERT INTO hotels VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+            hotels[['Hotel_ID', 'HotelName', 'Address', 'Rating', 'UserRatingsTotal',
+                    'Lat', 'Long', 'Place_ID']].astype(object).where(hotels.notna(), None).values.tolist()
+        )
+        cursor.executemany(
+            'INSERT INTO types VALUES (?, ?)',
+            types[['Type_ID', 'TypeName']].values.tolist()
+        )
+        cursor.executemany(
+            'INSERT INTO hotel_types VALUES (?, ?)',
+            hotel_types[['Hotel_ID', 'Type_ID']].values.tolist()
+        )
+        print(f"[OK] Loaded {len(hotels)} hotels, {len(types)} types, {len(hotel_types)} hotel types")
+
+        cursor.execute('CREATE INDEX idx_hotels_rating ON hotels(Rating DESC)')
+        cursor.execute('CREATE INDEX idx_hotels_reviews ON hotels(UserRatingsTotal DESC)')
+        cursor.execute('CREATE INDEX idx_hotels_name ON hotels(HotelName)')
+        cursor.execute('CREATE INDEX idx_hotel_types_type ON hotel_types(Type_ID, Hotel_ID)')
+        print("[OK] Indexes created")
+
+        conn.commit()
+        cursor.execute('ANALYZE')
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"[ERROR] Hotel migration failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Hotel Database Migration")
+    print("=" * 60)
+    print(f"Database: {DB_PATH}\n")
+
+    migrate_hotels()
+
+    print("\n" + "=" * 60)
+    print("Migration complete!")
+    print("=" * 60)
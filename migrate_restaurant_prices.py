@@ -0,0 +1,121 @@
+"""
+Add numeric price columns to the restaurants table in travel.db
+Run this once (or again after the restaurant data changes)
+
+Parses LunchPrice / DinnerPrice strings such as '￥3000～￥3999',
+'～￥999', '￥30000～' and '￥10000+' into min / max / average columns,
+so search_restaurants can filter and sort on indexed numbers instead of
+evaluating SUBSTR/INSTR expressions for every row
+"""
+import re
+import sqlite3
+import os
+
+DB_PATH = os.path.join('data', 'travel.db')
+
+PRICE_COLUMNS = [
+    'LunchPriceMin', 'LunchPriceMax', 'LunchPriceAvg',
+    'DinnerPriceMin', 'DinnerPriceMax', 'DinnerPriceAvg',
+    'AvgMinPrice',
+]
+
+
+def parse_price_range(price_str):
+    """
+    Parse a price range string into (min, max, avg)
+
+    An open lower bound ('～￥999') gives min 0; an open upper bound
+    ('￥30000～', '￥10000+') gives max None. Returns (None, None, None)
+    for empty values.
+    """
+    if price_str is None or not str(price_str).strip():
+        return None, None, None
+
+    text = str(price_str).strip().replace(',', '')
+    if '～' in text:
+        low, high = text.split('～', 1)
+    else:
+        low, high = text, ''
+
+    low_nums = re.findall(r'\d+', low)
+    high_nums = re.findall(r'\d+', high)
+    price_min = float(low_nums[0]) if low_nums else 0.0
+    price_max = float(high_nums[0]) if high_nums else None
+
+    if not low_nums and price_max is None:
+        return None, None, None
+
+    if low_nums and price_max is not None:
+        price_avg = (price_min + price_max) / 2
+    elif low_nums:
+        price_avg = price_min
+    else:
+        # '～￥999': only the upper bound is known
+        price_avg = price_max
+    return price_min, price_max, price_avg
+
+
+def migrate_restaurant_prices():
+    """Add the numeric price columns and indexes, then fill them"""
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        cursor.execute('PRAGMA table_info(restaurants)')
+        existing = {row[1] for row in cursor.fetchall()}
+        for column in PRICE_COLUMNS:
+            if column not in existing:
+                cursor.execute(f'ALTER TABLE restaurants ADD COLUMN {column} REAL')
+        print("[OK] Price columns present")
+
+        cursor.execute('SELECT Restaurant_ID, LunchPrice, DinnerPrice FROM restaurants')
+        updates = []
+        for restaurant_id, lunch, dinner in cursor.fetchall():
+            lunch_min, lunch_max, lunch_avg = parse_price_range(lunch)
+            dinner_min, dinner_max, dinner_avg = parse_price_range(dinner)
+
+            # Value used by the search price filter: average of the lunch and
+            # dinner minimum prices, or whichever one exists (0 if neither)
+            mins = [p for p in (dinner_min, lunch_min) if p is not None]
+            avg_min_price = sum(mins) / len(mins) if mins else 0.0
+
+            updates.append((lunch_min, lunch_max, lunch_avg,
+                            dinner_min, dinner_max, dinner_avg,
+                            avg_min_price, restaurant_id))
+
+        cursor.executemany('''
+            UPDATE restaurants
+            SET LunchPriceMin = ?, LunchPriceMax = ?, LunchPriceAvg = ?,
+                DinnerPriceMin = ?, DinnerPriceMax = ?, DinnerPriceAvg = ?,
+                AvgMinPrice = ?
+            WHERE Restaurant_ID = ?
+        ''', updates)
+        print(f"[OK] Parsed prices for {len(updates)} restaurants")
+
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_rest_AvgMinPrice ON restaurants(AvgMinPrice)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_rest_DinnerPriceMin ON restaurants(DinnerPriceMin)')
+        print("[OK] Indexes idx_rest_AvgMinPrice, idx_rest_DinnerPriceMin created")
+
+        conn.commit()
+        cursor.execute('ANALYZE')
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"[ERROR] Price migration failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Restaurant Price Migration")
+    print("=" * 60)
+    print(f"Database: {DB_PATH}\n")
+
+    migrate_restaurant_prices()
+
+    print("\n" + "=" * 60)
+    print("Migration complete!")
+    print("=" * 60)
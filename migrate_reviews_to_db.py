@@ -0,0 +1,82 @@
+"""
+Migrate review CSVs into travel.db
+Run this once (or again after the CSVs change)
+
+Loads Reviews.csv and HotelReviews.csv into the restaurant_reviews and
+hotel_reviews tables, with composite (item, rating) and (item, date)
+indexes so the detail pages read one item's reviews with an index seek
+instead of parsing the CSVs on every view
+
+Re-run update_review_counts.py afterwards to rebuild review_stats and
+its triggers (dropping the review tables drops the triggers)
+"""
+import sqlite3
+import os
+
+import pandas as pd
+
+DB_PATH = os.path.join('data', 'travel.db')
+
+# (table, item id column, CSV file, extra columns)
+REVIEW_SOURCES = [
+    ('restaurant_reviews', 'Restaurant_ID', 'Reviews.csv', []),
+    ('hotel_reviews', 'Hotel_ID', 'HotelReviews.csv', ['Booking_ID']),
+]
+
+
+def migrate_reviews():
+    """Create review tables and indexes, then (re)load them from the CSVs"""
+
+    conn = sqlite3.connect(DB_PATH)
+    cursor = conn.cursor()
+
+    try:
+        for table, id_column, csv_name, extra_columns in REVIEW_SOURCES:
+            reviews = pd.read_csv(os.path.join('data', csv_name), encoding='utf-8-sig')
+            if 'Review_Date' not in reviews.columns:
+                reviews['Review_Date'] = None
+            columns = ['Review_ID', id_column, 'Review_Text', 'Review_Rating', 'Review_Date'] + extra_columns
+            reviews = reviews[columns].drop_duplicates('Review_ID')
+
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            extra_sql = ''.join(f',\n                {c} TEXT' for c in extra_columns)
+            cursor.execute(f'''
+                CREATE TABLE {table} (
+                    Review_ID INTEGER PRIMARY KEY,
+                    {id_column} INTEGER NOT NULL,
+                    Review_Text TEXT,
+                    Review_Rating INTEGER,
+                    Review_Date TEXT{extra_sql}
+                )
+            ''')
+
+            placeholders = ', '.join(['?'] * len(columns))
+            rows = reviews.astype(object).where(reviews.notna(), None).itertuples(index=False, name=None)
+            cursor.executemany(f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders})', rows)
+
+            cursor.execute(f'CREATE INDEX idx_{table}_rating ON {table}({id_column}, Review_Rating)')
+            cursor.execute(f'CREATE INDEX idx_{table}_date ON {table}({id_column}, Review_Date)')
+            print(f"[OK] {table}: {len(reviews)} reviews loaded, indexes idx_{table}_rating, idx_{table}_date created")
+
+        conn.commit()
+        cursor.execute('ANALYZE')
+        conn.commit()
+
+    except (sqlite3.Error, OSError, KeyError) as e:
+        print(f"[ERROR] Review migration failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
+
+
+if __name__ == '__main__':
+    print("=" * 60)
+    print("Review Migration")
+    print("=" * 60)
+    print(f"Database: {DB_PATH}\n")
+
+    migrate_reviews()
+
+    print("\n" + "=" * 60)
+    print("Migration complete!")
+    print("=" * 60)
@@ -4,6 +4,11 @@ import pandas as pd
 import plotly.express as px
 import dash_bootstrap_components as dbc
 
+from utils.database import get_hotel_booking_stats
+from utils.review_tags import tag_file_reviews, tag_ratios
+
+HOTEL_REVIEWS_CSV = 'data/HotelReviews.csv'
+
 # --- 1. 資料載入與整合 (Data Loading) ---
 def load_and_prepare_data():
     """
@@ -11,45 +16,32 @@ def load_and_prepare_data():
     回傳一個包含所有分析所需欄位的 Master DataFrame
     """
     try:
-        # 1. 讀取 CSV
+        # 1. 讀取 CSV（訂單統計由資料庫的 booking_cube 讀取）
         hotels = pd.read_csv('data/Hotels.csv')
-        bookings = pd.read_csv('data/bookings.csv')
-        reviews = pd.read_csv('data/HotelReviews.csv')
-        
-        # 統一欄位名稱
-        if 'hotel_id' in bookings.columns:
-            bookings.rename(columns={'hotel_id': 'Hotel_ID'}, inplace=True)
+        booking_stats = get_hotel_booking_stats()
+        reviews = pd.read_csv(HOTEL_REVIEWS_CSV)
             
         # 確保 ID 格式一致
-        for df in [hotels, bookings, reviews]:
+        for df in [hotels, booking_stats, reviews]:
             if 'Hotel_ID' in df.columns:
                 df['Hotel_ID'] = pd.to_numeric(df['Hotel_ID'], errors='coerce')
 
         # 2. 準備 [市場分析資料] (Market Data)
-        confirmed_bookings = bookings[bookings['status'] == 'Confirmed']
-        price_stats = confirmed_bookings.groupby('Hotel_ID')['price_paid'].mean().reset_index(name='avg_price')
-        
-        cancel_stats = bookings.groupby('Hotel_ID')['status'].apply(
-            lambda x: (x == 'Cancelled').sum() / len(x)
-        ).reset_index(name='cancellation_rate')
-
-        # 計算負評提及率
-        def count_negative(text_series):
-            keywords = ['dirty', 'noisy', 'poor', 'bad', 'terrible', '失望', '不佳', 'worst']
-            count = 0
-            for text in text_series:
-                text = str(text).lower()
-                if any(k in text for k in keywords):
-                    count += 1
-            return count
-
-        review_aggs = reviews.groupby('Hotel_ID').agg({
-            'Review_Rating': 'mean',
-            'Review_ID': 'count',
-            'Review_Text': count_negative
-        }).reset_index()
-        review_aggs.rename(columns={'Review_Rating': 'avg_rating', 'Review_ID': 'review_count', 'Review_Text': 'negative_mentions'}, inplace=True)
-        review_aggs['negative_ratio'] = review_aggs['negative_mentions'] / review_aggs['review_count']
+        price_stats = booking_stats[['Hotel_ID', 'confirmed_avg_price']].rename(
+            columns={'confirmed_avg_price': 'avg_price'}
+        ).dropna(subset=['avg_price'])
+        cancel_stats = booking_stats[['Hotel_ID', 'cancellation_rate']]
+
+        # 評論標籤（單次掃描所有評論文字，保存每則評論的標籤遮罩；檔案未變更時沿用快取）
+        reviews['Tag_Mask'] = tag_file_reviews(HOTEL_REVIEWS_CSV, reviews['Review_Text'])
+        review_aggs = reviews.groupby('Hotel_ID').agg(
+            avg_rating=('Review_Rating', 'mean'),
+            review_count=('Review_ID', 'count'),
+        ).reset_index()
+        tag_stats = tag_ratios(reviews['Hotel_ID'], reviews['Tag_Mask'])
+        review_aggs = review_aggs.merge(
+            tag_stats.drop(columns='review_count').rename_axis('Hotel_ID').reset_index(), on='Hotel_ID', how='left'
+        )
 
         # 合併資料
         market_df = pd.merge(hotels[['Hotel_ID', 'HotelName']], price_stats, on='Hotel_ID', how='inner')
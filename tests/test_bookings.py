@@ -0,0 +1,103 @@
+import pandas as pd
+
+import migrate_bookings_to_db
+from utils import database
+
+
+def _bookings_db(tmp_path, monkeypatch):
+    csv_path = tmp_path / 'bookings.csv'
+    pd.DataFrame({
+        'booking_id': ['a', 'b', 'c', 'd', 'e'],
+        'hotel_id': [1, 1, 1, 2, 2],
+        'booking_date': ['2024-01-01', '2024-01-05', '2024-02-01', '2024-01-02', '2024-03-01'],
+        'check_in_date': ['2024-01-10', '2024-01-20', '2024-02-15', '2024-01-12', '2024-03-10'],
+        'price_paid': [100.0, 0.0, 300.0, 400.0, 500.0],
+        'status': ['Confirmed', 'Cancelled', 'Confirmed', 'Confirmed', 'Confirmed'],
+        'room_type': ['Double'] * 5,
+    }).to_csv(csv_path, index=False)
+    db_path = str(tmp_path / 'travel.db')
+    monkeypatch.setattr(migrate_bookings_to_db, 'BOOKINGS_CSV', str(csv_path))
+    monkeypatch.setattr(migrate_bookings_to_db, 'DB_PATH', db_path)
+    migrate_bookings_to_db.migrate_bookings()
+    monkeypatch.setattr(database, 'DB_PATH', db_path)
+
+
+def test_booking_filters_push_down(tmp_path, monkeypatch):
+    _bookings_db(tmp_path, monkeypatch)
+    df = database.get_booking_data(hotel_id=1, start_date='2024-01-15')
+    assert df['booking_id'].tolist() == ['b', 'c']
+    assert pd.api.types.is_datetime64_any_dtype(df['check_in_date'])
+
+    revenue = database.get_revenue_trend(1)
+    assert revenue.to_dict('records') == [{'Month': '2024-01', 'Revenue': 100.0}, {'Month': '2024-02', 'Revenue': 300.0}]
+    status = database.get_occupancy_status()
+    assert status[status['Month'] == '2024-01'].set_index('status')['Count'].to_dict() == {'Cancelled': 1, 'Confirmed': 2}
+
+
+def test_missing_bookings_table_returns_empty(tmp_path, monkeypatch):
+    monkeypatch.setattr(database, 'DB_PATH', str(tmp_path / 'empty.db'))
+    import sqlite3
+    sqlite3.connect(str(tmp_path / 'empty.db')).close()
+    assert database.get_booking_data(hotel_id=1).empty
+
+
+def test_booking_cube_matches_raw_aggregation(tmp_path, monkeypatch):
+    _bookings_db(tmp_path, monkeypatch)
+    cube = database.get_booking_cube()
+    raw = database.get_booking_data()
+    expected = raw.assign(month=raw['check_in_date'].dt.strftime('%Y-%m')).groupby(
+        ['hotel_id', 'month', 'status'])['price_paid'].agg(['size', 'sum']).reset_index()
+    assert cube['booking_count'].tolist() == expected['size'].tolist()
+    assert cube['revenue'].tolist() == expected['sum'].tolist()
+
+    stats = database.get_hotel_booking_stats().set_index('Hotel_ID')
+    assert stats.loc[1, 'cancellation_rate'] == 1 / 3
+    assert stats.loc[1, 'confirmed_avg_price'] == 200.0
+    assert stats.loc[2, 'avg_price'] == 450.0
+
+
+def test_booking_cube_follows_appended_bookings(tmp_path, monkeypatch):
+    import sqlite3
+    _bookings_db(tmp_path, monkeypatch)
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.execute("INSERT INTO bookings VALUES ('f', 1, '2024-01-03', '2024-01-25', 200.0, 'Confirmed', 'Double')")
+    conn.execute("INSERT INTO bookings VALUES ('g', 3, '2024-01-03', '2024-04-01', 50.0, 'Confirmed', 'Single')")
+    conn.execute("DELETE FROM bookings WHERE booking_id = 'c'")
+    conn.commit()
+    conn.close()
+
+    cube = database.get_booking_cube(hotel_id=1).set_index(['month', 'status'])
+    assert cube.loc[('2024-01', 'Confirmed'), 'booking_count'] == 2
+    assert cube.loc[('2024-01', 'Confirmed'), 'avg_price'] == 150.0
+    assert ('2024-02', 'Confirmed') not in cube.index
+    assert database.get_revenue_trend(3).to_dict('records') == [{'Month': '2024-04', 'Revenue': 50.0}]
+
+
+def test_booking_cube_follows_updates_and_skips_missing_prices(tmp_path, monkeypatch):
+    import sqlite3
+    _bookings_db(tmp_path, monkeypatch)
+    conn = sqlite3.connect(database.DB_PATH)
+    conn.execute("INSERT INTO bookings VALUES ('f', 1, '2024-01-03', '2024-01-25', NULL, 'Confirmed', 'Double')")
+    conn.execute("INSERT INTO bookings VALUES ('g', 1, '2024-01-03', '2024-01-26', 80.0, NULL, 'Double')")
+    conn.commit()
+
+    cube = database.get_booking_cube(hotel_id=1).set_index(['month', 'status'])
+    assert cube.loc[('2024-01', 'Confirmed'), ['booking_count', 'priced_count', 'avg_price']].tolist() == [2, 1, 100.0]
+    assert cube.loc[('2024-01', migrate_bookings_to_db.UNKNOWN_STATUS), 'revenue'] == 80.0
+
+    # 修改金額、狀態與入住月份：舊列扣除、新列加入
+    conn.execute("UPDATE bookings SET price_paid = 300.0 WHERE booking_id = 'f'")
+    conn.execute("UPDATE bookings SET status = 'Confirmed', check_in_date = '2024-02-01' WHERE booking_id = 'g'")
+    conn.commit()
+    conn.close()
+
+    cube = database.get_booking_cube(hotel_id=1).set_index(['month', 'status'])
+    assert cube.loc[('2024-01', 'Confirmed'), ['booking_count', 'revenue', 'avg_price']].tolist() == [2, 400.0, 200.0]
+    assert cube.loc[('2024-02', 'Confirmed'), ['booking_count', 'revenue']].tolist() == [2, 380.0]
+    assert ('2024-01', migrate_bookings_to_db.UNKNOWN_STATUS) not in cube.index
+
+    raw = database.get_booking_data(hotel_id=1)
+    rebuilt = migrate_bookings_to_db.build_booking_cube(
+        raw.assign(check_in_date=raw['check_in_date'].dt.strftime('%Y-%m-%d')))
+    assert rebuilt['revenue'].tolist() == cube['revenue'].tolist()
+    assert rebuilt['avg_price'].tolist() == cube['avg_price'].tolist()
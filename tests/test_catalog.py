@@ -0,0 +1,96 @@
+from utils import catalog
+from utils.database import get_hotel_by_id, get_all_hotels, get_attraction_by_id
+
+
+def test_catalog_loads_once():
+    catalog.invalidate()
+    first = catalog.get_table('hotels')
+    assert catalog.get_table('hotels') is first
+    assert len(first) > 0
+
+
+def test_hotel_lookup_returns_copy():
+    hid = int(get_all_hotels().iloc[0]['Hotel_ID'])
+    h = get_hotel_by_id(hid)
+    h['HotelName'] = 'changed'
+    assert get_hotel_by_id(hid)['HotelName'] != 'changed'
+    assert isinstance(h['Types'], list)
+
+
+def test_invalidate_bumps_version():
+    before = catalog.catalog_version()
+    catalog.invalidate('attractions')
+    assert catalog.catalog_version() == before + 1
+    assert get_attraction_by_id(1) is not None
+
+
+def test_failed_load_is_not_cached(monkeypatch):
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise RuntimeError('disk error')
+
+    catalog.invalidate('attractions')
+    monkeypatch.setitem(catalog._LOADERS, 'attractions', broken)
+    table = catalog.get_table('attractions')
+    assert table.failed and len(table) == 0
+    catalog.get_table('attractions')
+    assert len(calls) == 2
+    monkeypatch.undo()
+    assert not catalog.get_table('attractions').failed
+
+
+def test_catalog_file_change_and_pooled_write_bump_version(tmp_path, monkeypatch):
+    import sqlite3
+
+    from utils import db_pool
+
+    path = str(tmp_path / 'travel.db')
+    sqlite3.connect(path).execute('CREATE TABLE t (x)').connection.commit()
+    monkeypatch.setattr(catalog, 'DB_PATH', path)
+    monkeypatch.setattr(db_pool, 'CATALOG_DB_PATH', path)
+    before = catalog.catalog_version()
+
+    # 其他行程寫入：檔案簽章改變
+    conn = sqlite3.connect(path)
+    conn.execute('INSERT INTO t VALUES (1)')
+    conn.commit()
+    conn.close()
+    assert catalog.catalog_version() == before + 1
+
+    # 本行程經由連線池寫入
+    monkeypatch.setattr(catalog, '_check_file', lambda: None)
+    with db_pool.pooled_connection(path) as conn:
+        conn.execute('INSERT INTO t VALUES (2)')
+        conn.commit()
+    assert catalog.catalog_version() == before + 2
+
+
+def test_user_table_writes_keep_the_catalog_cache(tmp_path, monkeypatch):
+    import sqlite3
+
+    from utils import db_pool
+
+    path = str(tmp_path / 'travel.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('CREATE TABLE t (x); CREATE TABLE activities (trip_id, notes);')
+    conn.close()
+    monkeypatch.setattr(catalog, 'DB_PATH', path)
+    monkeypatch.setattr(db_pool, 'CATALOG_DB_PATH', path)
+    before = catalog.catalog_version()
+
+    # 行程資料寫入 travel.db 的 activities：目錄快取與版本不變
+    for _ in range(2):
+        with db_pool.pooled_connection(path) as conn:
+            conn.execute('INSERT INTO activities VALUES (1, ?)', ('note',))
+            conn.commit()
+        assert catalog.catalog_version() == before
+
+    # 同一個語句再次執行到目錄資料表時仍會被記錄（不受語句快取影響）
+    for _ in range(2):
+        with db_pool.pooled_connection(path) as conn:
+            conn.execute('INSERT INTO t VALUES (?)', (1,))
+            conn.commit()
+        assert catalog.catalog_version() > before
+        before = catalog.catalog_version()
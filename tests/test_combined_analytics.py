@@ -0,0 +1,28 @@
+import numpy as np
+
+from utils import catalog, database
+
+
+def test_combined_analytics_is_deterministic_and_cached():
+    database.ANALYTICS_CACHE.clear()
+    first = database.get_combined_analytics_data()
+    hits = database.ANALYTICS_CACHE.hits
+    second = database.get_combined_analytics_data()
+    assert database.ANALYTICS_CACHE.hits == hits + 1
+    assert first.equals(second)
+    assert list(first.columns) == database.COMBINED_ANALYTICS_COLUMNS
+
+    # 返回副本，呼叫端修改不影響快取
+    second.loc[:, 'Price'] = -1
+    assert (database.get_combined_analytics_data()['Price'] >= 0).all()
+
+    catalog.invalidate('hotels')
+    assert database.get_combined_analytics_data().equals(first)
+
+
+def test_hotel_price_estimate_is_stable_per_hotel():
+    prices = database.estimate_hotel_prices([1, 2, 3], [4.0, np.nan, 4.0])
+    assert prices.tolist() == database.estimate_hotel_prices([1, 2, 3], [4.0, 3.5, 4.0]).tolist()
+    assert prices[0] != prices[2]
+    low, high = database.HOTEL_PRICE_FACTOR_RANGE
+    assert 15000 * low <= prices[0] <= 15000 * high
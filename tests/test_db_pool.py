@@ -0,0 +1,60 @@
+from utils import db_pool
+
+
+def test_connection_reused_per_thread():
+    first = db_pool.get_connection(db_pool.CATALOG_DB_PATH, read_only=True)
+    assert db_pool.get_connection(db_pool.CATALOG_DB_PATH, read_only=True) is first
+
+
+def test_reset_reopens_connection():
+    first = db_pool.get_connection(db_pool.CATALOG_DB_PATH, read_only=True)
+    db_pool.reset(db_pool.CATALOG_DB_PATH, read_only=True)
+    second = db_pool.get_connection(db_pool.CATALOG_DB_PATH, read_only=True)
+    assert second is not first
+    assert second.execute("SELECT COUNT(*) FROM restaurants").fetchone()[0] > 0
+
+
+def test_catalog_connection_is_read_only():
+    with db_pool.pooled_connection(db_pool.CATALOG_DB_PATH, read_only=True) as conn:
+        try:
+            conn.execute("CREATE TABLE should_fail (x)")
+        except Exception:
+            pass
+        else:
+            raise AssertionError("catalog connection accepted a write")
+
+
+def test_read_only_connection_sees_external_writes(tmp_path):
+    import sqlite3
+
+    path = str(tmp_path / 'catalog.db')
+    writer = sqlite3.connect(path)
+    writer.execute('CREATE TABLE t (x)')
+    writer.commit()
+    with db_pool.pooled_connection(path, read_only=True) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 0
+    writer.execute('INSERT INTO t VALUES (1)')
+    writer.commit()
+    writer.close()
+    with db_pool.pooled_connection(path, read_only=True) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 1
+
+
+def test_nested_use_keeps_the_outer_transaction(tmp_path):
+    path = str(tmp_path / 'users.db')
+    with db_pool.pooled_connection(path) as conn:
+        conn.execute('CREATE TABLE t (x)')
+        conn.commit()
+
+    with db_pool.pooled_connection(path) as outer:
+        outer.execute('INSERT INTO t VALUES (1)')
+        with db_pool.pooled_connection(path) as inner:
+            assert inner is outer
+            inner.execute('SELECT COUNT(*) FROM t').fetchone()
+        assert outer.in_transaction
+        outer.commit()
+
+    with db_pool.pooled_connection(path) as conn:
+        conn.execute('INSERT INTO t VALUES (2)')
+    with db_pool.pooled_connection(path) as conn:
+        assert [tuple(row) for row in conn.execute('SELECT x FROM t')] == [(1,)]
@@ -0,0 +1,214 @@
+import sqlite3
+import time
+
+import pytest
+from dash import Patch
+
+from utils import favorites
+from utils.favorites import FavoritesService, cached_favorite_ids, is_cached_favorite
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    path = str(tmp_path / 'users.db')
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE favorites (
+            id INTEGER PRIMARY KEY, user_id INTEGER, item_type TEXT, item_id INTEGER,
+            item_name TEXT, item_data TEXT, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE (user_id, item_type, item_id)
+        )
+    ''')
+    conn.close()
+    monkeypatch.setattr(favorites, 'DB_PATH', path)
+    monkeypatch.setattr(favorites, 'FAVORITES', FavoritesService())
+    return favorites.FAVORITES
+
+
+def test_snapshot_loads_all_types_in_one_query(service):
+    favorites.add_favorite(1, 'restaurant', 12, 'Ramen')
+    favorites.add_favorite(1, 'hotel', 3, 'Inn')
+    favorites.add_favorite(2, 'hotel', 4, 'Other')
+
+    cache = service.snapshot(1)
+    assert cache['restaurants'] == {'12': 1}
+    assert cache['hotels'] == {'3': 1}
+    assert cache['attractions'] == {}
+    assert cache['version'] == service.version(1)
+
+    assert cached_favorite_ids(cache, 'restaurant') == {12}
+    assert is_cached_favorite(cache, 'hotel', 3)
+    assert not is_cached_favorite(cache, 'hotel', 4)
+    assert not is_cached_favorite(None, 'hotel', 3)
+
+
+def test_toggle_sends_patch_only_when_client_is_current(service):
+    cache = service.snapshot(1)
+    base = service.version(1)
+    success, favorited, _ = favorites.toggle_favorite(1, 'attraction', 7, 'Temple')
+    assert success and favorited and service.version(1) == base + 1
+
+    update = service.toggle_update(1, cache['version'], base, 'attraction', 7, favorited)
+    assert isinstance(update, Patch)
+    operations = update.to_plotly_json()['operations']
+    assert operations[0] == {'operation': 'Assign', 'location': ['attractions', '7'], 'params': {'value': 1}}
+    assert operations[1]['params'] == {'value': base + 1}
+
+    # 另一個分頁已改過收藏：版本不符時送出完整快取
+    stale = service.toggle_update(1, base - 1, base, 'attraction', 7, favorited)
+    assert stale == {'restaurants': {}, 'hotels': {}, 'attractions': {'7': 1}, 'version': base + 1}
+
+    base = service.version(1)
+    success, favorited, _ = favorites.toggle_favorite(1, 'attraction', 7, 'Temple')
+    assert success and not favorited
+    operations = service.toggle_update(1, base, base, 'attraction', 7, favorited).to_plotly_json()['operations']
+    assert operations[0] == {'operation': 'Delete', 'location': ['attractions', '7'], 'params': {}}
+
+
+def test_toggle_sends_snapshot_when_another_change_slipped_in(service):
+    base = service.version(1)
+    cache = service.snapshot(1)
+    favorites.add_favorite(1, 'hotel', 3, 'Inn')
+    # 同一時間另一個請求（或對帳執行緒）也修改了收藏
+    favorites.add_favorite(1, 'hotel', 4, 'Other')
+    assert service.version(1) == base + 2
+
+    update = service.toggle_update(1, cache['version'], base, 'hotel', 3, True)
+    assert update == {'restaurants': {}, 'hotels': {'3': 1, '4': 1}, 'attractions': {}, 'version': base + 2}
+
+
+def test_clear_update_empties_cleared_types(service):
+    favorites.add_favorite(1, 'hotel', 3, 'Inn')
+    base = service.version(1)
+    assert favorites.clear_user_favorites(1, 'hotel')[0]
+    operations = service.clear_update(1, base, base, 'hotel').to_plotly_json()['operations']
+    assert [op['location'] for op in operations] == [['hotels'], ['version']]
+    assert operations[0]['params'] == {'value': {}}
+
+
+def test_favorites_with_details_joins_catalog_and_drops_orphans(service, tmp_path, monkeypatch):
+    from utils import database
+    from utils.write_behind import get_write_queue
+
+    catalog_path = str(tmp_path / 'travel.db')
+    conn = sqlite3.connect(catalog_path)
+    conn.executescript('''
+        CREATE TABLE restaurants (Restaurant_ID INTEGER PRIMARY KEY, Name TEXT);
+        CREATE TABLE hotels (Hotel_ID INTEGER PRIMARY KEY, HotelName TEXT);
+        CREATE TABLE types (Type_ID INTEGER PRIMARY KEY, TypeName TEXT);
+        CREATE TABLE hotel_types (Hotel_ID INTEGER, Type_ID INTEGER);
+        CREATE TABLE attractions (ID INTEGER PRIMARY KEY, Name TEXT);
+        INSERT INTO restaurants VALUES (1, 'Ramen'), (2, 'Sushi');
+        INSERT INTO hotels VALUES (3, 'Inn');
+        INSERT INTO types VALUES (1, 'lodging'), (2, 'spa');
+        INSERT INTO hotel_types VALUES (3, 1), (3, 2);
+        INSERT INTO attractions VALUES (5, 'Temple');
+    ''')
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(database, 'DB_PATH', catalog_path)
+
+    for item_type, item_id in [('restaurant', 2), ('restaurant', 1), ('restaurant', 9), ('hotel', 3), ('attraction', 4)]:
+        favorites.add_favorite(1, item_type, item_id, 'x')
+    version = service.version(1)
+
+    details = database.get_favorites_with_details(1)
+    assert details['restaurant']['Name'].tolist() == ['Ramen', 'Sushi']
+    assert details['hotel']['Types'].tolist() == [['lodging', 'spa']]
+    assert details['attraction'].empty
+
+    get_write_queue(favorites.DB_PATH).flush()
+    assert favorites.get_favorites_count(1) == {'restaurant': 2, 'hotel': 1, 'attraction': 0, 'total': 3}
+    assert service.version(1) == version + 1
+
+
+def test_favorite_cards_render_from_snapshots_and_reconcile(service, tmp_path, monkeypatch):
+    import pandas as pd
+
+    from utils import catalog, database
+
+    catalog_path = str(tmp_path / 'travel.db')
+    conn = sqlite3.connect(catalog_path)
+    conn.executescript('''
+        CREATE TABLE restaurants (Restaurant_ID INTEGER PRIMARY KEY, Name TEXT);
+        CREATE TABLE hotels (Hotel_ID INTEGER PRIMARY KEY, HotelName TEXT);
+        CREATE TABLE attractions (ID INTEGER PRIMARY KEY, Name TEXT);
+        INSERT INTO restaurants VALUES (1, 'Ramen');
+        INSERT INTO hotels VALUES (5, 'Inn');
+    ''')
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(database, 'DB_PATH', catalog_path)
+
+    tables = {
+        'restaurants': catalog.CatalogTable('restaurants', pd.DataFrame({
+            'Restaurant_ID': [1, 2], 'Name': ['Ramen', 'Sushi'], 'JapaneseName': ['ら', 'す'],
+            'FirstCategory': ['Noodle', 'Sushi'], 'Station': ['Kyoto', 'Gion'], 'TotalRating': [4.0, 3.5],
+        }), 'Restaurant_ID'),
+        'hotels': catalog.CatalogTable('hotels', pd.DataFrame({'Hotel_ID': [5], 'HotelName': ['Inn']}), 'Hotel_ID'),
+        'attractions': catalog.CatalogTable('attractions', pd.DataFrame(), 'ID'),
+    }
+    monkeypatch.setattr(catalog, 'get_table', tables.__getitem__)
+    monkeypatch.setattr(database, '_reconciled_catalog_version', None)
+    monkeypatch.setattr(database, '_reconciled_at', 0.0)
+
+    card = database.get_favorite_card('restaurant', 1)
+    favorites.add_favorite(1, 'restaurant', 1, 'Ramen', {'rating': 4.0, 'card': card})
+    favorites.add_favorite(1, 'restaurant', 2, 'Sushi', {'rating': 3.5})
+    favorites.add_favorite(1, 'hotel', 3, 'Gone')
+    favorites.add_favorite(2, 'attraction', 9, 'Temple')
+
+    cards = database.get_favorite_cards(1)
+    assert cards['restaurant']['Name'].tolist() == ['Sushi', 'Ramen']
+    assert list(cards['hotel'].columns) == favorites.FAVORITE_CARD_COLUMNS['hotel'] and cards['hotel'].empty
+
+    # 目錄變更：快照過期、餐廳 2 與旅館 3 已刪除；景點目錄為空，不清除景點收藏
+    tables['restaurants'].get = lambda item_id: {**card, 'TotalRating': 4.5} if item_id == 1 else None
+    version = service.version(1)
+    assert database.reconcile_favorite_snapshots() == {'checked': 3, 'updated': 1, 'removed': 2}
+    assert database.reconcile_favorite_snapshots() == {'checked': 0, 'updated': 0, 'removed': 0}
+    assert service.version(1) == version + 1
+    assert favorites.get_favorites_count(2)['attraction'] == 1
+
+    monkeypatch.setattr(catalog, 'get_table', lambda name: catalog.CatalogTable(name, pd.DataFrame(), 'ID'))
+    cards = database.get_favorite_cards(1)
+    assert cards['restaurant'].to_dict('records') == [{**card, 'TotalRating': 4.5}]
+    assert favorites.get_user_favorites(1)[0]['item_data']['rating'] == 4.0
+
+
+def test_reconcile_skips_failed_catalog_and_caps_deletions(service, tmp_path, monkeypatch):
+    import pandas as pd
+
+    from utils import catalog, database
+
+    catalog_path = str(tmp_path / 'travel.db')
+    conn = sqlite3.connect(catalog_path)
+    conn.executescript('''
+        CREATE TABLE restaurants (Restaurant_ID INTEGER PRIMARY KEY, Name TEXT);
+        CREATE TABLE hotels (Hotel_ID INTEGER PRIMARY KEY, HotelName TEXT);
+        CREATE TABLE attractions (ID INTEGER PRIMARY KEY, Name TEXT);
+        INSERT INTO restaurants VALUES (1, 'Ramen');
+    ''')
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(database, 'DB_PATH', catalog_path)
+    for item_id in (2, 3, 4):
+        favorites.add_favorite(1, 'restaurant', item_id, 'Gone')
+
+    # 載入失敗的目錄不可信：不更新也不刪除
+    monkeypatch.setattr(catalog, 'get_table',
+                        lambda name: catalog.CatalogTable(name, pd.DataFrame(), 'ID', failed=True))
+    assert database.reconcile_favorite_snapshots(force=True) == {'checked': 0, 'updated': 0, 'removed': 0}
+    assert favorites.get_favorites_count(1)['restaurant'] == 3
+
+    restaurants = catalog.CatalogTable('restaurants', pd.DataFrame({'Restaurant_ID': [1]}), 'Restaurant_ID')
+    monkeypatch.setattr(catalog, 'get_table',
+                        lambda name: restaurants if name == 'restaurants' else catalog.CatalogTable(name, pd.DataFrame(), 'ID'))
+    monkeypatch.setattr(database, 'FAVORITE_ORPHAN_LIMIT', 2)
+    assert database.reconcile_favorite_snapshots(force=True)['removed'] == 2
+    assert favorites.get_favorites_count(1)['restaurant'] == 1
+
+    # 目錄版本未變更時，超過完整檢查間隔仍會執行
+    monkeypatch.setattr(database, '_reconciled_at', time.monotonic() - database.FAVORITE_RECONCILE_FULL_INTERVAL)
+    assert database.reconcile_favorite_snapshots()['removed'] == 1
+    assert favorites.get_favorites_count(1)['restaurant'] == 0
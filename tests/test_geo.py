@@ -0,0 +1,36 @@
+import numpy as np
+
+from utils.geo import bounding_box, distance_matrix, distances_from, haversine_km, within_km
+
+
+def test_haversine_known_distance():
+    # Kyoto Station -> Osaka Station, roughly 40 km in a straight line
+    assert 38 < haversine_km(34.9858, 135.7588, 34.7025, 135.4959) < 41
+    assert haversine_km(35.0, 135.0, 35.0, 135.0) == 0.0
+
+
+def test_distance_matrix_matches_pairwise():
+    rng = np.random.default_rng(1)
+    lats1, lons1 = 34.9 + rng.random(5) * 0.2, 135.6 + rng.random(5) * 0.2
+    lats2, lons2 = 34.9 + rng.random(7) * 0.2, 135.6 + rng.random(7) * 0.2
+    matrix = distance_matrix(lats1, lons1, lats2, lons2)
+    assert matrix.shape == (5, 7)
+    for i in range(5):
+        np.testing.assert_allclose(matrix[i], distances_from(lats1[i], lons1[i], lats2, lons2))
+
+    single = distance_matrix(lats1, lons1, dtype=np.float32)
+    assert single.dtype == np.float32
+    np.testing.assert_allclose(np.diag(single), 0.0, atol=1e-3)
+    np.testing.assert_allclose(single, single.T, atol=1e-3)
+
+
+def test_within_km_uses_bbox_without_dropping_points():
+    rng = np.random.default_rng(2)
+    lats, lons = 34.9 + rng.random(300) * 0.2, 135.65 + rng.random(300) * 0.2
+    idx, dist = within_km(35.0, 135.75, lats, lons, 4.0)
+    full = distances_from(35.0, 135.75, lats, lons)
+    assert set(idx.tolist()) == set(np.flatnonzero(full <= 4.0).tolist())
+    np.testing.assert_allclose(dist, full[idx])
+
+    min_lat, max_lat, min_lon, max_lon = bounding_box(35.0, 135.75, 4.0)
+    assert min_lat < 35.0 < max_lat and min_lon < 135.75 < max_lon
@@ -0,0 +1,26 @@
+import pandas as pd
+
+from utils.database import (count_hotels, count_restaurants, page_clause, search_hotels,
+                            search_restaurants)
+
+
+def test_page_clause():
+    assert page_clause(None, 15) == ('', [])
+    assert page_clause(3, 15) == ('LIMIT ? OFFSET ?', [15, 30])
+    assert page_clause(0, 15) == ('', [])
+
+
+def test_pages_concatenate_to_full_result():
+    filters = {'keyword': 'ra', 'rating': '3-4'}
+    full = search_restaurants(**filters)
+    total = count_restaurants(**filters)
+    assert total == len(full)
+    pages = [search_restaurants(**filters, page=p, page_size=10) for p in range(1, total // 10 + 2)]
+    assert pd.concat(pages)['Restaurant_ID'].tolist() == full['Restaurant_ID'].tolist()
+
+
+def test_hotel_page_and_count():
+    full = search_hotels(keyword='kyoto')
+    assert count_hotels(keyword='kyoto') == len(full)
+    page = search_hotels(keyword='kyoto', page=2, page_size=5)
+    assert page['Hotel_ID'].tolist() == full['Hotel_ID'].tolist()[5:10]
@@ -0,0 +1,69 @@
+import pandas as pd
+
+from utils import catalog
+from utils.query_cache import QueryCache, cached_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_ttl():
+    clock = FakeClock()
+    cache = QueryCache(maxsize=2, ttl=10, clock=clock)
+    cache.store('a', 1)
+    cache.store('b', 2)
+    assert cache.lookup('a') == (True, 1)
+    cache.store('c', 3)  # 'b' is least recently used
+    assert cache.lookup('b') == (False, None)
+    assert cache.stats()['evictions'] == 1
+
+    clock.now = 11
+    assert cache.lookup('a') == (False, None)
+    assert cache.stats()['expirations'] == 1
+
+
+def test_cleared_when_catalog_version_changes():
+    cache = QueryCache()
+    cache.store('a', 1)
+    catalog.invalidate('missing-table')
+    assert cache.lookup('a') == (False, None)
+
+
+def test_decorator_normalizes_arguments_and_copies_frames():
+    cache = QueryCache()
+    calls = []
+
+    @cached_query(cache, {'stations': lambda v: tuple(sorted(v)) if v else None})
+    def search(keyword=None, stations=None):
+        calls.append((keyword, stations))
+        return pd.DataFrame({'x': [1, 2]})
+
+    first = search(stations=['b', 'a'])
+    first['x'] = 0
+    second = search(None, ['a', 'b'])
+    assert calls == [(None, ('a', 'b'))]
+    assert second['x'].tolist() == [1, 2]
+    assert cache.stats()['hits'] == 1
+
+
+def test_errors_fall_back_without_being_cached():
+    cache = QueryCache()
+    failures = [RuntimeError('database is locked')]
+
+    @cached_query(cache, fallback=pd.DataFrame)
+    def search():
+        if failures:
+            raise failures.pop()
+        return pd.DataFrame({'Types': [['spa', 'lodging']]})
+
+    assert search().empty
+    assert len(cache) == 0
+
+    first = search()
+    first.loc[0, 'Types'].append('onsen')
+    assert search().loc[0, 'Types'] == ['spa', 'lodging']
@@ -0,0 +1,36 @@
+import sqlite3
+
+import update_review_counts
+
+
+def test_triggers_handle_unrated_reviews(tmp_path, monkeypatch):
+    path = str(tmp_path / 'travel.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE restaurant_reviews (Review_ID INTEGER PRIMARY KEY, Restaurant_ID INTEGER,
+                                         Review_Rating REAL, Review_Date TEXT);
+        CREATE TABLE hotel_reviews (Review_ID INTEGER PRIMARY KEY, Hotel_ID INTEGER,
+                                    Review_Rating REAL, Review_Date TEXT);
+        INSERT INTO hotel_reviews VALUES (1, 7, NULL, '2024-01-01');
+    ''')
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(update_review_counts, 'DB_PATH', path)
+    update_review_counts.update_review_counts()
+
+    conn = sqlite3.connect(path)
+    columns = 'Review_Count, Star1, Star2, Star3, Star4, Star5, Rating_Sum, Rating_Mean'
+    stats = f"SELECT {columns} FROM review_stats WHERE Item_ID = ?"
+    assert conn.execute(stats, (7,)).fetchone() == (1, 0, 0, 0, 0, 0, 0.0, None)
+
+    conn.execute("INSERT INTO restaurant_reviews VALUES (1, 3, NULL, '2024-01-01')")
+    conn.execute("INSERT INTO restaurant_reviews VALUES (2, 3, 4.2, '2024-02-01')")
+    assert conn.execute(stats, (3,)).fetchone() == (2, 0, 0, 0, 1, 0, 4.2, 4.2)
+
+    conn.execute("UPDATE restaurant_reviews SET Review_Rating = NULL WHERE Review_ID = 2")
+    conn.execute("UPDATE restaurant_reviews SET Review_Rating = 2 WHERE Review_ID = 1")
+    assert conn.execute(stats, (3,)).fetchone() == (2, 0, 1, 0, 0, 0, 2.0, 2.0)
+
+    conn.execute("DELETE FROM restaurant_reviews")
+    assert conn.execute(stats, (3,)).fetchone() == (0, 0, 0, 0, 0, 0, 0.0, None)
+    conn.close()
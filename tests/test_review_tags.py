@@ -0,0 +1,76 @@
+import numpy as np
+
+from utils.review_tags import (
+    NEGATIVE_MASK, TAG_BITS, ReviewTagger, get_tagger, has_tags, tag_counts, tag_ratios, tag_reviews,
+)
+
+
+def test_tags_multilingual_terms_in_one_pass():
+    masks = tag_reviews([
+        'The room was DIRTY and noisy',
+        '房間很乾淨，交通方便',
+        '部屋が汚い。残念でした',
+        None,
+        'Nothing special',
+    ])
+    names = [get_tagger().tag_names(m) for m in masks]
+    assert names[0] == ['dirty', 'noisy']
+    assert names[1] == ['clean', 'location']
+    assert names[2] == ['dirty', 'poor']
+    assert masks[3] == 0 and masks[4] == 0
+    assert has_tags(masks, NEGATIVE_MASK).tolist() == [True, False, True, False, False]
+
+
+def test_longer_terms_win_over_their_prefixes():
+    masks = tag_reviews(['not clean at all', 'very clean'])
+    assert masks[0] == TAG_BITS['dirty']
+    assert masks[1] == TAG_BITS['clean']
+
+
+def test_custom_tagger_matches_substring_search():
+    keywords = ['dirty', 'bad', '失望']
+    texts = ['Bad stay', 'badminton court', 'fine', '有點失望', 'dirty and bad']
+    masks = ReviewTagger({'neg': keywords}).tag(texts)
+    assert (masks != 0).tolist() == [any(k in t.lower() for k in keywords) for t in texts]
+
+
+def test_tag_counts_and_ratios_per_group():
+    keys = [1, 1, 2, 2, 2]
+    masks = tag_reviews(['dirty', 'clean', 'dirty room', 'noisy', 'great'])
+    counts = tag_counts(keys, masks, tags=['dirty'])
+    assert counts.loc[1, 'review_count'] == 2 and counts.loc[2, 'dirty'] == 1
+    ratios = tag_ratios(keys, masks)
+    assert np.isclose(ratios.loc[2, 'negative_ratio'], 2 / 3)
+    assert ratios.loc[1, 'clean_ratio'] == 0.5
+
+
+def test_compound_terms_keep_the_tags_they_contain():
+    masks = tag_reviews(['great location', 'unfriendly front desk', '骯髒'])
+    assert get_tagger().tag_names(masks[0]) == ['location', 'great']
+    assert masks[1] == TAG_BITS['rude']
+    assert masks[2] == TAG_BITS['dirty']
+
+
+def test_file_masks_are_cached_until_the_file_changes(tmp_path, monkeypatch):
+    import os
+
+    import pandas as pd
+
+    from utils import review_tags
+
+    path = tmp_path / 'reviews.csv'
+    pd.DataFrame({'Review_Text': ['dirty room', 'great stay']}).to_csv(path, index=False)
+    calls = []
+    tag = review_tags.tag_reviews
+    monkeypatch.setattr(review_tags, 'tag_reviews', lambda texts: calls.append(1) or tag(texts))
+
+    texts = pd.read_csv(path)['Review_Text']
+    first = review_tags.tag_file_reviews(str(path), texts)
+    first[0] = 0
+    assert review_tags.tag_file_reviews(str(path), texts).tolist() == [TAG_BITS['dirty'], TAG_BITS['great']]
+    assert len(calls) == 1
+
+    pd.DataFrame({'Review_Text': ['noisy']}).to_csv(path, index=False)
+    os.utime(path, ns=(0, 0))
+    assert review_tags.tag_file_reviews(str(path), pd.read_csv(path)['Review_Text']).tolist() == [TAG_BITS['noisy']]
+    assert len(calls) == 2
@@ -0,0 +1,50 @@
+import pandas as pd
+
+from utils.database import (get_db_connection, get_hotel_reviews, get_restaurant_reviews, get_review_stats,
+                            get_reviews)
+
+
+def test_reviews_match_csv():
+    csv = pd.read_csv('data/HotelReviews.csv', encoding='utf-8-sig')
+    expected = csv[csv['Hotel_ID'] == 469]
+    reviews = get_hotel_reviews(469)
+    assert sorted(r['review_id'] for r in reviews) == sorted(expected['Review_ID'])
+    assert [r['date'] for r in reviews] == sorted(r['date'] for r in reviews)
+
+    csv = pd.read_csv('data/Reviews.csv', encoding='utf-8-sig')
+    expected = csv[csv['Restaurant_ID'] == 1]
+    assert [(r['rating'], r['comment']) for r in get_restaurant_reviews(1)] == \
+        list(zip(expected['Review_Rating'], expected['Review_Text']))
+
+
+def test_review_lookup_uses_index():
+    with get_db_connection() as conn:
+        plan = conn.execute(
+            "EXPLAIN QUERY PLAN SELECT * FROM hotel_reviews WHERE Hotel_ID = 1 ORDER BY Review_Date, Review_ID"
+        ).fetchall()
+    assert any('USING INDEX idx_hotel_reviews_date' in row[3] for row in plan)
+    assert get_hotel_reviews(-1) == []
+
+
+def test_review_stats_match_reviews():
+    for item_type, item_id, loader in [('hotel', 469, get_hotel_reviews), ('restaurant', 1, get_restaurant_reviews)]:
+        reviews = loader(item_id)
+        stats = get_review_stats(item_type, item_id)
+        assert stats['count'] == len(reviews)
+        assert stats['histogram'] == [sum(r['rating'] == star for r in reviews) for star in range(1, 6)]
+        assert abs(stats['mean'] - sum(r['rating'] for r in reviews) / len(reviews)) < 1e-9
+    assert get_review_stats('hotel', -1)['count'] == 0
+
+
+def test_get_reviews_pages_by_star():
+    expected = [r['review_id'] for r in get_hotel_reviews(469) if r['rating'] == 4]
+    seen, cursor = [], None
+    while True:
+        page = get_reviews('hotel', 469, star=4, cursor=cursor, limit=3)
+        assert len(page['reviews']) <= 3
+        seen += [r['review_id'] for r in page['reviews']]
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert seen == sorted(expected)
+    assert get_reviews('restaurant', 1, limit=100)['next_cursor'] is None
@@ -0,0 +1,21 @@
+from utils.database import fts_match_expression, search_restaurants, search_attractions, get_db_connection
+
+
+def test_short_keywords_skip_fts():
+    assert fts_match_expression('ra', ['title']) is None
+    assert fts_match_expression('  ', ['title']) is None
+    assert fts_match_expression('sushi', ['title', 'title_alt']) == '{title title_alt} : "sushi"'
+
+
+def test_fts_matches_like_results():
+    with get_db_connection() as conn:
+        like_ids = {row[0] for row in conn.execute(
+            "SELECT Restaurant_ID FROM restaurants WHERE Name LIKE '%sushi%' OR JapaneseName LIKE '%sushi%'"
+        )}
+    fts_ids = set(search_restaurants(keyword='sushi')['Restaurant_ID'])
+    assert fts_ids == like_ids
+
+
+def test_exact_name_ranks_first():
+    name = search_attractions(sort_by='rating_desc').iloc[0]['Name']
+    assert search_attractions(keyword=name).iloc[0]['Name'] == name
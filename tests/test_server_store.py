@@ -0,0 +1,66 @@
+from utils.server_store import ServerStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_put_get_returns_same_object_and_counts():
+    store = ServerStore()
+    value = {'items': list(range(1000))}
+    token = store.put(value, session='a')
+    assert isinstance(token, str) and len(token) < 40
+    assert store.get(token) is value
+    assert store.get('missing') is None
+    assert store.get(None, default=[]) == []
+    stats = store.stats()
+    assert (stats['hits'], stats['misses'], stats['puts']) == (1, 1, 1)
+
+
+def test_session_quota_evicts_least_recently_used():
+    store = ServerStore(session_quota=2)
+    first = store.put('first', session='a')
+    second = store.put('second', session='a')
+    other = store.put('other', session='b')
+    store.get(first)
+    store.put('third', session='a')
+    assert store.get(second) is None
+    assert store.get(first) == 'first'
+    assert store.get(other) == 'other'
+    assert store.stats()['quota_evictions'] == 1
+
+
+def test_maxsize_and_ttl():
+    clock = FakeClock()
+    store = ServerStore(maxsize=2, ttl=10, clock=clock)
+    tokens = [store.put(i, session=str(i)) for i in range(3)]
+    assert store.get(tokens[0]) is None
+    assert store.stats()['evictions'] == 1
+    clock.now = 5
+    assert store.get(tokens[1]) == 1
+    clock.now = 12
+    assert store.get(tokens[1]) == 1  # 存取後延長存活時間
+    assert store.get(tokens[2]) is None
+    assert store.stats()['expirations'] == 1
+
+
+def test_shared_entries_rebuild_only_on_new_version():
+    store = ServerStore(maxsize=1)
+    calls = []
+
+    def factory():
+        calls.append(1)
+        return ['place']
+
+    token = store.share('places', factory, version=1)
+    assert store.share('places', factory, version=1) == token
+    store.put('x', session='a')
+    store.put('y', session='a')
+    assert store.get(token) == ['place']
+    new_token = store.share('places', factory, version=2)
+    assert new_token != token and len(calls) == 2
+    assert store.get(token) is None
@@ -0,0 +1,102 @@
+import threading
+from datetime import datetime, timedelta
+
+from utils import auth
+from utils.session_cache import PeriodicSweeper, SessionCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_session_cache_honours_session_expiry_and_ttl():
+    clock = FakeClock()
+    now = datetime(2024, 1, 1, 12, 0)
+    cache = SessionCache(ttl=60, miss_ttl=5, clock=clock, now=lambda: now)
+    cache.put('live', 1, now + timedelta(hours=1))
+    cache.put('stale', 2, now - timedelta(seconds=1))
+    cache.put('unknown', None, None)
+    assert cache.lookup('live') == (True, 1)
+    assert cache.lookup('stale') == (True, None)
+    assert cache.lookup('unknown') == (True, None)
+    assert cache.lookup('other') == (False, None)
+
+    clock.now = 10
+    assert cache.lookup('unknown') == (False, None)
+    assert cache.prune() == 1  # 'stale'
+    clock.now = 61
+    assert cache.lookup('live') == (False, None)
+
+
+def test_session_cache_is_bounded():
+    cache = SessionCache(maxsize=2)
+    for i in range(3):
+        cache.put(str(i), i, None)
+    assert len(cache) == 2 and cache.lookup('0') == (False, None)
+    assert cache.stats()['evictions'] == 1
+
+
+def test_get_session_hits_cache_and_delete_invalidates(tmp_path, monkeypatch):
+    monkeypatch.setattr(auth, 'DB_PATH', str(tmp_path / 'users.db'))
+    monkeypatch.setattr(auth, 'SESSION_CACHE', SessionCache())
+    auth.init_db()
+    auth.create_session(7, 'sid', datetime.now() + timedelta(days=1))
+    assert auth.get_session('sid') == 7
+    hits = auth.SESSION_CACHE.hits
+    assert auth.get_session('sid') == 7
+    assert auth.SESSION_CACHE.hits == hits + 1
+
+    auth.delete_session('sid')
+    assert auth.get_session('sid') is None
+    assert auth.get_session(None) is None
+
+
+def test_periodic_sweeper_runs_in_background():
+    ran = threading.Event()
+    sweeper = PeriodicSweeper(ran.set, interval=0.01, name='test-sweeper')
+    sweeper.start()
+    sweeper.start()
+    assert ran.wait(1)
+    sweeper.stop(timeout=1)
+    assert not sweeper.running and sweeper.runs >= 1
+
+
+def test_logout_on_another_worker_takes_effect_after_cache_ttl(tmp_path, monkeypatch):
+    from utils.write_behind import write_and_wait
+
+    clock = FakeClock()
+    monkeypatch.setattr(auth, 'DB_PATH', str(tmp_path / 'users.db'))
+    monkeypatch.setattr(auth, 'SESSION_CACHE', SessionCache(ttl=auth.SESSION_CACHE_TTL, clock=clock))
+    auth.init_db()
+    auth.create_session(7, 'sid', datetime.now() + timedelta(days=1))
+    assert auth.get_session('sid') == 7
+
+    # 其他 worker 登出：只刪除資料庫中的 session，本行程的快取不知道
+    write_and_wait(auth.DB_PATH, 'DELETE FROM sessions WHERE session_id = ?', ('sid',))
+    assert auth.get_session('sid') == 7
+    clock.now = auth.SESSION_CACHE_TTL
+    assert auth.get_session('sid') is None
+    assert auth.SESSION_CACHE_TTL <= 10
+
+
+def test_delete_session_waits_for_the_commit(tmp_path, monkeypatch):
+    import sqlite3
+
+    import pytest
+
+    monkeypatch.setattr(auth, 'DB_PATH', str(tmp_path / 'users.db'))
+    monkeypatch.setattr(auth, 'SESSION_CACHE', SessionCache())
+    auth.init_db()
+    auth.create_session(7, 'sid', datetime.now() + timedelta(days=1))
+    auth.delete_session('sid')
+    conn = sqlite3.connect(auth.DB_PATH)
+    assert conn.execute('SELECT COUNT(*) FROM sessions').fetchone() == (0,)
+    conn.execute('DROP TABLE sessions')
+    conn.commit()
+    conn.close()
+    with pytest.raises(sqlite3.OperationalError):
+        auth.delete_session('sid')
@@ -0,0 +1,42 @@
+import numpy as np
+
+from utils.geo import distances_from
+from utils.spatial import SpatialIndex
+
+
+def _random_index(n=500, seed=0):
+    rng = np.random.default_rng(seed)
+    lats = 34.9 + rng.random(n) * 0.2
+    lons = 135.65 + rng.random(n) * 0.2
+    types = rng.choice(['restaurant', 'hotel', 'attraction'], n)
+    return SpatialIndex(types, np.arange(n), lats, lons)
+
+
+def test_k_nearest_matches_brute_force():
+    index = _random_index()
+    dist = distances_from(35.0, 135.75, index.lats, index.lons)
+    expected = np.argsort(dist, kind='stable')[:7].tolist()
+    assert [p['id'] for p in index.k_nearest(35.0, 135.75, 7)] == expected
+
+
+def test_within_radius_filters_types_and_excludes():
+    index = _random_index()
+    results = index.within_radius(35.0, 135.75, 3.0, types=['hotel'], exclude=[('hotel', 3)])
+    dist = distances_from(35.0, 135.75, index.lats, index.lons)
+    expected = {i for i in range(len(index)) if dist[i] <= 3.0 and index.types[i] == 'hotel' and i != 3}
+    assert {p['id'] for p in results} == expected
+    assert all(a['distance'] <= b['distance'] for a, b in zip(results, results[1:]))
+
+
+def test_k_nearest_far_away_scans_everything():
+    index = _random_index(n=20)
+    assert len(index.k_nearest(0.0, 0.0, 5)) == 5
+
+
+def test_in_bbox_matches_coordinate_filter():
+    index = _random_index()
+    results = index.in_bbox(34.95, 35.02, 135.70, 135.78, types=['restaurant', 'hotel'])
+    inside = ((index.lats >= 34.95) & (index.lats <= 35.02) & (index.lons >= 135.70) & (index.lons <= 135.78)
+              & np.isin(index.types, ['restaurant', 'hotel']))
+    assert [p['id'] for p in results] == np.flatnonzero(inside).tolist()
+    assert index.in_bbox(10.0, 10.1, 10.0, 10.1) == []
@@ -0,0 +1,24 @@
+from utils import catalog
+from utils.suggest import SuggestionIndex, get_suggestion_index, suggest
+
+
+def _entry(name, score, item_type='restaurant'):
+    return {'type': item_type, 'id': 1, 'name': name, 'alt_name': None,
+            'icon': 'fa-utensils', 'score': score, 'keys': [name.casefold()]}
+
+
+def test_prefix_beats_higher_scored_infix():
+    index = SuggestionIndex([_entry('Big Ramen', 50.0), _entry('Ramen Fuji', 1.0)])
+    assert [e['name'] for e in index.search('ram')] == ['Ramen Fuji', 'Big Ramen']
+
+
+def test_type_filter_and_limit():
+    results = suggest('ho', k=3, types=['hotel'])
+    assert 0 < len(results) <= 3
+    assert all(r['type'] == 'hotel' for r in results)
+
+
+def test_index_rebuilt_after_catalog_change():
+    first = get_suggestion_index()
+    catalog.invalidate('hotels')
+    assert get_suggestion_index() is not first
@@ -0,0 +1,105 @@
+import sqlite3
+
+import pytest
+
+from utils import favorites, trips
+from utils.write_behind import WriteBehindQueue, get_write_queue
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / 'users.db')
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE users (id INTEGER PRIMARY KEY, last_login TEXT);
+        CREATE TABLE favorites (
+            id INTEGER PRIMARY KEY, user_id INTEGER, item_type TEXT, item_id INTEGER,
+            item_name TEXT, item_data TEXT, UNIQUE (user_id, item_type, item_id)
+        );
+        CREATE TABLE trip_items (
+            id INTEGER PRIMARY KEY, trip_id INTEGER, item_type TEXT, item_id INTEGER, item_name TEXT,
+            day_number INTEGER, order_in_day INTEGER, notes TEXT, time TEXT, cost REAL
+        );
+        INSERT INTO users (id) VALUES (1), (2);
+    ''')
+    conn.close()
+    return path
+
+
+def read(path, sql):
+    conn = sqlite3.connect(path)
+    try:
+        return conn.execute(sql).fetchall()
+    finally:
+        conn.close()
+
+
+def test_queue_coalesces_pending_writes_by_key(db_path):
+    queue = WriteBehindQueue(db_path)
+    # 持有佇列的鎖時寫入執行緒無法取出項目，同 key 的更新必定合併
+    with queue._cond:
+        first = queue.submit('UPDATE users SET last_login = ? WHERE id = ?', ('a', 1), key=('last_login', 1))
+        second = queue.submit('UPDATE users SET last_login = ? WHERE id = ?', ('b', 1), key=('last_login', 1))
+    assert first is second
+    queue.flush()
+    assert first.result(1) == 1
+    assert read(db_path, 'SELECT last_login FROM users WHERE id = 1') == [('b',)]
+    stats = queue.stats()
+    assert stats['coalesced'] == 1 and stats['pending'] == 0
+    queue.stop()
+
+
+def test_queue_batches_and_isolates_failures(db_path):
+    queue = WriteBehindQueue(db_path, linger=0.05)
+    ok = queue.submit('INSERT INTO favorites (user_id, item_type, item_id) VALUES (1, ?, 1)', ('hotel',))
+    dup = queue.submit('INSERT INTO favorites (user_id, item_type, item_id) VALUES (1, ?, 1)', ('hotel',))
+    other = queue.submit('INSERT INTO favorites (user_id, item_type, item_id) VALUES (1, ?, 2)', ('hotel',))
+    assert ok.result(1) == 1 and other.result(1) == 1
+    with pytest.raises(sqlite3.IntegrityError):
+        dup.result(1)
+    assert read(db_path, 'SELECT COUNT(*) FROM favorites') == [(2,)]
+    stats = queue.stats()
+    assert stats['batches'] == 1 and stats['committed'] == 2 and stats['failed'] == 1
+
+    queue.stop()
+    with pytest.raises(RuntimeError):
+        queue.submit('SELECT 1')
+
+
+def test_favorites_and_trip_items_go_through_writer(db_path, monkeypatch):
+    monkeypatch.setattr(favorites, 'DB_PATH', db_path)
+    monkeypatch.setattr(trips, 'DB_PATH', db_path)
+
+    assert favorites.add_favorite(1, 'hotel', 5, 'Inn')[0]
+    assert favorites.add_favorite(1, 'hotel', 5, 'Inn') == (False, 'Inn is already in your favorites')
+    assert favorites.remove_favorite(1, 'hotel', 5) == (True, 'Inn removed from favorites')
+    assert favorites.remove_favorite(1, 'hotel', 5)[0] is False
+
+    for name in ('A', 'B'):
+        assert trips.add_item_to_trip(3, 'attraction', 1, name, day_number=1)[0]
+    assert read(db_path, 'SELECT item_name, order_in_day FROM trip_items ORDER BY id') == [('A', 1), ('B', 2)]
+    stats = get_write_queue(db_path).stats()
+    assert stats['committed'] == 4 and stats['failed'] == 1
+
+
+def test_coalesced_write_moves_behind_later_writes(db_path):
+    queue = WriteBehindQueue(db_path)
+    with queue._cond:
+        queue.submit('UPDATE users SET last_login = ? WHERE id = ?', ('a', 1), key=('last_login', 1))
+        queue.submit('UPDATE users SET last_login = ? WHERE id = ?', ('b', 1))
+        queue.submit('UPDATE users SET last_login = ? WHERE id = ?', ('c', 1), key=('last_login', 1))
+        assert [params for _, params, _ in queue._pending.values()] == [('b', 1), ('c', 1)]
+    queue.flush()
+    assert read(db_path, 'SELECT last_login FROM users WHERE id = 1') == [('c',)]
+    queue.stop()
+
+
+def test_waiting_writes_skip_the_linger(db_path):
+    import time
+
+    queue = WriteBehindQueue(db_path, linger=5)
+    start = time.monotonic()
+    assert queue.submit('UPDATE users SET last_login = ? WHERE id = ?', ('a', 1), urgent=True).result(1) == 1
+    queue.flush(timeout=1)
+    assert time.monotonic() - start < 1
+    queue.stop()
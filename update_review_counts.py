@@ -1,90 +1,153 @@
 """
-Update ReviewNum in restaurants database based on actual review counts from Reviews.csv
+Build per-item review aggregates in travel.db
+Run this once, and again after re-running migrate_reviews_to_db.py
+(dropping a review table also drops its triggers)
+
+Creates review_stats with one row per restaurant / hotel:
+    Review_Count        number of reviews
+    Star1 .. Star5      rating histogram (ratings rounded to whole stars)
+    Rating_Sum          sum of the 1-5 star ratings
+    Rating_Mean         Rating_Sum / rated reviews
+    Latest_Review_Date  newest Review_Date (NULL when reviews are undated)
+Triggers on restaurant_reviews and hotel_reviews keep the rows up to date
+incrementally, so detail pages read a single row instead of aggregating
+every review on each view.
+
+This replaces the old ReviewNum sync, which wrote to restaurants.db
+(no longer used by the app) and overwrote the Tabelog review counts.
 """
 import sqlite3
-import pandas as pd
-from pathlib import Path
-import sys
-import io
+import os
+
+DB_PATH = os.path.join('data', 'travel.db')
+
+# item type -> (review table, item id column)
+REVIEW_TABLES = {
+    'restaurant': ('restaurant_reviews', 'Restaurant_ID'),
+    'hotel': ('hotel_reviews', 'Hotel_ID'),
+}
+
+STAR_COLUMNS = [f'Star{i}' for i in range(1, 6)]
+RATED = ' + '.join(STAR_COLUMNS)
+
+
+def _star(ref):
+    return f'CAST(ROUND({ref}.Review_Rating) AS INTEGER)'
+
+
+def _apply(item_type, id_column, ref, sign):
+    """UPDATE adding (sign '+') or removing (sign '-') one review's contribution"""
+    star = _star(ref)
+    # Unrated reviews (NULL Review_Rating) make every comparison NULL; COALESCE keeps the
+    # NOT NULL counters from becoming NULL
+    stars = ',\n            '.join(f'Star{i} = Star{i} {sign} COALESCE({star} = {i}, 0)' for i in range(1, 6))
+    return f'''UPDATE review_stats SET
+            Review_Count = Review_Count {sign} 1,
+            {stars},
+            Rating_Sum = Rating_Sum {sign} COALESCE(CASE WHEN {star} BETWEEN 1 AND 5 THEN {ref}.Review_Rating END, 0)
+        WHERE Item_Type = '{item_type}' AND Item_ID = {ref}.{id_column};'''
+
+
+def _refresh(item_type, table, id_column, ref):
+    """Recompute the mean and latest date after an update or delete"""
+    return f'''UPDATE review_stats SET
+            Rating_Mean = Rating_Sum * 1.0 / NULLIF({RATED}, 0),
+            Latest_Review_Date = (SELECT MAX(Review_Date) FROM {table} WHERE {id_column} = {ref}.{id_column})
+        WHERE Item_Type = '{item_type}' AND Item_ID = {ref}.{id_column};'''
+
+
+def build_triggers():
+    """CREATE TRIGGER statements for every review table"""
+    triggers = []
+    for item_type, (table, id_column) in REVIEW_TABLES.items():
+        triggers.append(f'''CREATE TRIGGER {table}_stats_ai AFTER INSERT ON {table} BEGIN
+        INSERT OR IGNORE INTO review_stats (Item_Type, Item_ID) VALUES ('{item_type}', new.{id_column});
+        {_apply(item_type, id_column, 'new', '+')}
+        UPDATE review_stats SET
+            Rating_Mean = Rating_Sum * 1.0 / NULLIF({RATED}, 0),
+            Latest_Review_Date = CASE
+                WHEN Latest_Review_Date IS NULL OR new.Review_Date > Latest_Review_Date THEN new.Review_Date
+                ELSE Latest_Review_Date END
+        WHERE Item_Type = '{item_type}' AND Item_ID = new.{id_column};
+    END''')
+        triggers.append(f'''CREATE TRIGGER {table}_stats_ad AFTER DELETE ON {table} BEGIN
+        {_apply(item_type, id_column, 'old', '-')}
+        {_refresh(item_type, table, id_column, 'old')}
+    END''')
+        triggers.append(f'''CREATE TRIGGER {table}_stats_au
+    AFTER UPDATE OF {id_column}, Review_Rating, Review_Date ON {table} BEGIN
+        {_apply(item_type, id_column, 'old', '-')}
+        {_refresh(item_type, table, id_column, 'old')}
+        INSERT OR IGNORE INTO review_stats (Item_Type, Item_ID) VALUES ('{item_type}', new.{id_column});
+        {_apply(item_type, id_column, 'new', '+')}
+        {_refresh(item_type, table, id_column, 'new')}
+    END''')
+    return triggers
+
+
+TRIGGERS = build_triggers()
+TRIGGER_NAMES = [t.split()[2] for t in TRIGGERS]
 
-# Set standard output encoding to UTF-8
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
 def update_review_counts():
-    """Update ReviewNum field in restaurants table based on actual review counts"""
+    """(Re)create review_stats, fill it from the review tables and install the triggers"""
 
-    db_path = './data/restaurants.db'
-    reviews_path = './data/Reviews.csv'
-
-    # Check if files exist
-    if not Path(db_path).exists():
-        print(f"[Error] Database not found: {db_path}")
-        print("Please run migrate_to_db.py first")
-        return
-
-    if not Path(reviews_path).exists():
-        print(f"[Error] Reviews file not found: {reviews_path}")
-        return
-
-    print("[Start] Updating review counts...")
-
-    # Read reviews CSV
-    print(f"[Reading] Reviews from: {reviews_path}")
-    reviews_df = pd.read_csv(reviews_path, encoding='utf-8-sig')
-
-    # Count reviews per restaurant
-    review_counts = reviews_df.groupby('Restaurant_ID').size().reset_index(name='ReviewCount')
-    print(f"[Info] Found {len(review_counts)} restaurants with reviews")
-
-    # Connect to database
-    conn = sqlite3.connect(db_path)
+    conn = sqlite3.connect(DB_PATH)
     cursor = conn.cursor()
 
-    # Update ReviewNum for each restaurant
-    updated_count = 0
-    for _, row in review_counts.iterrows():
-        restaurant_id = row['Restaurant_ID']
-        review_count = row['ReviewCount']
-
-        cursor.execute('''
-            UPDATE restaurants
-            SET ReviewNum = ?
-            WHERE Restaurant_ID = ?
-        ''', (review_count, restaurant_id))
-        updated_count += 1
-
-    # Commit changes
-    conn.commit()
+    try:
+        for name in TRIGGER_NAMES:
+            cursor.execute(f'DROP TRIGGER IF EXISTS {name}')
+
+        cursor.execute('DROP TABLE IF EXISTS review_stats')
+        cursor.execute(f'''
+            CREATE TABLE review_stats (
+                Item_Type TEXT NOT NULL,
+                Item_ID INTEGER NOT NULL,
+                Review_Count INTEGER NOT NULL DEFAULT 0,
+                {', '.join(f'{c} INTEGER NOT NULL DEFAULT 0' for c in STAR_COLUMNS)},
+                Rating_Sum REAL NOT NULL DEFAULT 0,
+                Rating_Mean REAL,
+                Latest_Review_Date TEXT,
+                PRIMARY KEY (Item_Type, Item_ID)
+            ) WITHOUT ROWID
+        ''')
+
+        for item_type, (table, id_column) in REVIEW_TABLES.items():
+            star = 'CAST(ROUND(Review_Rating) AS INTEGER)'
+            cursor.execute(f'''
+                INSERT INTO review_stats
+                SELECT ?, {id_column}, COUNT(*),
+                       {', '.join(f'COALESCE(SUM({star} = {i}), 0)' for i in range(1, 6))},
+                       TOTAL(CASE WHEN {star} BETWEEN 1 AND 5 THEN Review_Rating END),
+                       AVG(CASE WHEN {star} BETWEEN 1 AND 5 THEN Review_Rating END),
+                       MAX(Review_Date)
+                FROM {table}
+                GROUP BY {id_column}
+            ''', (item_type,))
+            print(f"[OK] review_stats: {cursor.rowcount} {item_type} rows")
+
+        for trigger in TRIGGERS:
+            cursor.execute(trigger)
+        print(f"[OK] {len(TRIGGERS)} review_stats triggers created")
+
+        conn.commit()
+
+    except sqlite3.Error as e:
+        print(f"[ERROR] Building review stats failed: {e}")
+        conn.rollback()
+    finally:
+        conn.close()
 
-    print(f"[Success] Updated ReviewNum for {updated_count} restaurants")
-
-    # Verify the update
-    print("\n[Verification] Sample of updated restaurants:")
-    cursor.execute('''
-        SELECT Restaurant_ID, Name, ReviewNum
-        FROM restaurants
-        WHERE ReviewNum IS NOT NULL
-        ORDER BY Restaurant_ID
-        LIMIT 10
-    ''')
-
-    results = cursor.fetchall()
-    for restaurant_id, name, review_num in results:
-        print(f"   ID: {restaurant_id} | {name} | Reviews: {review_num}")
-
-    # Show statistics
-    cursor.execute('SELECT COUNT(*) FROM restaurants WHERE ReviewNum = 30')
-    count_30 = cursor.fetchone()[0]
-    print(f"\n[Statistics] Restaurants with exactly 30 reviews: {count_30}")
-
-    cursor.execute('SELECT MIN(ReviewNum), MAX(ReviewNum), AVG(ReviewNum) FROM restaurants WHERE ReviewNum IS NOT NULL')
-    min_rev, max_rev, avg_rev = cursor.fetchone()
-    print(f"[Statistics] Review count range: {min_rev} - {max_rev}, Average: {avg_rev:.2f}")
-
-    # Close connection
-    conn.close()
-
-    print("\n[Complete] Review counts updated successfully!")
 
 if __name__ == '__main__':
+    print("=" * 60)
+    print("Review Stats Build")
+    print("=" * 60)
+    print(f"Database: {DB_PATH}\n")
+
     update_review_counts()
+
+    print("\n" + "=" * 60)
+    print("Build complete!")
+    print("=" * 60)
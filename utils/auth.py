@@ -3,50 +3,61 @@ import hashlib
 import os
 from datetime import datetime
 
+from utils.db_pool import pooled_connection
+from utils.session_cache import PeriodicSweeper, SessionCache
+from utils.write_behind import enqueue_write, write_and_wait
+
 # 資料庫檔案路徑
 DB_PATH = os.path.join(os.path.dirname(__file__), '..', 'data', 'users.db')
 
+# session_id -> (user_id, 到期時間) 的記憶體快取；登入、登出時同步更新
+# 快取只存在於單一行程，其他 worker 的登出要等快取到期後重新查詢資料庫才會生效，
+# 因此只保留幾秒（足以涵蓋同一次操作觸發的多個 callback）
+SESSION_CACHE_TTL = 5
+SESSION_CACHE = SessionCache(maxsize=4096, ttl=SESSION_CACHE_TTL, miss_ttl=SESSION_CACHE_TTL)
+
+# 背景清理過期 sessions 的間隔（秒）
+SESSION_SWEEP_INTERVAL = 600
+
 def init_db():
     """初始化使用者資料庫"""
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # 建立使用者表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password_hash TEXT NOT NULL,
-            email TEXT,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            last_login TIMESTAMP,
-            profile_photo TEXT
-        )
-    ''')
-
-    # 建立 session 表
-    cursor.execute('''
-        CREATE TABLE IF NOT EXISTS sessions (
-            session_id TEXT PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            expires_at TIMESTAMP NOT NULL,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-    ''')
+    with pooled_connection(DB_PATH) as conn:
+        cursor = conn.cursor()
 
-    conn.commit()
+        # 建立使用者表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                username TEXT UNIQUE NOT NULL,
+                password_hash TEXT NOT NULL,
+                email TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_login TIMESTAMP,
+                profile_photo TEXT
+            )
+        ''')
+
+        # 建立 session 表
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                expires_at TIMESTAMP NOT NULL,
+                FOREIGN KEY (user_id) REFERENCES users (id)
+            )
+        ''')
 
-    # Add profile_photo column if it doesn't exist (migration for existing databases)
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN profile_photo TEXT")
         conn.commit()
-    except sqlite3.OperationalError:
-        # Column already exists
-        pass
 
-    conn.close()
+        # Add profile_photo column if it doesn't exist (migration for existing databases)
+        try:
+            cursor.execute("ALTER TABLE users ADD COLUMN profile_photo TEXT")
+            conn.commit()
+        except sqlite3.OperationalError:
+            # Column already exists
+            pass
 
 def hash_password(password):
     """使用 SHA-256 雜湊密碼"""
@@ -55,16 +66,15 @@ def hash_password(password):
 def create_user(username, password, email=None):
     """建立新使用者"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-        password_hash = hash_password(password)
-
-        cursor.execute(
-            'INSERT INTO users (username, password_hash, email) VALUES (?, ?, ?)',
-            (username, password_hash, email)
-        )
-        conn.commit()
-        conn.close()
+        with pooled_connection(DB_PATH) as conn:
+            cursor = conn.cursor()
+            password_hash = hash_password(password)
+
+            cursor.execute(
+                'INSERT INTO users (username, password_hash, email) VALUES (?, ?, ?)',
+                (username, password_hash, email)
+            )
+            conn.commit()
         return True, "使用者建立成功"
     except sqlite3.IntegrityError:
         return False, "使用者名稱已存在"
@@ -73,52 +83,46 @@ def create_user(username, password, email=None):
 
 def verify_user(username, password):
     """驗證使用者登入"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    with pooled_connection(DB_PATH) as conn:
+        cursor = conn.cursor()
 
-    password_hash = hash_password(password)
-    cursor.execute(
-        'SELECT id, username FROM users WHERE username = ? AND password_hash = ?',
-        (username, password_hash)
-    )
+        password_hash = hash_password(password)
+        cursor.execute(
+            'SELECT id, username FROM users WHERE username = ? AND password_hash = ?',
+            (username, password_hash)
+        )
 
-    user = cursor.fetchone()
+        user = cursor.fetchone()
 
     if user:
-        # 更新最後登入時間
-        cursor.execute(
+        # 更新最後登入時間：交給寫入佇列，不等待提交；同一使用者尚未寫入的更新會合併
+        enqueue_write(
+            DB_PATH,
             'UPDATE users SET last_login = ? WHERE id = ?',
-            (datetime.now(), user[0])
+            (datetime.now(), user[0]),
+            key=('last_login', user[0])
         )
-        conn.commit()
 
-    conn.close()
-    return user  # 返回 (user_id, username) 或 None
+    return tuple(user) if user else None  # 返回 (user_id, username) 或 None
 
 def get_user_by_id(user_id):
     """根據 ID 取得使用者"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    cursor.execute('SELECT id, username, email FROM users WHERE id = ?', (user_id,))
-    user = cursor.fetchone()
+    with pooled_connection(DB_PATH) as conn:
+        cursor = conn.cursor()
+        cursor.execute('SELECT id, username, email FROM users WHERE id = ?', (user_id,))
+        user = cursor.fetchone()
 
-    conn.close()
-    return user
+    return tuple(user) if user else None
 
 def get_user_full_details(user_id):
     """取得使用者完整資訊，包含建立時間和最後登入時間"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-
-    cursor.execute(
-        'SELECT id, username, email, created_at, last_login, profile_photo FROM users WHERE id = ?',
-        (user_id,)
-    )
-    user = cursor.fetchone()
-
-    conn.close()
+    with pooled_connection(DB_PATH) as conn:
+        cursor = conn.cursor()
+        cursor.execute(
+            'SELECT id, username, email, created_at, last_login, profile_photo FROM users WHERE id = ?',
+            (user_id,)
+        )
+        user = cursor.fetchone()
 
     if user:
         return {
@@ -134,82 +138,83 @@ def get_user_full_details(user_id):
 def update_profile_photo(user_id, photo_data):
     """更新使用者的個人照片（base64 編碼）"""
     try:
-        conn = sqlite3.connect(DB_PATH)
-        cursor = conn.cursor()
-
-        cursor.execute(
-            'UPDATE users SET profile_photo = ? WHERE id = ?',
-            (photo_data, user_id)
-        )
-
-        conn.commit()
-        conn.close()
+        with pooled_connection(DB_PATH) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                'UPDATE users SET profile_photo = ? WHERE id = ?',
+                (photo_data, user_id)
+            )
+            conn.commit()
         return True, "照片更新成功"
     except Exception as e:
         return False, f"更新失敗: {str(e)}"
 
-def create_session(user_id, session_id, expires_at):
-    """建立 session"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def _as_datetime(value):
+    return value if isinstance(value, datetime) else datetime.fromisoformat(str(value))
 
-    cursor.execute(
+def create_session(user_id, session_id, expires_at):
+    """建立 session（經由寫入佇列並等待提交，其他行程才查得到；同時寫入快取）"""
+    write_and_wait(
+        DB_PATH,
         'INSERT INTO sessions (session_id, user_id, expires_at) VALUES (?, ?, ?)',
         (session_id, user_id, expires_at)
     )
-
-    conn.commit()
-    conn.close()
+    SESSION_CACHE.put(session_id, user_id, _as_datetime(expires_at))
 
 def get_session(session_id):
-    """取得 session"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    """取得 session 的 user_id（先查記憶體快取，未命中才查詢資料庫）；不存在或已過期時返回 None"""
+    if not session_id:
+        return None
 
-    cursor.execute(
-        'SELECT user_id, expires_at FROM sessions WHERE session_id = ?',
-        (session_id,)
-    )
+    hit, user_id = SESSION_CACHE.lookup(session_id)
+    if hit:
+        return user_id
 
-    session = cursor.fetchone()
-    conn.close()
+    with pooled_connection(DB_PATH) as conn:
+        session = conn.execute(
+            'SELECT user_id, expires_at FROM sessions WHERE session_id = ?',
+            (session_id,)
+        ).fetchone()
 
     if session:
         user_id, expires_at = session
-        expires_at = datetime.fromisoformat(expires_at)
+        expires_at = _as_datetime(expires_at)
 
         # 檢查是否過期
         if expires_at > datetime.now():
+            SESSION_CACHE.put(session_id, user_id, expires_at)
             return user_id
 
+    SESSION_CACHE.put(session_id, None, None)
     return None
 
 def delete_session(session_id):
-    """刪除 session（登出）"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    """
+    刪除 session（登出）；經由寫入佇列並等待提交，其他行程的快取到期後才不會再讀到這筆 session
 
-    cursor.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
-
-    conn.commit()
-    conn.close()
+    刪除失敗時拋出例外（登出未生效，不可當作成功）
+    """
+    SESSION_CACHE.put(session_id, None, None)
+    write_and_wait(DB_PATH, 'DELETE FROM sessions WHERE session_id = ?', (session_id,))
 
 def clean_expired_sessions():
-    """清理過期的 sessions"""
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+    """清理過期的 sessions（由背景 sweeper 定期執行，不在 request 中呼叫）"""
+    write_and_wait(DB_PATH, 'DELETE FROM sessions WHERE expires_at < ?', (datetime.now(),))
+    SESSION_CACHE.prune()
 
-    cursor.execute('DELETE FROM sessions WHERE expires_at < ?', (datetime.now(),))
+session_sweeper = PeriodicSweeper(clean_expired_sessions, SESSION_SWEEP_INTERVAL, name='session-sweeper')
 
-    conn.commit()
-    conn.close()
+def start_session_sweeper():
+    """啟動定期清理過期 sessions 的背景執行緒（重複呼叫無影響）"""
+    session_sweeper.start()
 
-# 初始化資料庫
-init_db()
+def setup_auth_db():
+    """初始化資料庫並建立預設帳號（由 app.py 啟動時呼叫，匯入模組時不會建立資料庫檔案）"""
+    init_db()
 
-# 建立預設管理員帳號（僅供測試使用，生產環境應移除）
-try:
-    create_user('admin', 'admin123', 'admin@example.com')
-    create_user('demo', 'demo123', 'demo@example.com')
-except:
-    pass  # 如果帳號已存在就忽略
+    # 建立預設管理員帳號（僅供測試使用，生產環境應移除）
+    try:
+        create_user('admin', 'admin123', 'admin@example.com')
+        create_user('demo', 'demo123', 'demo@example.com')
+    except:
+        pass  # 如果帳號已存在就忽略
@@ -0,0 +1,230 @@
+"""
+目錄資料模組
+將餐廳、旅館、景點資料在每個行程中只載入一次，
+提供唯讀、依 ID 建立索引的記憶體結構，供 utils.database 的查詢函數共用
+"""
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from utils.db_pool import on_catalog_user_write, on_catalog_write, pooled_connection
+
+# 数据库路径（与 utils.database 相同）
+DB_PATH = './data/travel.db'
+
+# 各類資料的主鍵欄位
+ID_COLUMNS = {
+    'restaurants': 'Restaurant_ID',
+    'hotels': 'Hotel_ID',
+    'attractions': 'ID',
+}
+
+
+class CatalogTable:
+    """
+    單一實體集合的唯讀快照
+
+    Attributes:
+        name: 資料集名稱（restaurants / hotels / attractions）
+        df: 完整資料（含預先計算的衍生欄位），呼叫端不可修改
+        id_column: 主鍵欄位名稱
+        failed: 是否為載入失敗時的空表（不代表資料真的為空）
+    """
+
+    def __init__(self, name: str, df: pd.DataFrame, id_column: str, failed: bool = False):
+        self.name = name
+        self.df = df
+        self.id_column = id_column
+        self.failed = failed
+        # id → row dict 索引
+        self._rows: Dict[int, Dict[str, Any]] = {}
+        if not df.empty and id_column in df.columns:
+            for record in df.to_dict('records'):
+                # 與 sqlite3 查询结果一致：缺值以 None 表示
+                record = {k: (None if isinstance(v, float) and v != v else v) for k, v in record.items()}
+                try:
+                    self._rows[int(record[id_column])] = record
+                except (TypeError, ValueError):
+                    continue
+
+    def __len__(self) -> int:
+        return len(self.df)
+
+    def get(self, item_id) -> Optional[Dict[str, Any]]:
+        """根據 ID 取得單筆資料（回傳副本）"""
+        try:
+            row = self._rows.get(int(item_id))
+        except (TypeError, ValueError):
+            return None
+        return dict(row) if row is not None else None
+
+    def get_many(self, item_ids) -> pd.DataFrame:
+        """根據多個 ID 取得資料（保持原始排序，回傳副本）"""
+        if self.df.empty:
+            return pd.DataFrame()
+        return self.df[self.df[self.id_column].isin(list(item_ids))].copy()
+
+    def frame(self) -> pd.DataFrame:
+        """取得完整資料的副本"""
+        return self.df.copy()
+
+
+# ===== 資料載入函數 =====
+
+def _load_restaurants() -> pd.DataFrame:
+    """從 travel.db 載入餐廳資料"""
+    with pooled_connection(DB_PATH, read_only=True) as conn:
+        return pd.read_sql_query("SELECT * FROM restaurants", conn)
+
+
+# 旅館查询：類型以 '|' 串接後再拆成列表（utils.database.search_hotels 共用）
+HOTEL_SELECT = """
+    SELECT h.*,
+           (SELECT GROUP_CONCAT(t.TypeName, '|')
+            FROM hotel_types ht JOIN types t ON t.Type_ID = ht.Type_ID
+            WHERE ht.Hotel_ID = h.Hotel_ID) AS Types
+    FROM hotels h
+"""
+
+
+def split_types(df: pd.DataFrame) -> pd.DataFrame:
+    """將 Types 欄位由 'a|b|c' 字串轉為列表（就地修改並回傳）"""
+    if 'Types' in df.columns:
+        df['Types'] = [t.split('|') if isinstance(t, str) and t else [] for t in df['Types']]
+    return df
+
+
+def _load_hotels() -> pd.DataFrame:
+    """從 travel.db 載入旅館資料（同一旅館的多個類型合併為列表）"""
+    with pooled_connection(DB_PATH, read_only=True) as conn:
+        df = pd.read_sql_query(HOTEL_SELECT + " ORDER BY h.Hotel_ID", conn)
+    return split_types(df)
+
+
+def _load_attractions() -> pd.DataFrame:
+    """從 travel.db 載入景點資料，並補上 Long 欄位以與其他資料一致"""
+    with pooled_connection(DB_PATH, read_only=True) as conn:
+        df = pd.read_sql_query("SELECT * FROM attractions", conn)
+
+    df['Lat'] = pd.to_numeric(df['Lat'], errors='coerce')
+    df['Lng'] = pd.to_numeric(df['Lng'], errors='coerce')
+    df['Long'] = df['Lng']
+    return df
+
+
+_LOADERS: Dict[str, Callable[[], pd.DataFrame]] = {
+    'restaurants': _load_restaurants,
+    'hotels': _load_hotels,
+    'attractions': _load_attractions,
+}
+
+
+# ===== 行程共用的目錄快取 =====
+
+_lock = threading.Lock()
+_tables: Dict[str, CatalogTable] = {}
+_version = 0
+
+
+def _file_signature() -> Tuple:
+    """travel.db（含 -wal）的 (mtime_ns, size)；其他行程（例如遷移腳本）寫入後會改變"""
+    signature = []
+    for path in (DB_PATH, DB_PATH + '-wal'):
+        try:
+            stat = os.stat(path)
+            signature.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            signature.append(None)
+    return tuple(signature)
+
+
+_signature = _file_signature()
+
+
+def _check_file() -> None:
+    """資料庫檔案變更時清除快取並遞增版本"""
+    global _signature, _version
+    signature = _file_signature()
+    if signature == _signature:
+        return
+    with _lock:
+        if signature != _signature:
+            _signature = signature
+            _tables.clear()
+            _version += 1
+
+
+def _resync_file() -> None:
+    """
+    本行程只寫入 travel.db 的使用者資料表後更新檔案簽章，不清除快取
+
+    同一時間其他行程的寫入也會被視為已知，直到檔案下一次變更才重新載入
+    """
+    global _signature
+    with _lock:
+        _signature = _file_signature()
+
+
+def get_table(name: str) -> CatalogTable:
+    """
+    取得指定資料集（第一次呼叫時載入；資料庫檔案變更後重新載入）
+
+    Args:
+        name: 'restaurants'、'hotels' 或 'attractions'
+
+    Returns:
+        CatalogTable: 唯讀資料快照；載入失敗時為 failed=True 的空表（不快取，下次呼叫重試）
+    """
+    _check_file()
+    table = _tables.get(name)
+    if table is not None:
+        return table
+
+    with _lock:
+        table = _tables.get(name)
+        if table is None:
+            try:
+                df = _LOADERS[name]()
+            except Exception as e:
+                print(f"Error loading {name} catalog: {e}")
+                return CatalogTable(name, pd.DataFrame(), ID_COLUMNS[name], failed=True)
+            table = CatalogTable(name, df, ID_COLUMNS[name])
+            _tables[name] = table
+    return table
+
+
+def invalidate(name: Optional[str] = None) -> None:
+    """
+    清除快取，下次存取時重新載入（資料更新後呼叫；本行程經由連線池寫入 travel.db 時自動呼叫）
+
+    Args:
+        name: 指定資料集；None 代表全部
+    """
+    global _version
+    with _lock:
+        if name is None:
+            _tables.clear()
+        else:
+            _tables.pop(name, None)
+        _version += 1
+
+
+# 本行程經由連線池寫入 travel.db 後清除快取
+on_catalog_write(invalidate)
+on_catalog_user_write(_resync_file)
+
+
+def catalog_version() -> int:
+    """
+    目前的目錄版本號，每次 invalidate 或資料庫檔案變更後遞增
+    依版本失效的快取（查詢快取、建議索引、分析資料等）以此判斷是否過期
+    """
+    _check_file()
+    return _version
+
+
+def loaded_tables() -> List[str]:
+    """已載入記憶體的資料集名稱"""
+    return list(_tables.keys())
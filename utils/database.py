@@ -3,13 +3,20 @@
 提供高效的数据库查询功能
 """
 import sqlite3
+import json
 import pandas as pd
 import numpy as np
 import re
 from typing import List, Optional, Tuple, Dict, Any
 from contextlib import contextmanager
 import math
-import random
+import time
+
+from utils import catalog, spatial
+from utils.db_pool import pooled_connection
+from utils.query_cache import QueryCache, cached_query
+from utils.review_tags import tag_counts, tag_file_reviews
+from utils.session_cache import PeriodicSweeper
 
 # 数据库路径
 DB_PATH = './data/travel.db'
@@ -18,14 +25,90 @@ DB_PATH = './data/travel.db'
 def get_db_connection():
     """
     数据库连接上下文管理器
-    自动处理连接的打开和关闭
+    使用连接池中当前线程的唯读连接（mode=ro + mmap），离开时不关闭
+    """
+    with pooled_connection(DB_PATH, read_only=True) as conn:
+        yield conn  # row_factory 为 sqlite3.Row，可以通过列名访问
+
+# FTS5 trigram 索引至少需要 3 個字元，較短的關鍵字改用 LIKE
+FTS_MIN_KEYWORD_LENGTH = 3
+
+def fts_match_expression(keyword: Optional[str], columns: List[str]) -> Optional[str]:
     """
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row  # 使查询结果可以通过列名访问
+    建立 FTS5 MATCH 查询字串（限定欄位的片語查询）
+
+    Args:
+        keyword: 搜索关键词
+        columns: FTS 欄位（title / title_alt / location / category）
+
+    Returns:
+        str: MATCH 表達式；关键词太短或為空時返回 None
+    """
+    if not keyword or len(keyword.strip()) < FTS_MIN_KEYWORD_LENGTH:
+        return None
+    phrase = '"' + keyword.strip().replace('"', '""') + '"'
+    return f"{{{' '.join(columns)}}} : {phrase}"
+
+def page_clause(page: Optional[int], page_size: Optional[int]) -> Tuple[str, list]:
+    """
+    建立 LIMIT / OFFSET 分頁子句
+
+    Args:
+        page: 頁碼（從 1 開始），None 代表不分頁
+        page_size: 每頁筆數
+
+    Returns:
+        (SQL 子句, 參數)；不分頁時為 ('', [])
+    """
+    if not page or not page_size:
+        return '', []
+    page_size = int(page_size)
+    return "LIMIT ? OFFSET ?", [page_size, (max(int(page), 1) - 1) * page_size]
+
+# ====== 搜尋結果快取 ======
+# 價格滑桿的刻度（元），價格範圍依此取整後作為快取鍵
+PRICE_STEP = 1000
+
+SEARCH_CACHE = QueryCache(maxsize=256, ttl=300)
+
+def _normalize_keyword(keyword):
+    """去除前後空白，空字串視為未指定"""
+    if keyword is None:
+        return None
+    keyword = str(keyword).strip()
+    return keyword or None
+
+def _normalize_stations(stations):
+    """車站列表與順序無關，排序並去除重複"""
+    return tuple(sorted(set(stations))) if stations else None
+
+def _normalize_price_range(price_range):
+    """價格範圍取整到滑桿刻度"""
+    if not price_range or not isinstance(price_range, (list, tuple)) or len(price_range) != 2:
+        return None
     try:
-        yield conn
-    finally:
-        conn.close()
+        return tuple(int(round(float(v) / PRICE_STEP)) * PRICE_STEP for v in price_range)
+    except (TypeError, ValueError):
+        return None
+
+def _normalize_page(value):
+    return int(value) if value else None
+
+SEARCH_NORMALIZERS = {
+    'keyword': _normalize_keyword,
+    'stations': _normalize_stations,
+    'price_range': _normalize_price_range,
+    'page': _normalize_page,
+    'page_size': _normalize_page,
+}
+
+def search_cache_stats() -> Dict[str, Any]:
+    """搜尋結果快取的命中統計"""
+    return SEARCH_CACHE.stats()
+
+def clear_search_cache() -> None:
+    """清空搜尋結果快取（目錄資料更新時會自動清空）"""
+    SEARCH_CACHE.clear()
 
 def get_all_restaurants(sort_by='TotalRating', ascending=False) -> pd.DataFrame:
     """
@@ -38,13 +121,10 @@ def get_all_restaurants(sort_by='TotalRating', ascending=False) -> pd.DataFrame:
     Returns:
         DataFrame: 餐厅数据
     """
-    with get_db_connection() as conn:
-        query = f"""
-            SELECT * FROM restaurants
-            ORDER BY {sort_by} {'ASC' if ascending else 'DESC'}
-        """
-        df = pd.read_sql_query(query, conn)
-    return df
+    df = catalog.get_table('restaurants').frame()
+    if df.empty or sort_by not in df.columns:
+        return df
+    return df.sort_values(sort_by, ascending=ascending, kind='mergesort').reset_index(drop=True)
 
 def get_random_top_restaurants(n=5, min_rating=4.0) -> pd.DataFrame:
     """
@@ -67,37 +147,35 @@ def get_random_top_restaurants(n=5, min_rating=4.0) -> pd.DataFrame:
         df = pd.read_sql_query(query, conn, params=(min_rating, n))
     return df
 
-def search_restaurants(
+def _restaurant_filters(
     keyword: Optional[str] = None,
     cuisine: Optional[str] = None,
     rating: Optional[str] = None,
     price_range: Optional[Tuple[float, float]] = None,
     min_reviews: Optional[int] = None,
-    stations: Optional[List[str]] = None,
-    sort_by: str = 'rating_desc'
-) -> pd.DataFrame:
+    stations: Optional[List[str]] = None
+) -> Tuple[str, list, Optional[str]]:
     """
-    高级餐厅搜索功能（使用 SQL 查询）
-
-    Args:
-        keyword: 搜索关键词（仅搜索餐厅名称和日文名称）
-        cuisine: 料理类型（FirstCategory）
-        rating: 评分范围（例如 "4-5"）
-        price_range: 价格范围 (min, max)
-        min_reviews: 最少评论数
-        stations: 车站列表
-        sort_by: 排序方式
+    建構餐廳搜索的 FROM / WHERE 子句（搜索與計數共用）
 
     Returns:
-        DataFrame: 筛选后的餐厅数据
+        (SQL 子句, 參數, FTS MATCH 表達式)
     """
-    with get_db_connection() as conn:
-        # 建構 SQL 查询
-        query_parts = ["SELECT * FROM restaurants WHERE 1=1"]
-        params = []
+    fts_query = fts_match_expression(keyword, ['title', 'title_alt'])
+    params = []
 
-        # 關鍵字搜索（僅搜索餐廳名稱）
+    # 關鍵字搜索（僅搜索餐廳名稱，使用 FTS5 索引）
+    if fts_query:
+        query_parts = ["""
+            FROM restaurants
+            JOIN restaurants_fts ON restaurants_fts.rowid = restaurants.Restaurant_ID
+            WHERE restaurants_fts MATCH ?
+        """]
+        params.append(fts_query)
+    else:
+        query_parts = ["FROM restaurants WHERE 1=1"]
         if keyword and keyword.strip():
+            # 少於 3 個字元的關鍵字無法使用 trigram 索引
             query_parts.append("""
                 AND (
                     Name LIKE ? OR
@@ -107,106 +185,114 @@ def search_restaurants(
             keyword_pattern = f"%{keyword.strip()}%"
             params.extend([keyword_pattern] * 2)
 
-        # 料理類型篩選
-        if cuisine:
-            query_parts.append("AND SecondCategory = ?")
-            params.append(cuisine)
-
-        # 評分篩選
-        if rating:
-            if isinstance(rating, str) and '-' in rating:
-                try:
-                    min_rating, max_rating = rating.split('-')
-                    min_rating = float(min_rating)
-                    max_rating = float(max_rating)
-                    if max_rating < 5:
-                        query_parts.append("AND TotalRating >= ? AND TotalRating < ?")
-                        params.extend([min_rating, max_rating])
-                    else:
-                        query_parts.append("AND TotalRating >= ? AND TotalRating <= ?")
-                        params.extend([min_rating, max_rating])
-                except (ValueError, AttributeError):
-                    pass
-            else:
-                try:
-                    rating_num = float(rating)
-                    query_parts.append("AND TotalRating >= ?")
-                    params.append(rating_num)
-                except (ValueError, TypeError):
-                    pass
-
-        # 價格範圍篩選
-        if price_range and isinstance(price_range, (list, tuple)) and len(price_range) == 2:
+    # 料理類型篩選
+    if cuisine:
+        query_parts.append("AND SecondCategory = ?")
+        params.append(cuisine)
+
+    # 評分篩選
+    if rating:
+        if isinstance(rating, str) and '-' in rating:
             try:
-                min_price, max_price = float(price_range[0]), float(price_range[1])
-                # 使用 SQL 計算average（使用 COALESCE 處理 NULL 值）
-                # 如果只有一個價格，使用該價格；如果兩個都有，使用平均值
-                if max_price < 30000:
-                    query_parts.append("""
-                        AND (
-                            CASE
-                                WHEN DinnerPrice IS NOT NULL AND DinnerPrice != ''
-                                     AND LunchPrice IS NOT NULL AND LunchPrice != ''
-                                THEN (CAST(SUBSTR(DinnerPrice, 2, INSTR(DinnerPrice, '～') - 2) AS REAL) +
-                                      CAST(SUBSTR(LunchPrice, 2, INSTR(LunchPrice, '～') - 2) AS REAL)) / 2.0
-                                WHEN DinnerPrice IS NOT NULL AND DinnerPrice != ''
-                                THEN CAST(SUBSTR(DinnerPrice, 2, INSTR(DinnerPrice, '～') - 2) AS REAL)
-                                WHEN LunchPrice IS NOT NULL AND LunchPrice != ''
-                                THEN CAST(SUBSTR(LunchPrice, 2, INSTR(LunchPrice, '～') - 2) AS REAL)
-                                ELSE 0
-                            END
-                        ) BETWEEN ? AND ?
-                    """)
-                    params.extend([min_price, max_price])
+                min_rating, max_rating = rating.split('-')
+                min_rating = float(min_rating)
+                max_rating = float(max_rating)
+                if max_rating < 5:
+                    query_parts.append("AND TotalRating >= ? AND TotalRating < ?")
+                    params.extend([min_rating, max_rating])
                 else:
-                    query_parts.append("""
-                        AND (
-                            CASE
-                                WHEN DinnerPrice IS NOT NULL AND DinnerPrice != ''
-                                     AND LunchPrice IS NOT NULL AND LunchPrice != ''
-                                THEN (CAST(SUBSTR(DinnerPrice, 2, INSTR(DinnerPrice, '～') - 2) AS REAL) +
-                                      CAST(SUBSTR(LunchPrice, 2, INSTR(LunchPrice, '～') - 2) AS REAL)) / 2.0
-                                WHEN DinnerPrice IS NOT NULL AND DinnerPrice != ''
-                                THEN CAST(SUBSTR(DinnerPrice, 2, INSTR(DinnerPrice, '～') - 2) AS REAL)
-                                WHEN LunchPrice IS NOT NULL AND LunchPrice != ''
-                                THEN CAST(SUBSTR(LunchPrice, 2, INSTR(LunchPrice, '～') - 2) AS REAL)
-                                ELSE 0
-                            END
-                        ) >= ?
-                    """)
-                    params.append(min_price)
-            except (ValueError, TypeError):
+                    query_parts.append("AND TotalRating >= ? AND TotalRating <= ?")
+                    params.extend([min_rating, max_rating])
+            except (ValueError, AttributeError):
                 pass
-
-        # 評論數筛选
-        if min_reviews:
+        else:
             try:
-                min_reviews_int = int(min_reviews)
-                if min_reviews_int > 0:
-                    query_parts.append("AND ReviewNum >= ?")
-                    params.append(min_reviews_int)
+                rating_num = float(rating)
+                query_parts.append("AND TotalRating >= ?")
+                params.append(rating_num)
             except (ValueError, TypeError):
                 pass
 
-        # 車站筛选
-        if stations and len(stations) > 0:
-            placeholders = ','.join(['?'] * len(stations))
-            query_parts.append(f"AND Station IN ({placeholders})")
-            params.extend(stations)
+    # 價格範圍篩選
+    if price_range and isinstance(price_range, (list, tuple)) and len(price_range) == 2:
+        try:
+            min_price, max_price = float(price_range[0]), float(price_range[1])
+            # AvgMinPrice：午餐/晚餐最低價的平均（只有一個價格時使用該價格），
+            # 由 migrate_restaurant_prices.py 預先計算並建立索引
+            if max_price < 30000:
+                query_parts.append("AND AvgMinPrice BETWEEN ? AND ?")
+                params.extend([min_price, max_price])
+            else:
+                query_parts.append("AND AvgMinPrice >= ?")
+                params.append(min_price)
+        except (ValueError, TypeError):
+            pass
+
+    # 評論數筛选
+    if min_reviews:
+        try:
+            min_reviews_int = int(min_reviews)
+            if min_reviews_int > 0:
+                query_parts.append("AND ReviewNum >= ?")
+                params.append(min_reviews_int)
+        except (ValueError, TypeError):
+            pass
+
+    # 車站筛选
+    if stations and len(stations) > 0:
+        placeholders = ','.join(['?'] * len(stations))
+        query_parts.append(f"AND Station IN ({placeholders})")
+        params.extend(stations)
+
+    return ' '.join(query_parts), params, fts_query
+
+@cached_query(SEARCH_CACHE, SEARCH_NORMALIZERS)
+def search_restaurants(
+    keyword: Optional[str] = None,
+    cuisine: Optional[str] = None,
+    rating: Optional[str] = None,
+    price_range: Optional[Tuple[float, float]] = None,
+    min_reviews: Optional[int] = None,
+    stations: Optional[List[str]] = None,
+    sort_by: str = 'rating_desc',
+    page: Optional[int] = None,
+    page_size: Optional[int] = None
+) -> pd.DataFrame:
+    """
+    高级餐厅搜索功能（使用 SQL 查询）
+
+    Args:
+        keyword: 搜索关键词（仅搜索餐厅名称和日文名称）
+        cuisine: 料理类型（FirstCategory）
+        rating: 评分范围（例如 "4-5"）
+        price_range: 价格范围 (min, max)
+        min_reviews: 最少评论数
+        stations: 车站列表
+        sort_by: 排序方式
+        page: 页码（从 1 开始），None 代表返回全部
+        page_size: 每页笔数
+
+    Returns:
+        DataFrame: 筛选后的餐厅数据
+    """
+    with get_db_connection() as conn:
+        # 建構 SQL 查询
+        filter_sql, params, fts_query = _restaurant_filters(
+            keyword, cuisine, rating, price_range, min_reviews, stations
+        )
+        query_parts = ["SELECT restaurants.*", filter_sql]
 
         # 排序
         order_clauses = []
         if keyword and keyword.strip():
-            # 優先排序：名稱完全符合 > 名稱開頭 > 日文名稱開頭 > 其他
+            # 優先排序：名稱完全符合 > 日文名稱完全符合 > 名稱開頭 > 日文名稱開頭 > 其他
             order_clauses.append("""
                 CASE
                     WHEN Name = ? THEN 1
                     WHEN JapaneseName = ? THEN 2
                     WHEN Name LIKE ? THEN 3
                     WHEN JapaneseName LIKE ? THEN 4
-                    WHEN Name LIKE ? THEN 5
-                    WHEN JapaneseName LIKE ? THEN 6
-                    ELSE 7
+                    ELSE 5
                 END
             """)
             keyword_param = keyword.strip()
@@ -214,10 +300,11 @@ def search_restaurants(
                 keyword_param,
                 keyword_param,
                 f"{keyword_param}%",
-                f"{keyword_param}%",
-                f"%{keyword_param}%",
-                f"%{keyword_param}%"
+                f"{keyword_param}%"
             ])
+            if fts_query:
+                # 其餘依 BM25 相關度（名稱權重高於車站與類別）
+                order_clauses.append("bm25(restaurants_fts, 10.0, 8.0, 2.0, 1.0)")
 
         if sort_by == 'rating_desc':
             order_clauses.extend(['TotalRating DESC', 'ReviewNum DESC'])
@@ -226,13 +313,19 @@ def search_restaurants(
         elif sort_by == 'name_asc':
             order_clauses.append('Name ASC')
         elif sort_by == 'price_asc':
-            # 價格排序（使用 SUBSTR 提取最低價格）
-            order_clauses.append("CAST(SUBSTR(DinnerPrice, 2, INSTR(DinnerPrice, '～') - 2) AS REAL) ASC")
+            # 價格排序（晚餐最低價，已建立索引）
+            order_clauses.append("DinnerPriceMin ASC")
         elif sort_by == 'price_desc':
-            order_clauses.append("CAST(SUBSTR(DinnerPrice, 2, INSTR(DinnerPrice, '～') - 2) AS REAL) DESC")
+            order_clauses.append("DinnerPriceMin DESC")
 
-        if order_clauses:
-            query_parts.append(f"ORDER BY {', '.join(order_clauses)}")
+        # 以主鍵作為最後排序條件，確保分頁結果穩定
+        order_clauses.append('Restaurant_ID ASC')
+        query_parts.append(f"ORDER BY {', '.join(order_clauses)}")
+
+        # 分頁
+        limit_sql, limit_params = page_clause(page, page_size)
+        query_parts.append(limit_sql)
+        params.extend(limit_params)
 
         # 執行查询
         query = ' '.join(query_parts)
@@ -240,6 +333,27 @@ def search_restaurants(
 
     return df
 
+@cached_query(SEARCH_CACHE, SEARCH_NORMALIZERS)
+def count_restaurants(
+    keyword: Optional[str] = None,
+    cuisine: Optional[str] = None,
+    rating: Optional[str] = None,
+    price_range: Optional[Tuple[float, float]] = None,
+    min_reviews: Optional[int] = None,
+    stations: Optional[List[str]] = None
+) -> int:
+    """
+    计算符合条件的餐厅数量（参数同 search_restaurants，不排序、不读取资料列）
+
+    Returns:
+        int: 餐厅数量
+    """
+    with get_db_connection() as conn:
+        filter_sql, params, _ = _restaurant_filters(
+            keyword, cuisine, rating, price_range, min_reviews, stations
+        )
+        return conn.execute(f"SELECT COUNT(*) {filter_sql}", params).fetchone()[0]
+
 def get_unique_stations() -> List[str]:
     """
     獲取所有唯一車站的名稱
@@ -288,14 +402,7 @@ def get_restaurant_by_id(restaurant_id: int) -> Optional[Dict[str, Any]]:
     Returns:
         Dict: 餐厅信息，如果不存在返回 None
     """
-    with get_db_connection() as conn:
-        query = "SELECT * FROM restaurants WHERE Restaurant_ID = ?"
-        cursor = conn.cursor()
-        cursor.execute(query, (restaurant_id,))
-        row = cursor.fetchone()
-        if row:
-            return dict(row)
-    return None
+    return catalog.get_table('restaurants').get(restaurant_id)
 
 def get_restaurant_count() -> int:
     """
@@ -304,11 +411,7 @@ def get_restaurant_count() -> int:
     Returns:
         int: 餐廳数量
     """
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        cursor.execute("SELECT COUNT(*) FROM restaurants")
-        count = cursor.fetchone()[0]
-    return count
+    return len(catalog.get_table('restaurants'))
 
 def get_top_rated_restaurants(limit: int = 10, min_reviews: int = 10) -> pd.DataFrame:
     """
@@ -352,7 +455,7 @@ def get_restaurants_by_category(rating_category: str) -> pd.DataFrame:
 
 def get_nearby_restaurants(lat: float, long: float, limit: int = 5, exclude_id: Optional[int] = None) -> List[Dict[str, Any]]:
     """
-    獲取附近的餐廳（使用 Haversine 距離計算）
+    獲取附近的餐廳（使用空間索引，只計算附近網格的 Haversine 距離）
 
     Args:
         lat: 中心緯度
@@ -363,114 +466,26 @@ def get_nearby_restaurants(lat: float, long: float, limit: int = 5, exclude_id:
     Returns:
         List[Dict]: 附近餐廳列表，包含距離訊息
     """
-    import math
-
-    def haversine_distance(lat1, lon1, lat2, lon2):
-        """
-        使用 Haversine 公式計算两點之间的距離（公里）
-        """
-        # 地球半径（公里）
-        R = 6371
-
-        # 轉換為弧度
-        lat1_rad = math.radians(lat1)
-        lon1_rad = math.radians(lon1)
-        lat2_rad = math.radians(lat2)
-        lon2_rad = math.radians(lon2)
-
-        # 計算差值
-        dlat = lat2_rad - lat1_rad
-        dlon = lon2_rad - lon1_rad
-
-        # Haversine 公式
-        a = math.sin(dlat / 2) ** 2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon / 2) ** 2
-        c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-
-        return R * c
-
-    with get_db_connection() as conn:
-        # 獲取所有有坐標的餐廳
-        query = """
-            SELECT * FROM restaurants
-            WHERE Lat IS NOT NULL AND Long IS NOT NULL
-        """
-
-        params = []
-
-        # 如果需要排除當前餐廳
-        if exclude_id is not None:
-            query += " AND Restaurant_ID != ?"
-            params.append(exclude_id)
-
-        cursor = conn.cursor()
-        cursor.execute(query, params)
-
-        # 獲取列名
-        columns = [description[0] for description in cursor.description]
-
-        # 計算所有餐廳的距離
-        restaurants_with_distance = []
-        for row in cursor.fetchall():
-            restaurant = dict(zip(columns, row))
-            # 計算距離
-            distance = haversine_distance(lat, long, restaurant['Lat'], restaurant['Long'])
-            restaurant['distance'] = distance
-            restaurants_with_distance.append(restaurant)
-
-        # 按距離排序並取前 N 個
-        restaurants_with_distance.sort(key=lambda x: x['distance'])
-        results = restaurants_with_distance[:limit]
-
+    exclude = [('restaurant', exclude_id)] if exclude_id is not None else None
+    nearest = spatial.k_nearest(lat, long, limit, types=['restaurant'], exclude=exclude)
+
+    restaurants = catalog.get_table('restaurants')
+    results = []
+    for point in nearest:
+        restaurant = restaurants.get(point['id'])
+        if restaurant is not None:
+            restaurant['distance'] = point['distance']
+            results.append(restaurant)
     return results
 
 def get_all_hotels():
-    """從資料庫獲取所有旅館資料"""
-    try:
-        hotels_df = pd.read_csv('data/Hotels.csv')
-        hotel_types_df = pd.read_csv('data/HotelTypes.csv')
-        types_df = pd.read_csv('data/Types.csv')
-        
-        # 合併旅館類型資訊
-        hotels_with_types = hotels_df.merge(
-            hotel_types_df, 
-            on='Hotel_ID', 
-            how='left'
-        ).merge(
-            types_df, 
-            on='Type_ID', 
-            how='left'
-        )
-        
-        # 將同一旅館的多個類型合併為列表
-        hotels_aggregated = hotels_with_types.groupby('Hotel_ID').agg({
-            'HotelName': 'first',
-            'Address': 'first',
-            'Rating': 'first',
-            'UserRatingsTotal': 'first',
-            'Lat': 'first',
-            'Long': 'first',
-            'Place_ID': 'first',
-            'TypeName': lambda x: list(x.dropna().unique()) if x.notna().any() else []
-        }).reset_index()
-        
-        # 重命名欄位以保持一致性
-        hotels_aggregated.rename(columns={'TypeName': 'Types'}, inplace=True)
-        
-        return hotels_aggregated
-    except Exception as e:
-        print(f"Error loading hotels: {e}")
-        return pd.DataFrame()
+    """獲取所有旅館資料（由記憶體目錄提供，Types 為類型列表）"""
+    return catalog.get_table('hotels').frame()
 
 def get_hotel_by_id(hotel_id: int) -> Optional[dict]:
     """根據 ID 獲取單一旅館資料"""
     try:
-        hotels_df = get_all_hotels()
-        hotel = hotels_df[hotels_df['Hotel_ID'] == hotel_id]
-        
-        if hotel.empty:
-            return None
-        
-        return hotel.iloc[0].to_dict()
+        return catalog.get_table('hotels').get(hotel_id)
     except Exception as e:
         print(f"Error getting hotel by ID: {e}")
         return None
@@ -478,7 +493,7 @@ def get_hotel_by_id(hotel_id: int) -> Optional[dict]:
 def get_random_top_hotels(n: int = 5, min_rating: float = 4.0) -> pd.DataFrame:
     """隨機選擇高評分旅館"""
     try:
-        hotels_df = get_all_hotels()
+        hotels_df = catalog.get_table('hotels').df
         
         # 篩選高評分旅館
         top_hotels = hotels_df[hotels_df['Rating'] >= min_rating]
@@ -487,108 +502,265 @@ def get_random_top_hotels(n: int = 5, min_rating: float = 4.0) -> pd.DataFrame:
         if len(top_hotels) > n:
             return top_hotels.sample(n=n, random_state=None)
         else:
-            return top_hotels
+            return top_hotels.copy()
     except Exception as e:
         print(f"Error getting random top hotels: {e}")
         return pd.DataFrame()
 
+def _hotel_filters(
+    keyword: Optional[str] = None,
+    hotel_type: Optional[str] = None,
+    min_rating: Optional[float] = None
+) -> Tuple[str, list, Optional[str]]:
+    """
+    建構旅館搜尋在 FROM hotels h 之後的 JOIN / WHERE 子句（搜尋與計數共用）
+
+    Returns:
+        (SQL 子句, 參數, FTS MATCH 表達式)
+    """
+    query_parts = []
+    params = []
+
+    # 關鍵字搜尋 (名稱或地址，使用 FTS5 索引)
+    fts_query = fts_match_expression(keyword, ['title', 'location'])
+    if fts_query:
+        query_parts.append("""
+            JOIN hotels_fts ON hotels_fts.rowid = h.Hotel_ID
+            WHERE hotels_fts MATCH ?
+        """)
+        params.append(fts_query)
+    else:
+        query_parts.append("WHERE 1=1")
+        if keyword and keyword.strip():
+            query_parts.append("AND (h.HotelName LIKE ? OR h.Address LIKE ?)")
+            keyword_pattern = f"%{keyword.strip()}%"
+            params.extend([keyword_pattern] * 2)
+
+    # 類型篩選
+    if hotel_type:
+        query_parts.append("""
+            AND h.Hotel_ID IN (
+                SELECT ht.Hotel_ID FROM hotel_types ht
+                JOIN types t ON t.Type_ID = ht.Type_ID
+                WHERE t.TypeName = ?
+            )
+        """)
+        params.append(hotel_type)
+
+    # 評分篩選
+    if min_rating:
+        query_parts.append("AND h.Rating >= ?")
+        params.append(min_rating)
+
+    return ' '.join(query_parts), params, fts_query
+
+@cached_query(SEARCH_CACHE, SEARCH_NORMALIZERS, fallback=pd.DataFrame)
 def search_hotels(
     keyword: Optional[str] = None,
     hotel_type: Optional[str] = None,
     min_rating: Optional[float] = None,
-    sort_by: str = 'rating_desc'
+    sort_by: str = 'rating_desc',
+    page: Optional[int] = None,
+    page_size: Optional[int] = None
 ) -> pd.DataFrame:
-    """搜尋旅館 (支援多種篩選條件)"""
-    try:
-        hotels_df = get_all_hotels()
-        
-        # 關鍵字搜尋 (名稱或地址)
-        if keyword:
-            keyword_lower = keyword.lower()
-            mask = (
-                hotels_df['HotelName'].str.lower().str.contains(keyword_lower, na=False) |
-                hotels_df['Address'].str.lower().str.contains(keyword_lower, na=False)
-            )
-            hotels_df = hotels_df[mask]
-        
-        # 類型篩選
-        if hotel_type:
-            hotels_df = hotels_df[
-                hotels_df['Types'].apply(lambda types: hotel_type in types if isinstance(types, list) else False)
-            ]
-        
-        # 評分篩選
-        if min_rating:
-            hotels_df = hotels_df[hotels_df['Rating'] >= min_rating]
-        
-        # 排序
+    """搜尋旅館 (支援多種篩選條件與分頁，使用 SQL 查询；查詢失敗時返回空 DataFrame 且不快取)"""
+    with get_db_connection() as conn:
+        filter_sql, params, fts_query = _hotel_filters(keyword, hotel_type, min_rating)
+        query_parts = [catalog.HOTEL_SELECT, filter_sql]
+        order_clauses = []
+
+        # 排序：有關鍵字時先依名稱完全符合 / 開頭 / BM25 相關度
+        if keyword and keyword.strip():
+            order_clauses.append("CASE WHEN h.HotelName = ? THEN 1 WHEN h.HotelName LIKE ? THEN 2 ELSE 3 END")
+            params.extend([keyword.strip(), f"{keyword.strip()}%"])
+            if fts_query:
+                order_clauses.append("bm25(hotels_fts, 10.0, 1.0, 2.0, 1.0)")
+
         if sort_by == 'rating_desc':
-            hotels_df = hotels_df.sort_values('Rating', ascending=False)
+            order_clauses.extend(["h.Rating IS NULL", "h.Rating DESC", "h.UserRatingsTotal DESC"])
         elif sort_by == 'rating_asc':
-            hotels_df = hotels_df.sort_values('Rating', ascending=True)
+            order_clauses.extend(["h.Rating IS NULL", "h.Rating ASC"])
         elif sort_by == 'reviews_desc':
-            hotels_df = hotels_df.sort_values('UserRatingsTotal', ascending=False)
+            order_clauses.extend(["h.UserRatingsTotal IS NULL", "h.UserRatingsTotal DESC"])
         elif sort_by == 'name_asc':
-            hotels_df = hotels_df.sort_values('HotelName', ascending=True)
-        
-        return hotels_df
-    except Exception as e:
-        print(f"Error searching hotels: {e}")
-        return pd.DataFrame()
+            order_clauses.append("h.HotelName ASC")
+
+        # 以主鍵作為最後排序條件，確保分頁結果穩定
+        order_clauses.append("h.Hotel_ID ASC")
+        query_parts.append(f"ORDER BY {', '.join(order_clauses)}")
+
+        limit_sql, limit_params = page_clause(page, page_size)
+        query_parts.append(limit_sql)
+        params.extend(limit_params)
+
+        df = pd.read_sql_query(' '.join(query_parts), conn, params=params)
+
+    return catalog.split_types(df)
+
+@cached_query(SEARCH_CACHE, SEARCH_NORMALIZERS, fallback=int)
+def count_hotels(
+    keyword: Optional[str] = None,
+    hotel_type: Optional[str] = None,
+    min_rating: Optional[float] = None
+) -> int:
+    """計算符合條件的旅館數量（參數同 search_hotels；查詢失敗時返回 0 且不快取）"""
+    with get_db_connection() as conn:
+        filter_sql, params, _ = _hotel_filters(keyword, hotel_type, min_rating)
+        return conn.execute(f"SELECT COUNT(*) FROM hotels h {filter_sql}", params).fetchone()[0]
 
 def get_unique_hotel_types() -> List[str]:
     """獲取所有唯一的旅館類型"""
     try:
-        types_df = pd.read_csv('data/Types.csv')
-        return sorted(types_df['TypeName'].unique().tolist())
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT TypeName FROM types ORDER BY TypeName")
+            return [row[0] for row in cursor.fetchall()]
     except Exception as e:
         print(f"Error getting hotel types: {e}")
         return []
 
 def get_nearby_hotels(lat: float, lon: float, limit: int = 5, exclude_id: Optional[int] = None) -> List[dict]:
-    """獲取附近的旅館 (基於經緯度計算距離)"""
+    """獲取附近的旅館 (使用空間索引計算距離)"""
     try:
-        hotels_df = get_all_hotels()
-        
-        # 排除指定的旅館
-        if exclude_id:
-            hotels_df = hotels_df[hotels_df['Hotel_ID'] != exclude_id]
-        
-        # 計算距離 (使用 Haversine 公式)
-        def haversine_distance(lat1, lon1, lat2, lon2):
-            R = 6371  # 地球半徑 (公里)
-            dlat = math.radians(lat2 - lat1)
-            dlon = math.radians(lon2 - lon1)
-            a = (math.sin(dlat / 2) ** 2 + 
-                 math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * 
-                 math.sin(dlon / 2) ** 2)
-            c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
-            return R * c
-        
-        hotels_df['distance'] = hotels_df.apply(
-            lambda row: haversine_distance(lat, lon, row['Lat'], row['Long']),
-            axis=1
-        )
-        
-        # 排序並限制數量
-        nearby = hotels_df.nsmallest(limit, 'distance')
-        
-        return nearby.to_dict('records')
+        exclude = [('hotel', exclude_id)] if exclude_id else None
+        nearest = spatial.k_nearest(lat, lon, limit, types=['hotel'], exclude=exclude)
+
+        hotels = catalog.get_table('hotels')
+        results = []
+        for point in nearest:
+            hotel = hotels.get(point['id'])
+            if hotel is not None:
+                hotel['distance'] = point['distance']
+                results.append(hotel)
+        return results
     except Exception as e:
         print(f"Error getting nearby hotels: {e}")
         return []
 
 def get_hotels_by_type(type_name: str) -> pd.DataFrame:
     """根據類型獲取旅館列表"""
+    return search_hotels(hotel_type=type_name, sort_by='rating_desc')
+
+# 評論資料表（由 migrate_reviews_to_db.py 建立）：類型 -> (資料表, 項目 ID 欄位)
+REVIEW_TABLES = {
+    'restaurant': ('restaurant_reviews', 'Restaurant_ID'),
+    'hotel': ('hotel_reviews', 'Hotel_ID'),
+}
+
+def _get_item_reviews(item_type: str, item_id: int) -> List[Dict[str, Any]]:
+    """依 (項目 ID, 日期) 索引讀取單一餐廳 / 旅館的所有評論"""
+    table, id_column = REVIEW_TABLES[item_type]
     try:
-        hotels_df = get_all_hotels()
-        filtered = hotels_df[
-            hotels_df['Types'].apply(lambda types: type_name in types if isinstance(types, list) else False)
-        ]
-        return filtered.sort_values('Rating', ascending=False)
-    except Exception as e:
-        print(f"Error getting hotels by type: {e}")
-        return pd.DataFrame()
+        with get_db_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT Review_ID, Review_Rating, Review_Text, Review_Date
+                FROM {table}
+                WHERE {id_column} = ?
+                ORDER BY Review_Date, Review_ID
+            """, (int(item_id),)).fetchall()
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"Error getting {item_type} reviews: {e}")
+        return []
+    return [
+        {'review_id': row[0], 'rating': row[1], 'comment': row[2], 'date': row[3]}
+        for row in rows
+    ]
+
+def get_restaurant_reviews(restaurant_id: int) -> List[Dict[str, Any]]:
+    """
+    獲取餐廳的所有評論
+
+    Returns:
+        List[Dict]: {'review_id', 'rating', 'comment', 'date'}（舊到新）
+    """
+    return _get_item_reviews('restaurant', restaurant_id)
+
+def get_hotel_reviews(hotel_id: int) -> List[Dict[str, Any]]:
+    """
+    獲取旅館的所有評論
+
+    Returns:
+        List[Dict]: {'review_id', 'rating', 'comment', 'date'}（舊到新）
+    """
+    return _get_item_reviews('hotel', hotel_id)
+
+def get_reviews(item_type: str, item_id: int, star: Optional[int] = None,
+                cursor: Optional[int] = None, limit: int = 20) -> Dict[str, Any]:
+    """
+    分頁讀取評論（keyset 分頁，依 Review_ID 排序）
+
+    有指定星等時使用 (項目 ID, Review_Rating) 索引，索引本身即依 Review_ID 排序，
+    每頁只讀取 limit 筆
+
+    Args:
+        item_type: 'restaurant' 或 'hotel'
+        item_id: 餐廳 / 旅館 ID
+        star: 只返回此星等（1~5）的評論，None 代表全部
+        cursor: 上一頁返回的 next_cursor，None 代表第一頁
+        limit: 每頁筆數
+
+    Returns:
+        Dict: {'reviews': [{'review_id', 'rating', 'comment', 'date'}], 'next_cursor'}
+              沒有下一頁時 next_cursor 為 None
+    """
+    table, id_column = REVIEW_TABLES[item_type]
+    query = f"""
+        SELECT Review_ID, Review_Rating, Review_Text, Review_Date
+        FROM {table}
+        WHERE {id_column} = ?
+    """
+    try:
+        params = [int(item_id)]
+        if star is not None:
+            query += " AND Review_Rating = ?"
+            params.append(int(star))
+        if cursor is not None:
+            query += " AND Review_ID > ?"
+            params.append(int(cursor))
+        query += " ORDER BY Review_ID LIMIT ?"
+        params.append(int(limit) + 1)
+
+        with get_db_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"Error getting reviews: {e}")
+        return {'reviews': [], 'next_cursor': None}
+
+    page = rows[:limit]
+    return {
+        'reviews': [
+            {'review_id': row[0], 'rating': row[1], 'comment': row[2], 'date': row[3]}
+            for row in page
+        ],
+        'next_cursor': page[-1][0] if len(rows) > limit else None,
+    }
+
+def get_review_stats(item_type: str, item_id: int) -> Dict[str, Any]:
+    """
+    獲取餐廳 / 旅館的評論統計（review_stats 資料表，由觸發器即時維護）
+
+    Args:
+        item_type: 'restaurant' 或 'hotel'
+        item_id: 餐廳 / 旅館 ID
+
+    Returns:
+        Dict: {'count', 'histogram'（1~5 星的數量）, 'mean', 'latest_date'}
+    """
+    stats = {'count': 0, 'histogram': [0, 0, 0, 0, 0], 'mean': None, 'latest_date': None}
+    try:
+        with get_db_connection() as conn:
+            row = conn.execute("""
+                SELECT Review_Count, Star1, Star2, Star3, Star4, Star5, Rating_Mean, Latest_Review_Date
+                FROM review_stats
+                WHERE Item_Type = ? AND Item_ID = ?
+            """, (item_type, int(item_id))).fetchone()
+    except (sqlite3.Error, TypeError, ValueError) as e:
+        print(f"Error getting review stats: {e}")
+        return stats
+    if row:
+        stats.update(count=row[0], histogram=list(row[1:6]), mean=row[6], latest_date=row[7])
+    return stats
+
 def get_all_reviews() -> pd.DataFrame:
     """讀取你上傳的 Review CSV"""
     try:
@@ -601,57 +773,135 @@ def get_all_reviews() -> pd.DataFrame:
         print("Error: 'booking reviews copy.csv' not found.")
         return pd.DataFrame()
 
-def get_booking_data(hotel_id=None) -> pd.DataFrame:
+def _booking_filters(hotel_id=None, start_date=None, end_date=None) -> Tuple[str, list]:
     """
-    讀取由 generate_booking.py 產生的 bookings.csv
+    建構訂單查詢的 WHERE 子句（hotel_id 與入住日期範圍，可使用 (hotel_id, check_in_date) 主鍵）
+
+    Returns:
+        (SQL 子句, 參數)
     """
+    clauses = ["1=1"]
+    params = []
+    if hotel_id is not None:
+        try:
+            clauses.append("hotel_id = ?")
+            params.append(int(hotel_id))
+        except (TypeError, ValueError):
+            clauses.pop()  # 如果轉型失敗就不篩選，避免報錯
+    if start_date is not None:
+        clauses.append("check_in_date >= ?")
+        params.append(pd.Timestamp(start_date).strftime('%Y-%m-%d'))
+    if end_date is not None:
+        clauses.append("check_in_date <= ?")
+        params.append(pd.Timestamp(end_date).strftime('%Y-%m-%d'))
+    return "WHERE " + " AND ".join(clauses), params
+
+def _read_bookings(query: str, params: list, parse_dates=None) -> pd.DataFrame:
+    """執行訂單查詢；bookings 資料表不存在時返回空的 DataFrame"""
     try:
-        # 讀取 CSV
-        df = pd.read_csv('data/bookings.csv', parse_dates=['booking_date', 'check_in_date'])
-        
-        # 如果有指定 hotel_id，就只篩選該飯店的資料
-        if hotel_id is not None:
-            # 確保 ID 格式一致 (轉成 int 比較保險)
-            try:
-                hotel_id = int(hotel_id)
-                df = df[df['hotel_id'] == hotel_id]
-            except:
-                pass # 如果轉型失敗就不篩選，避免報錯
-                
-        return df
-    except FileNotFoundError:
-        print("Error: 'data/bookings.csv' not found. Please run generate_booking.py first.")
+        with get_db_connection() as conn:
+            return pd.read_sql_query(query, conn, params=params, parse_dates=parse_dates)
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        print(f"Error reading bookings ({e}). Please run migrate_bookings_to_db.py first.")
         return pd.DataFrame()
 
-def get_revenue_trend(hotel_id=None):
-    """取得營收趨勢 (從 CSV 讀取)"""
-    df = get_booking_data(hotel_id)
-    
-    if df.empty:
-        return pd.DataFrame()
-        
-    # 過濾掉取消的訂單
-    df = df[df['status'] == 'Confirmed']
-    
-    # 按月統計
-    df['Month'] = df['check_in_date'].dt.to_period('M').astype(str)
-    trend = df.groupby('Month')['price_paid'].sum().reset_index()
-    trend.rename(columns={'price_paid': 'Revenue'}, inplace=True)
-    
-    return trend
+def get_booking_data(hotel_id=None, start_date=None, end_date=None) -> pd.DataFrame:
+    """
+    讀取訂單資料（bookings 資料表，由 migrate_bookings_to_db.py 自 bookings.csv 匯入）
 
-def get_occupancy_status(hotel_id=None):
-    """取得入住狀態分佈 (從 CSV 讀取)"""
-    df = get_booking_data(hotel_id)
-    
-    if df.empty:
-        return pd.DataFrame()
-        
-    # 按月統計
-    df['Month'] = df['check_in_date'].dt.to_period('M').astype(str)
-    status_counts = df.groupby(['Month', 'status']).size().reset_index(name='Count')
-    
-    return status_counts
+    Args:
+        hotel_id: 只讀取該飯店的訂單，None 代表全部
+        start_date, end_date: 入住日期範圍（含），None 代表不限
+
+    Returns:
+        DataFrame: booking_date / check_in_date 為 datetime 欄位
+    """
+    where_sql, params = _booking_filters(hotel_id, start_date, end_date)
+    return _read_bookings(
+        f"SELECT * FROM bookings {where_sql} ORDER BY check_in_date",
+        params,
+        parse_dates=['booking_date', 'check_in_date']
+    )
+
+def _cube_filters(hotel_id=None, start_month=None, end_month=None) -> Tuple[str, list]:
+    """建構 booking_cube 查詢的 WHERE 子句（月份為 'YYYY-MM'，範圍含頭尾）"""
+    clauses = ["1=1"]
+    params = []
+    if hotel_id is not None:
+        try:
+            params.append(int(hotel_id))
+            clauses.append("hotel_id = ?")
+        except (TypeError, ValueError):
+            pass  # 如果轉型失敗就不篩選，避免報錯
+    if start_month is not None:
+        clauses.append("month >= ?")
+        params.append(pd.Timestamp(start_month).strftime('%Y-%m'))
+    if end_month is not None:
+        clauses.append("month <= ?")
+        params.append(pd.Timestamp(end_month).strftime('%Y-%m'))
+    return "WHERE " + " AND ".join(clauses), params
+
+def get_booking_cube(hotel_id=None, start_month=None, end_month=None) -> pd.DataFrame:
+    """
+    讀取預先彙總的訂單立方體（booking_cube，由 migrate_bookings_to_db.py 建立並以觸發器維護）
+
+    Args:
+        hotel_id: 只讀取該飯店，None 代表全部
+        start_month, end_month: 入住月份範圍（含），None 代表不限
+
+    Returns:
+        DataFrame: hotel_id, month, status, booking_count, priced_count（有金額的訂單數）, revenue, avg_price
+    """
+    where_sql, params = _cube_filters(hotel_id, start_month, end_month)
+    return _read_bookings(f"""
+        SELECT hotel_id, month, status, booking_count, priced_count, revenue, avg_price
+        FROM booking_cube {where_sql}
+        ORDER BY hotel_id, month, status
+    """, params)
+
+def get_revenue_trend(hotel_id=None, start_month=None, end_month=None):
+    """取得營收趨勢（讀取 booking_cube 中已確認訂單的月營收）"""
+    where_sql, params = _cube_filters(hotel_id, start_month, end_month)
+    return _read_bookings(f"""
+        SELECT month AS Month, SUM(revenue) AS Revenue
+        FROM booking_cube {where_sql} AND status = 'Confirmed'
+        GROUP BY month
+        ORDER BY month
+    """, params)
+
+def get_occupancy_status(hotel_id=None, start_month=None, end_month=None):
+    """取得入住狀態分佈（讀取 booking_cube 的月份、狀態筆數）"""
+    where_sql, params = _cube_filters(hotel_id, start_month, end_month)
+    return _read_bookings(f"""
+        SELECT month AS Month, status, SUM(booking_count) AS Count
+        FROM booking_cube {where_sql}
+        GROUP BY month, status
+        ORDER BY month, status
+    """, params)
+
+def get_hotel_booking_stats() -> pd.DataFrame:
+    """
+    各飯店的訂單統計（由 booking_cube 彙總，不需讀取原始訂單）
+
+    Returns:
+        DataFrame: Hotel_ID, booking_count, avg_price（全部訂單平均實付）,
+                   confirmed_avg_price（已確認訂單平均實付）, cancellation_rate
+                   （平均實付只計入有金額的訂單）
+    """
+    return _read_bookings("""
+        SELECT hotel_id AS Hotel_ID,
+               SUM(booking_count) AS booking_count,
+               SUM(revenue) / NULLIF(SUM(priced_count), 0) AS avg_price,
+               SUM(CASE WHEN status = 'Confirmed' THEN revenue END)
+                   / NULLIF(SUM(CASE WHEN status = 'Confirmed' THEN priced_count END), 0) AS confirmed_avg_price,
+               SUM(CASE WHEN status = 'Cancelled' THEN booking_count ELSE 0 END) * 1.0
+                   / SUM(booking_count) AS cancellation_rate
+        FROM booking_cube
+        GROUP BY hotel_id
+        ORDER BY hotel_id
+    """, [])
+
+BOOKING_REVIEWS_CSV = 'data/booking reviews copy.csv'
 
 def get_market_analysis_data():
     """
@@ -667,36 +917,24 @@ def get_market_analysis_data():
 
     # 2. 處理訂單數據 (計算平均價格 & 取消率)
     try:
-        bookings = pd.read_csv('data/bookings.csv')
-        booking_stats = bookings.groupby('hotel_id').agg({
-            'price_paid': 'mean',
-            'status': lambda x: (x == 'Cancelled').sum() / len(x) if len(x) > 0 else 0
-        }).reset_index()
-        booking_stats.rename(columns={'price_paid': 'avg_price', 'status': 'cancellation_rate'}, inplace=True)
+        booking_stats = get_hotel_booking_stats()[['Hotel_ID', 'avg_price', 'cancellation_rate']]
     except:
         return pd.DataFrame()
 
     # 3. 處理評論數據 (真實數據)
     try:
-        reviews = pd.read_csv('data/booking reviews copy.csv')
+        reviews = pd.read_csv(BOOKING_REVIEWS_CSV)
         review_stats = reviews.groupby('hotel_name').agg({
             'rating': 'mean',
             'review_text': 'count'
         }).reset_index()
         review_stats.rename(columns={'rating': 'avg_rating', 'review_text': 'review_count', 'hotel_name': 'HotelName'}, inplace=True)
         
-        # 負評關鍵字分析
-        def count_keywords(text_series, keyword):
-            if text_series.empty: return 0
-            return text_series.str.contains(keyword, case=False, na=False).sum()
-
-        keyword_stats = reviews.groupby('hotel_name')['review_text'].apply(
-            lambda x: pd.Series({
-                'dirty_mentions': count_keywords(x, 'dirty'),
-                'total_reviews': len(x)
-            })
-        ).unstack().reset_index()
-        keyword_stats.rename(columns={'hotel_name': 'HotelName'}, inplace=True)
+        # 負評標籤分析（單次掃描評論文字，依飯店彙總標籤數；檔案未變更時沿用快取的遮罩）
+        reviews['tag_mask'] = tag_file_reviews(BOOKING_REVIEWS_CSV, reviews['review_text'])
+        keyword_stats = tag_counts(reviews['hotel_name'], reviews['tag_mask'], tags=['dirty'])
+        keyword_stats = keyword_stats.rename(columns={'dirty': 'dirty_mentions', 'review_count': 'total_reviews'})
+        keyword_stats = keyword_stats[['dirty_mentions', 'total_reviews']].rename_axis('HotelName').reset_index()
         
     except:
         review_stats = pd.DataFrame(columns=['HotelName', 'avg_rating', 'review_count'])
@@ -733,19 +971,13 @@ def get_market_analysis_data():
     return final_df
 
 def get_all_attractions():
-    """從 CSV 獲取所有景點資料"""
+    """獲取所有景點資料（由記憶體目錄提供）"""
     try:
-        attractions_df = pd.read_csv('data/Kyoto_attractions.csv')
-        
-        # 確保 Lat/Lng 為數值
-        attractions_df['Lat'] = pd.to_numeric(attractions_df['Lat'], errors='coerce')
-        attractions_df['Lng'] = pd.to_numeric(attractions_df['Lng'], errors='coerce')
-        
-        # 為了保持一致性，將 Lng 重命名為 Long (如果需要)
-        # 但 create_hotel_map_chart 用的是 Long, create_restaurant_map_chart 用的是 Long
-        attractions_df.rename(columns={'Lng': 'Long'}, inplace=True)
-        
-        return attractions_df
+        attractions_df = catalog.get_table('attractions').df
+
+        # 為了保持一致性，只保留 Long 欄位 (Lng 的別名，由目錄預先計算)
+        # create_hotel_map_chart 與 create_restaurant_map_chart 用的都是 Long
+        return attractions_df.drop(columns=['Lng'])
     except Exception as e:
         print(f"Error loading attractions: {e}")
         return pd.DataFrame()
@@ -771,258 +1003,496 @@ def get_unique_attraction_types() -> list:
         cursor.execute("SELECT DISTINCT Type FROM attractions WHERE Type IS NOT NULL ORDER BY Type")
         return [row[0] for row in cursor.fetchall()]
 
-def search_attractions(keyword=None, attr_type=None, min_rating=None, max_rating=None, min_reviews=None, sort_by='rating_desc') -> pd.DataFrame:
-    """搜尋景點 (支援關鍵字、類型、評分範圍、最小評論數)"""
-    with get_db_connection() as conn:
-        query = "SELECT * FROM attractions WHERE 1=1"
-        params = []
+def _attraction_filters(keyword=None, attr_type=None, min_rating=None, max_rating=None, min_reviews=None):
+    """建構景點搜尋的 FROM / WHERE 子句（搜尋與計數共用），返回 (SQL, 參數, FTS MATCH 表達式)"""
+    params = []
 
+    # 關鍵字搜尋 (名稱或地址，使用 FTS5 索引)
+    fts_query = fts_match_expression(keyword, ['title', 'location'])
+    if fts_query:
+        query = """
+            FROM attractions
+            JOIN attractions_fts ON attractions_fts.rowid = attractions.ID
+            WHERE attractions_fts MATCH ?
+        """
+        params.append(fts_query)
+    else:
+        query = "FROM attractions WHERE 1=1"
         if keyword:
             query += " AND (Name LIKE ? OR Address LIKE ?)"
             wildcard = f"%{keyword}%"
             params.extend([wildcard, wildcard])
 
-        if attr_type:
-            query += " AND Type = ?"
-            params.append(attr_type)
+    if attr_type:
+        query += " AND Type = ?"
+        params.append(attr_type)
 
-        if min_rating:
-            query += " AND Rating >= ?"
-            params.append(min_rating)
+    if min_rating:
+        query += " AND Rating >= ?"
+        params.append(min_rating)
 
-        if max_rating:
-            query += " AND Rating <= ?"
-            params.append(max_rating)
+    if max_rating:
+        query += " AND Rating <= ?"
+        params.append(max_rating)
 
-        if min_reviews:
-            query += " AND UserRatingsTotal >= ?"
-            params.append(min_reviews)
+    if min_reviews:
+        query += " AND UserRatingsTotal >= ?"
+        params.append(min_reviews)
+
+    return query, params, fts_query
+
+@cached_query(SEARCH_CACHE, SEARCH_NORMALIZERS)
+def search_attractions(keyword=None, attr_type=None, min_rating=None, max_rating=None, min_reviews=None,
+                       sort_by='rating_desc', page=None, page_size=None) -> pd.DataFrame:
+    """搜尋景點 (支援關鍵字、類型、評分範圍、最小評論數與分頁)"""
+    with get_db_connection() as conn:
+        filter_sql, params, fts_query = _attraction_filters(keyword, attr_type, min_rating, max_rating, min_reviews)
+        query = "SELECT attractions.* " + filter_sql
+
+        # 排序邏輯：有關鍵字時先依名稱完全符合 / 開頭 / BM25 相關度
+        order_clauses = []
+        if keyword and keyword.strip():
+            order_clauses.append("CASE WHEN Name = ? THEN 1 WHEN Name LIKE ? THEN 2 ELSE 3 END")
+            params.extend([keyword.strip(), f"{keyword.strip()}%"])
+            if fts_query:
+                order_clauses.append("bm25(attractions_fts, 10.0, 1.0, 2.0, 1.0)")
 
-        # 排序邏輯
         if sort_by == 'rating_desc':
-            query += " ORDER BY Rating DESC, UserRatingsTotal DESC"
+            order_clauses.extend(["Rating DESC", "UserRatingsTotal DESC"])
         elif sort_by == 'reviews_desc':
-            query += " ORDER BY UserRatingsTotal DESC"
+            order_clauses.append("UserRatingsTotal DESC")
         elif sort_by == 'name_asc':
-            query += " ORDER BY Name ASC"
+            order_clauses.append("Name ASC")
+
+        # 以主鍵作為最後排序條件，確保分頁結果穩定
+        order_clauses.append("attractions.ID ASC")
+        query += f" ORDER BY {', '.join(order_clauses)}"
+
+        limit_sql, limit_params = page_clause(page, page_size)
+        if limit_sql:
+            query += f" {limit_sql}"
+            params.extend(limit_params)
 
         return pd.read_sql_query(query, conn, params=params)
 
+@cached_query(SEARCH_CACHE, SEARCH_NORMALIZERS)
+def count_attractions(keyword=None, attr_type=None, min_rating=None, max_rating=None, min_reviews=None) -> int:
+    """計算符合條件的景點數量（參數同 search_attractions）"""
+    with get_db_connection() as conn:
+        filter_sql, params, _ = _attraction_filters(keyword, attr_type, min_rating, max_rating, min_reviews)
+        return conn.execute(f"SELECT COUNT(*) {filter_sql}", params).fetchone()[0]
+
 def get_attraction_by_id(attraction_id: int):
     """根據 ID 獲取單一景點詳細資料"""
-    print(f"DEBUG: Querying DB for ID {attraction_id} in {DB_PATH}") # 加這行
-    with get_db_connection() as conn:
-        cursor = conn.cursor()
-        # 這裡的 "ID" 必須跟你的資料庫欄位名稱完全一樣 (你的資料庫是 ID 大寫)
-        cursor.execute("SELECT * FROM attractions WHERE ID = ?", (attraction_id,))
-        row = cursor.fetchone()
-        if row:
-            return dict(row)
-    return None
+    # 這裡的 "ID" 對應資料庫的 ID 欄位 (大寫)
+    return catalog.get_table('attractions').get(attraction_id)
 
-def get_combined_analytics_data():
+COMBINED_ANALYTICS_COLUMNS = ['ID', 'Name', 'Lat', 'Long', 'Rating', 'Price', 'Type', 'SubCategory']
+
+# 整合分析資料只隨目錄版本變動，保存最新一份即可（目錄變更時自動清空）
+ANALYTICS_CACHE = QueryCache(maxsize=1, ttl=float('inf'))
+
+# 旅館價格估算：基礎房價 + 評分 * 每星價格，再乘上由 Hotel_ID 決定的 0.8 ~ 1.5 浮動係數
+HOTEL_BASE_PRICE = 3000
+HOTEL_PRICE_PER_STAR = 3000
+HOTEL_PRICE_FACTOR_RANGE = (0.8, 1.5)
+HOTEL_DEFAULT_RATING = 3.5
+
+def _numeric(df: pd.DataFrame, column: str) -> pd.Series:
+    """將欄位轉為 float（欄位不存在時為全 NaN）"""
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index)
+    return pd.to_numeric(df[column], errors='coerce').astype(float)
+
+def _text(df: pd.DataFrame, column: str, default: str) -> pd.Series:
+    """文字欄位，缺值以 default 補上"""
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[column].astype(object).where(df[column].notna(), default)
+
+def estimate_hotel_prices(hotel_ids, ratings) -> np.ndarray:
     """
-    整合 餐廳、旅館、景點 數據供分析使用 (修復版：含價格模擬與防呆)
+    估算旅館價格（資料中沒有房價）
+
+    以評分決定基礎價格，浮動係數由 Hotel_ID 的乘法雜湊決定，
+    同一間旅館每次得到相同價格
+
+    Args:
+        hotel_ids: 旅館 ID 陣列
+        ratings: 評分陣列（NaN 以 HOTEL_DEFAULT_RATING 計算）
+
+    Returns:
+        ndarray: 整數價格
     """
-    try:
-        # 1. 獲取原始資料
-        df_rest = get_all_restaurants()
-        df_hotel = get_all_hotels()
-        df_attr = search_attractions() 
+    ratings = np.nan_to_num(np.asarray(ratings, dtype=float), nan=HOTEL_DEFAULT_RATING)
+    hashed = (np.asarray(hotel_ids, dtype=np.uint64) * np.uint64(2654435761)) % np.uint64(2 ** 32)
+    low, high = HOTEL_PRICE_FACTOR_RANGE
+    factor = low + (high - low) * (hashed.astype(float) / 2 ** 32)
+    base_price = HOTEL_BASE_PRICE + ratings * HOTEL_PRICE_PER_STAR
+    return (base_price * factor).astype(np.int64)
+
+def _restaurant_analytics(df: pd.DataFrame) -> pd.DataFrame:
+    # 餐廳價格：LunchPriceAvg，沒有時用 DinnerPriceAvg，都沒有補 0
+    lunch = _numeric(df, 'LunchPriceAvg')
+    dinner = _numeric(df, 'DinnerPriceAvg')
+    price = lunch.where(lunch > 0, dinner.where(dinner > 0, 0.0))
+    return pd.DataFrame({
+        'ID': df['Restaurant_ID'],
+        'Name': df['Name'],
+        'Lat': _numeric(df, 'Lat'),
+        'Long': _numeric(df, 'Long'),
+        'Rating': _numeric(df, 'TotalRating').fillna(0.0),
+        'Price': price,
+        'Type': 'Restaurant',
+        'SubCategory': _text(df, 'FirstCategory', 'Food'),
+    })
+
+def _hotel_analytics(df: pd.DataFrame) -> pd.DataFrame:
+    rating = _numeric(df, 'Rating').fillna(HOTEL_DEFAULT_RATING)
+    return pd.DataFrame({
+        'ID': df['Hotel_ID'],
+        'Name': df['HotelName'],
+        'Lat': _numeric(df, 'Lat'),
+        'Long': _numeric(df, 'Long'),
+        'Rating': rating,
+        'Price': estimate_hotel_prices(df['Hotel_ID'], rating).astype(float),
+        'Type': 'Hotel',
+        'SubCategory': 'Accommodation',
+    })
+
+def _attraction_analytics(df: pd.DataFrame) -> pd.DataFrame:
+    # 景點價格設為 0，不參與矩陣顯示
+    return pd.DataFrame({
+        'ID': df['ID'],
+        'Name': df['Name'],
+        'Lat': _numeric(df, 'Lat'),
+        'Long': _numeric(df, 'Long' if 'Long' in df.columns else 'Lng'),
+        'Rating': _numeric(df, 'Rating').fillna(0.0),
+        'Price': 0.0,
+        'Type': 'Attraction',
+        'SubCategory': _text(df, 'Type', 'Spot'),
+    })
+
+@cached_query(ANALYTICS_CACHE)
+def _build_combined_analytics_data() -> pd.DataFrame:
+    """逐欄建立整合分析資料（每個目錄版本只建立一次）"""
+    builders = [
+        ('restaurants', _restaurant_analytics),
+        ('hotels', _hotel_analytics),
+        ('attractions', _attraction_analytics),
+    ]
+    frames = []
+    for table_name, build in builders:
+        df = catalog.get_table(table_name).df
+        if not df.empty:
+            frames.append(build(df))
+    if not frames:
+        return pd.DataFrame(columns=COMBINED_ANALYTICS_COLUMNS)
+    return pd.concat(frames, ignore_index=True)[COMBINED_ANALYTICS_COLUMNS]
 
-        combined_list = []
+def get_combined_analytics_data():
+    """
+    整合 餐廳、旅館、景點 數據供分析使用
 
-        # --- Helper: 餐廳價格解析 ---
-        def parse_rest_price(price_str):
-            if pd.isna(price_str) or str(price_str).strip() == '': return None
-            try:
-                # 這裡需要 import re
-                nums = re.findall(r'\d+', str(price_str).replace(',', ''))
-                if not nums: return None
-                prices = [float(n) for n in nums]
-                return sum(prices) / len(prices)
-            except: return None
-
-        # --- 處理餐廳 ---
-        if not df_rest.empty:
-            for _, row in df_rest.iterrows():
-                try:
-                    price = parse_rest_price(row.get('LunchPrice')) or parse_rest_price(row.get('DinnerPrice'))
-                    combined_list.append({
-                        'ID': row['Restaurant_ID'],
-                        'Name': row['Name'],
-                        'Lat': row['Lat'],
-                        'Long': row['Long'],
-                        'Rating': float(row['TotalRating']) if row.get('TotalRating') else 0,
-                        'Price': price if price else 0, # 沒價格補 0
-                        'Type': 'Restaurant',
-                        'SubCategory': row.get('FirstCategory', 'Food')
-                    })
-                except Exception as e:
-                    # 略過錯誤的資料行
-                    continue
-
-        # --- 處理旅館 (含價格模擬) ---
-        if not df_hotel.empty:
-            for _, row in df_hotel.iterrows():
-                try:
-                    # 1. 取得評分 (若無則預設 3.5)
-                    rating = float(row['Rating']) if row.get('Rating') and pd.notna(row['Rating']) else 3.5
-                    
-                    # 2. 智慧模擬價格邏輯 (解決一直線問題)
-                    # 邏輯：基礎房價 3000 + (評分 * 3000)
-                    base_price = 3000 + (rating * 3000)
-                    
-                    # 3. 加入隨機波動 (-20% ~ +50%)
-                    random_factor = random.uniform(0.8, 1.5)
-                    final_price = int(base_price * random_factor)
-
-                    combined_list.append({
-                        'ID': row['Hotel_ID'],
-                        'Name': row['HotelName'],
-                        'Lat': row['Lat'],
-                        'Long': row['Long'],
-                        'Rating': rating,
-                        'Price': final_price, # 模擬後的價格
-                        'Type': 'Hotel',
-                        'SubCategory': 'Accommodation'
-                    })
-                except Exception:
-                    continue
-
-        # --- 處理景點 ---
-        if not df_attr.empty:
-            for _, row in df_attr.iterrows():
-                try:
-                    # 嘗試兼容 Long 或 Lng 欄位名稱
-                    lng = row.get('Long') if 'Long' in row else row.get('Lng')
-                    
-                    combined_list.append({
-                        'ID': row['ID'],
-                        'Name': row['Name'],
-                        'Lat': row['Lat'],
-                        'Long': lng, 
-                        'Rating': float(row['Rating']) if row.get('Rating') else 0,
-                        'Price': 0, # 景點價格設為 0，不參與矩陣顯示
-                        'Type': 'Attraction',
-                        'SubCategory': row.get('Type', 'Spot')
-                    })
-                except Exception:
-                    continue
-
-        return pd.DataFrame(combined_list)
+    結果依目錄版本快取，旅館價格為可重現的估算值（見 estimate_hotel_prices）
 
+    Returns:
+        DataFrame: ID, Name, Lat, Long, Rating, Price, Type, SubCategory
+    """
+    try:
+        return _build_combined_analytics_data()
     except Exception as e:
         print(f"CRITICAL ERROR in get_combined_analytics_data: {e}")
         # 回傳空 DataFrame 防止整個 App 崩潰
-        return pd.DataFrame(columns=['ID', 'Name', 'Lat', 'Long', 'Rating', 'Price', 'Type', 'SubCategory'])
+        return pd.DataFrame(columns=COMBINED_ANALYTICS_COLUMNS)
 
 
 # ===== Favorites Helper Functions =====
 # These functions enrich favorites data with full item details
 
-def get_favorite_restaurants_full(user_id: int) -> pd.DataFrame:
+# Favorite item type -> (catalog table, ID column)
+FAVORITE_DETAIL_TABLES = {
+    'restaurant': ('restaurants', 'Restaurant_ID'),
+    'hotel': ('hotels', 'Hotel_ID'),
+    'attraction': ('attractions', 'ID'),
+}
+
+# Schema name under which travel.db is attached to the users.db connection
+CATALOG_SCHEMA = 'catalog'
+
+
+@contextmanager
+def favorites_catalog_connection():
+    """
+    Pooled users.db connection with travel.db attached as 'catalog'
+    Favorites can then be joined to catalog rows in a single query
     """
-    Get full restaurant data for user's favorited restaurants
+    from utils import favorites
 
-    Args:
-        user_id: User ID from session
+    with pooled_connection(favorites.DB_PATH) as conn:
+        attached = {row[1] for row in conn.execute('PRAGMA database_list')}
+        if CATALOG_SCHEMA not in attached:
+            conn.execute(f'ATTACH DATABASE ? AS {CATALOG_SCHEMA}', (DB_PATH,))
+        yield conn
 
-    Returns:
-        DataFrame with complete restaurant information
+
+def _favorite_details_query(item_type: str) -> str:
+    """Favorites of one type joined to their catalog rows"""
+    table, id_column = FAVORITE_DETAIL_TABLES[item_type]
+    columns = 'c.*'
+    if item_type == 'hotel':
+        columns += f""",
+               (SELECT GROUP_CONCAT(t.TypeName, '|')
+                FROM {CATALOG_SCHEMA}.hotel_types ht JOIN {CATALOG_SCHEMA}.types t ON t.Type_ID = ht.Type_ID
+                WHERE ht.Hotel_ID = c.Hotel_ID) AS Types"""
+    return f"""
+        SELECT {columns}
+        FROM favorites f
+        JOIN {CATALOG_SCHEMA}.{table} c ON c.{id_column} = f.item_id
+        WHERE f.user_id = ? AND f.item_type = ?
+        ORDER BY c.rowid
     """
-    from utils.favorites import get_user_favorites
 
-    favorites = get_user_favorites(user_id, 'restaurant')
-    if not favorites:
-        return pd.DataFrame()
 
-    # Get list of favorited restaurant IDs
-    fav_ids = [f['item_id'] for f in favorites]
+def _orphan_favorites_query(item_types, per_user: bool = True) -> str:
+    """
+    Favorites of the given types whose catalog rows no longer exist
 
-    # Query restaurants database for full data
-    with get_db_connection() as conn:
-        placeholders = ','.join('?' * len(fav_ids))
-        query = f"SELECT * FROM restaurants WHERE Restaurant_ID IN ({placeholders})"
-        df = pd.read_sql_query(query, conn, params=fav_ids)
-
-    # Auto-cleanup: Remove favorites for deleted restaurants
-    if len(df) < len(fav_ids):
-        from utils.favorites import remove_favorite
-        found_ids = set(df['Restaurant_ID'].tolist())
-        missing_ids = set(fav_ids) - found_ids
-        for missing_id in missing_ids:
-            remove_favorite(user_id, 'restaurant', missing_id)
+    A type is only checked while its catalog table has rows, so an empty or
+    half-migrated travel.db never marks every favorite of that type as orphaned.
+    Selects (user_id, item_type, item_id); takes the user ID as the first
+    parameter when per_user is set.
+    """
+    conditions = ' OR '.join(
+        f"(f.item_type = '{item_type}' AND EXISTS (SELECT 1 FROM {CATALOG_SCHEMA}.{table}) AND NOT EXISTS "
+        f"(SELECT 1 FROM {CATALOG_SCHEMA}.{table} c WHERE c.{id_column} = f.item_id))"
+        for item_type, (table, id_column) in FAVORITE_DETAIL_TABLES.items() if item_type in item_types
+    )
+    where = f"f.user_id = ? AND ({conditions})" if per_user else f"({conditions})"
+    return f"SELECT f.user_id, f.item_type, f.item_id FROM favorites f WHERE {where} ORDER BY f.user_id, f.id"
 
-    return df
 
+def remove_orphan_favorites(user_id: int, orphans: List[Tuple[str, int]]) -> None:
+    """
+    Remove favorites whose catalog rows no longer exist, in one DELETE
+    Queued on the users.db writer without waiting for the commit
 
-def get_favorite_hotels_full(user_id: int) -> pd.DataFrame:
+    Args:
+        user_id: User ID from session
+        orphans: (item_type, item_id) pairs
+    """
+    if not orphans:
+        return
+    from utils import favorites
+    from utils.write_behind import enqueue_write
+
+    values = ','.join(['(?, ?)'] * len(orphans))
+    params = [user_id] + [value for pair in orphans for value in pair]
+    enqueue_write(
+        favorites.DB_PATH,
+        f"DELETE FROM favorites WHERE user_id = ? AND (item_type, item_id) IN (VALUES {values})",
+        params
+    )
+    favorites.FAVORITES.bump(user_id)
+
+
+def get_favorites_with_details(user_id: int, item_types=tuple(FAVORITE_DETAIL_TABLES)) -> Dict[str, pd.DataFrame]:
     """
-    Get full hotel data for user's favorited hotels
+    Get full catalog data for a user's favorites of several types on one connection
+
+    Favorites in users.db are joined to travel.db through ATTACH. Favorites whose
+    items were deleted from the catalog are dropped from the result and cleaned
+    up with a single DELETE.
 
     Args:
         user_id: User ID from session
+        item_types: Types to load ('restaurant', 'hotel', 'attraction')
 
     Returns:
-        DataFrame with complete hotel information
+        Dict of item type -> DataFrame with complete item information
     """
-    from utils.favorites import get_user_favorites
+    results: Dict[str, pd.DataFrame] = {}
+    with favorites_catalog_connection() as conn:
+        for item_type in item_types:
+            df = pd.read_sql_query(_favorite_details_query(item_type), conn, params=(user_id, item_type))
+            if item_type == 'hotel':
+                df = catalog.split_types(df)
+            results[item_type] = df
+        orphans = [(item_type, item_id) for _, item_type, item_id
+                   in conn.execute(_orphan_favorites_query(item_types), (user_id,))]
+
+    # Auto-cleanup: Remove favorites for items deleted from the catalog
+    remove_orphan_favorites(user_id, orphans)
+    return results
 
-    favorites = get_user_favorites(user_id, 'hotel')
-    if not favorites:
-        return pd.DataFrame()
 
-    fav_ids = [f['item_id'] for f in favorites]
+def get_favorite_restaurants_full(user_id: int) -> pd.DataFrame:
+    """Get full restaurant data for user's favorited restaurants"""
+    return get_favorites_with_details(user_id, ('restaurant',))['restaurant']
 
-    # Hotels are loaded from CSV, so use existing get_all_hotels()
-    all_hotels = get_all_hotels()
-    if all_hotels.empty:
-        return pd.DataFrame()
 
-    # Filter for favorited hotels
-    favorited_hotels = all_hotels[all_hotels['Hotel_ID'].isin(fav_ids)]
+def get_favorite_hotels_full(user_id: int) -> pd.DataFrame:
+    """Get full hotel data for user's favorited hotels"""
+    return get_favorites_with_details(user_id, ('hotel',))['hotel']
+
 
-    # Auto-cleanup: Remove favorites for hotels no longer in CSV
-    if len(favorited_hotels) < len(fav_ids):
-        from utils.favorites import remove_favorite
-        found_ids = set(favorited_hotels['Hotel_ID'].tolist())
-        missing_ids = set(fav_ids) - found_ids
-        for missing_id in missing_ids:
-            remove_favorite(user_id, 'hotel', missing_id)
+def get_favorite_attractions_full(user_id: int) -> pd.DataFrame:
+    """Get full attraction data for user's favorited attractions"""
+    return get_favorites_with_details(user_id, ('attraction',))['attraction']
 
-    return favorited_hotels
+# ===== Favorite card snapshots =====
+# Favorites pages render from item_data['card'] stored with each favorite; a
+# background reconciler refreshes the snapshots after the catalog changes
 
+# Seconds between reconciler checks of the catalog version
+FAVORITE_RECONCILE_INTERVAL = 60
 
-def get_favorite_attractions_full(user_id: int) -> pd.DataFrame:
+# Seconds after which the reconciler runs even if the catalog version did not change
+FAVORITE_RECONCILE_FULL_INTERVAL = 3600
+
+# Most orphaned favorites one reconciler run may delete; the rest wait for a later run
+FAVORITE_ORPHAN_LIMIT = 100
+
+# Catalog version the snapshots were last reconciled against (None = never in this process)
+_reconciled_catalog_version = None
+
+# time.monotonic() of the last completed run
+_reconciled_at = 0.0
+
+
+def get_favorite_card(item_type: str, item_id: int) -> Optional[Dict[str, Any]]:
+    """Card snapshot for a catalog item from the in-memory catalog (None if not found)"""
+    from utils.favorites import favorite_card
+
+    if item_type not in FAVORITE_DETAIL_TABLES:
+        return None
+    item = catalog.get_table(FAVORITE_DETAIL_TABLES[item_type][0]).get(item_id)
+    return favorite_card(item_type, item) if item is not None else None
+
+
+def _loaded_favorite_types() -> List[str]:
+    """Item types whose in-memory catalog table loaded with rows (a failed or empty load is not trusted)"""
+    loaded = []
+    for item_type, (table, _) in FAVORITE_DETAIL_TABLES.items():
+        catalog_table = catalog.get_table(table)
+        if not catalog_table.failed and len(catalog_table) > 0:
+            loaded.append(item_type)
+    return loaded
+
+
+def get_favorite_cards(user_id: int) -> Dict[str, pd.DataFrame]:
     """
-    Get full attraction data for user's favorited attractions
+    Get a user's favorites for card rendering from the stored snapshots, in one users.db query
+
+    Favorites saved before snapshots existed fall back to the in-memory catalog
+    until the reconciler fills them in.
 
     Args:
         user_id: User ID from session
 
     Returns:
-        DataFrame with complete attraction information
+        Dict of item type -> DataFrame with the FAVORITE_CARD_COLUMNS of that type,
+        most recently added first
     """
-    from utils.favorites import get_user_favorites
-
-    favorites = get_user_favorites(user_id, 'attraction')
-    if not favorites:
-        return pd.DataFrame()
+    from utils import favorites
+
+    cards: Dict[str, List[Dict[str, Any]]] = {item_type: [] for item_type in favorites.FAVORITE_CARD_COLUMNS}
+    with pooled_connection(favorites.DB_PATH) as conn:
+        rows = conn.execute('''
+            SELECT item_type, item_id, item_data FROM favorites
+            WHERE user_id = ?
+            ORDER BY created_at DESC, id DESC
+        ''', (user_id,)).fetchall()
+
+    for item_type, item_id, item_data in rows:
+        if item_type not in cards:
+            continue
+        card = favorites.stored_card(item_data) or get_favorite_card(item_type, item_id)
+        if card is not None:
+            cards[item_type].append(card)
+
+    return {
+        item_type: pd.DataFrame(items, columns=favorites.FAVORITE_CARD_COLUMNS[item_type])
+        for item_type, items in cards.items()
+    }
+
+
+def reconcile_favorite_snapshots(force: bool = False) -> Dict[str, int]:
+    """
+    Refresh favorite card snapshots that no longer match the catalog
 
-    fav_ids = [f['item_id'] for f in favorites]
+    Runs when the catalog version changed since the last run, when the last run
+    is older than FAVORITE_RECONCILE_FULL_INTERVAL, or when forced. Only types
+    whose catalog table loaded with rows are touched. Changed snapshots are
+    rewritten through the users.db writer; favorites of deleted items are found
+    against travel.db with _orphan_favorites_query and removed with
+    remove_orphan_favorites, at most FAVORITE_ORPHAN_LIMIT per run.
 
-    with get_db_connection() as conn:
-        placeholders = ','.join('?' * len(fav_ids))
-        query = f"SELECT * FROM attractions WHERE ID IN ({placeholders})"
-        df = pd.read_sql_query(query, conn, params=fav_ids)
-
-    # Auto-cleanup: Remove favorites for deleted attractions
-    if len(df) < len(fav_ids):
-        from utils.favorites import remove_favorite
-        found_ids = set(df['ID'].tolist())
-        missing_ids = set(fav_ids) - found_ids
-        for missing_id in missing_ids:
-            remove_favorite(user_id, 'attraction', missing_id)
-
-    return df
\ No newline at end of file
+    Returns:
+        Dict: counts of 'checked', 'updated' and 'removed' favorites
+    """
+    global _reconciled_catalog_version, _reconciled_at
+    from utils import favorites
+    from utils.write_behind import get_write_queue
+
+    version = catalog.catalog_version()
+    due = time.monotonic() - _reconciled_at >= FAVORITE_RECONCILE_FULL_INTERVAL
+    if not force and not due and version == _reconciled_catalog_version:
+        return {'checked': 0, 'updated': 0, 'removed': 0}
+
+    item_types = _loaded_favorite_types()
+    if not item_types:
+        # Catalog unavailable: try again on the next check
+        return {'checked': 0, 'updated': 0, 'removed': 0}
+
+    placeholders = ','.join('?' * len(item_types))
+    with pooled_connection(favorites.DB_PATH) as conn:
+        rows = conn.execute(
+            f'SELECT id, item_type, item_id, item_data FROM favorites WHERE item_type IN ({placeholders})',
+            item_types
+        ).fetchall()
+
+    queue = get_write_queue(favorites.DB_PATH)
+    updated = 0
+    for favorite_id, item_type, item_id, item_data in rows:
+        card = get_favorite_card(item_type, item_id)
+        if card is None or favorites.stored_card(item_data) == card:
+            continue
+        try:
+            data = json.loads(item_data) if item_data else {}
+        except json.JSONDecodeError:
+            data = {}
+        if not isinstance(data, dict):
+            data = {}
+        data['card'] = card
+        queue.submit('UPDATE favorites SET item_data = ? WHERE id = ?', (json.dumps(data), favorite_id),
+                     key=('favorite_card', favorite_id))
+        updated += 1
+
+    with favorites_catalog_connection() as conn:
+        orphan_rows = conn.execute(
+            _orphan_favorites_query(item_types, per_user=False) + ' LIMIT ?', (FAVORITE_ORPHAN_LIMIT,)
+        ).fetchall()
+    orphans: Dict[int, List[Tuple[str, int]]] = {}
+    for user_id, item_type, item_id in orphan_rows:
+        orphans.setdefault(user_id, []).append((item_type, item_id))
+    for user_id, pairs in orphans.items():
+        remove_orphan_favorites(user_id, pairs)
+    if len(orphan_rows) == FAVORITE_ORPHAN_LIMIT:
+        print(f"[favorites-reconciler] orphan removal capped at {FAVORITE_ORPHAN_LIMIT} favorites")
+    queue.flush()
+
+    _reconciled_catalog_version = version
+    _reconciled_at = time.monotonic()
+    return {'checked': len(rows), 'updated': updated, 'removed': len(orphan_rows)}
+
+
+# Background reconciler (daemon thread, started by the app)
+favorites_reconciler = PeriodicSweeper(
+    reconcile_favorite_snapshots, FAVORITE_RECONCILE_INTERVAL, name='favorites-reconciler'
+)
+
+
+def start_favorites_reconciler() -> None:
+    """Start the background reconciler (ignored if already running)"""
+    favorites_reconciler.start()
\ No newline at end of file
@@ -0,0 +1,240 @@
+"""
+SQLite 連線管理模組
+每個執行緒、每個資料庫檔案重複使用同一個已調校的連線，
+取代每次查詢都 sqlite3.connect / close 的作法，並收集連線池統計
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Set
+
+# 資料庫路徑
+CATALOG_DB_PATH = './data/travel.db'
+USERS_DB_PATH = './data/users.db'
+
+# 等待鎖定的最長時間（毫秒）
+BUSY_TIMEOUT_MS = 5000
+
+# 唯讀目錄資料庫的 mmap 大小（bytes）
+CATALOG_MMAP_SIZE = 256 * 1024 * 1024
+
+# travel.db 中存放使用者資料（非目錄資料）的資料表；寫入這些資料表不會讓目錄快取失效
+CATALOG_USER_TABLES = frozenset({'trips', 'activities'})
+
+_local = threading.local()
+_stats_lock = threading.Lock()
+# 每個資料庫的世代號；reset() 後遞增，各執行緒取用時發現過期即重新連線
+_generations: Dict[str, int] = {}
+_stats: Dict[str, Dict[str, int]] = {}
+# 經由連線池寫入目錄資料表後呼叫的函數（utils.catalog 註冊 invalidate）
+_catalog_write_listeners: List[Callable[[], Any]] = []
+# 經由連線池只寫入 CATALOG_USER_TABLES 後呼叫的函數（utils.catalog 註冊檔案簽章的更新）
+_catalog_user_write_listeners: List[Callable[[], Any]] = []
+
+
+def on_catalog_write(listener: Callable[[], Any]) -> None:
+    """註冊寫入目錄資料表後要呼叫的函數"""
+    _catalog_write_listeners.append(listener)
+
+
+def on_catalog_user_write(listener: Callable[[], Any]) -> None:
+    """註冊只寫入 travel.db 中使用者資料表（CATALOG_USER_TABLES）後要呼叫的函數"""
+    _catalog_user_write_listeners.append(listener)
+
+
+def _key(db_path: str, read_only: bool) -> str:
+    return f"{os.path.abspath(db_path)}|{'ro' if read_only else 'rw'}"
+
+
+def _bump(key: str, field: str, amount: int = 1) -> None:
+    with _stats_lock:
+        stats = _stats.setdefault(key, {'opened': 0, 'reused': 0, 'closed': 0, 'rollbacks': 0})
+        stats[field] += amount
+
+
+def _is_catalog(db_path: str) -> bool:
+    return os.path.abspath(db_path) == os.path.abspath(CATALOG_DB_PATH)
+
+
+class _CatalogWriteConnection(sqlite3.Connection):
+    """
+    目錄資料庫的讀寫連線：以 authorizer 記錄寫入的資料表
+
+    authorizer 只在編譯語句時呼叫，因此以 cached_statements=0 開啟（見 _open），
+    每次執行都會重新記錄
+    """
+
+    # 會修改資料表的 authorizer 動作 -> 資料表名稱所在的參數位置
+    _WRITE_ACTIONS = {
+        sqlite3.SQLITE_INSERT: 0,
+        sqlite3.SQLITE_UPDATE: 0,
+        sqlite3.SQLITE_DELETE: 0,
+        sqlite3.SQLITE_CREATE_TABLE: 0,
+        sqlite3.SQLITE_DROP_TABLE: 0,
+        sqlite3.SQLITE_ALTER_TABLE: 1,
+        sqlite3.SQLITE_CREATE_INDEX: 1,
+        sqlite3.SQLITE_DROP_INDEX: 1,
+    }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.written_tables: Set[str] = set()
+        self.set_authorizer(self._authorize)
+
+    def _authorize(self, action, arg1, arg2, db_name, source):
+        position = self._WRITE_ACTIONS.get(action)
+        if position is not None and db_name != 'temp':
+            table = (arg1, arg2)[position]
+            if table:
+                self.written_tables.add(table)
+        return sqlite3.SQLITE_OK
+
+
+def _open(db_path: str, read_only: bool) -> sqlite3.Connection:
+    """依資料庫類型開啟並調校連線"""
+    if read_only:
+        # 目錄資料庫：唯讀（不使用 immutable：遷移腳本等其他行程可能在執行中寫入，
+        # immutable 連線看不到這些變更，甚至可能讀到錯誤結果）
+        uri = f"{Path(os.path.abspath(db_path)).as_uri()}?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=True)
+        conn.execute(f"PRAGMA mmap_size = {CATALOG_MMAP_SIZE}")
+        conn.execute("PRAGMA query_only = ON")
+    elif _is_catalog(db_path):
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000,
+                               factory=_CatalogWriteConnection, cached_statements=0)
+    else:
+        conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+        # 使用者資料庫：WAL 讓讀取不會被寫入阻塞
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+
+    conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def get_connection(db_path: str, read_only: bool = False) -> sqlite3.Connection:
+    """
+    取得目前執行緒對指定資料庫的共用連線（不可自行 close）
+
+    Args:
+        db_path: 資料庫檔案路徑
+        read_only: 是否以唯讀模式開啟（僅用於目錄資料庫）
+
+    Returns:
+        sqlite3.Connection: row_factory 為 sqlite3.Row 的連線
+    """
+    key = _key(db_path, read_only)
+    pool = getattr(_local, 'connections', None)
+    if pool is None:
+        pool = _local.connections = {}
+
+    generation = _generations.get(key, 0)
+    entry = pool.get(key)
+    if entry is not None:
+        conn, conn_generation = entry
+        if conn_generation == generation:
+            _bump(key, 'reused')
+            return conn
+        conn.close()
+        _bump(key, 'closed')
+
+    conn = _open(db_path, read_only)
+    pool[key] = (conn, generation)
+    _bump(key, 'opened')
+    return conn
+
+
+@contextmanager
+def pooled_connection(db_path: str, read_only: bool = False):
+    """
+    共用連線的上下文管理器
+    離開時不關閉連線；若有未提交的交易則回滾（與原本 close 時的行為一致）
+
+    同一執行緒巢狀使用同一個資料庫時取得同一個連線，只有最外層離開時才回滾與通知目錄寫入，
+    內層不會捨棄外層尚未提交的變更
+    """
+    key = _key(db_path, read_only)
+    depths = getattr(_local, 'depths', None)
+    if depths is None:
+        depths = _local.depths = {}
+    depth = depths.get(key, 0)
+    if depth:
+        # 巢狀使用：沿用外層的連線（即使期間 reset() 過也不可重新開啟）
+        conn = _local.connections[key][0]
+        _bump(key, 'reused')
+    else:
+        conn = get_connection(db_path, read_only)
+        changes_before = conn.total_changes
+        if isinstance(conn, _CatalogWriteConnection):
+            conn.written_tables.clear()
+
+    depths[key] = depth + 1
+    try:
+        yield conn
+    finally:
+        depths[key] = depth
+        if not depth:
+            if conn.in_transaction:
+                conn.rollback()
+                _bump(key, 'rollbacks')
+            if isinstance(conn, _CatalogWriteConnection) and conn.total_changes != changes_before:
+                if conn.written_tables - CATALOG_USER_TABLES:
+                    # 寫入目錄資料表後重新開啟唯讀連線（捨棄 mmap 與頁面快取）
+                    reset(db_path, read_only=True)
+                    # 依目錄版本的快取全部失效
+                    for listener in _catalog_write_listeners:
+                        listener()
+                else:
+                    # 只寫入使用者資料表（例如行程的 activities）：目錄資料未變更，快取保留
+                    for listener in _catalog_user_write_listeners:
+                        listener()
+
+
+def reset(db_path: str, read_only: bool = None) -> None:
+    """
+    讓所有執行緒在下次取用時重新開啟指定資料庫的連線
+
+    Args:
+        db_path: 資料庫檔案路徑
+        read_only: 只重設唯讀或讀寫連線；None 代表兩者
+    """
+    modes = [True, False] if read_only is None else [read_only]
+    with _stats_lock:
+        for mode in modes:
+            key = _key(db_path, mode)
+            _generations[key] = _generations.get(key, 0) + 1
+
+
+def close_thread_connections() -> None:
+    """關閉目前執行緒持有的所有連線"""
+    pool = getattr(_local, 'connections', None) or {}
+    for key, (conn, _) in list(pool.items()):
+        conn.close()
+        _bump(key, 'closed')
+    pool.clear()
+
+
+def pool_stats() -> List[Dict[str, Any]]:
+    """
+    連線池統計
+
+    Returns:
+        List[Dict]: 每個資料庫/模式的開啟、重用、關閉、回滾次數與重用率
+    """
+    with _stats_lock:
+        rows = []
+        for key, stats in _stats.items():
+            path, mode = key.rsplit('|', 1)
+            total = stats['opened'] + stats['reused']
+            rows.append({
+                'db_path': path,
+                'mode': mode,
+                **stats,
+                'generation': _generations.get(key, 0),
+                'reuse_ratio': stats['reused'] / total if total else 0.0,
+            })
+        return rows
@@ -4,22 +4,25 @@ Handles CRUD operations for user favorites (restaurants, hotels, attractions)
 """
 import sqlite3
 import json
+import threading
+import time
 from datetime import datetime
-from typing import Optional, List, Dict, Any, Tuple
+from typing import Optional, List, Dict, Any, Set, Tuple, Union
 from contextlib import contextmanager
 
+from dash import Patch
+
+from utils.db_pool import pooled_connection
+from utils.write_behind import write_and_wait
+
 # Database path (same as auth.py)
 DB_PATH = './data/users.db'
 
 @contextmanager
 def get_favorites_db_connection():
-    """Database connection context manager for favorites operations"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
+    """Pooled database connection context manager for favorites operations"""
+    with pooled_connection(DB_PATH) as conn:
         yield conn
-    finally:
-        conn.close()
 
 
 def add_favorite(
@@ -43,19 +46,17 @@ def add_favorite(
         (success: bool, message: str)
     """
     try:
-        with get_favorites_db_connection() as conn:
-            cursor = conn.cursor()
-
-            # Convert item_data dict to JSON string
-            data_json = json.dumps(item_data) if item_data else None
-
-            cursor.execute('''
-                INSERT INTO favorites (user_id, item_type, item_id, item_name, item_data)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (user_id, item_type, item_id, item_name, data_json))
-
-            conn.commit()
-            return True, f"{item_name} added to favorites"
+        # Convert item_data dict to JSON string
+        data_json = json.dumps(item_data) if item_data else None
+
+        # Batched by the users.db writer thread; wait for the commit so a
+        # duplicate still surfaces as IntegrityError
+        write_and_wait(DB_PATH, '''
+            INSERT INTO favorites (user_id, item_type, item_id, item_name, item_data)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (user_id, item_type, item_id, item_name, data_json))
+        FAVORITES.bump(user_id)
+        return True, f"{item_name} added to favorites"
 
     except sqlite3.IntegrityError:
         # Already favorited (UNIQUE constraint violation)
@@ -96,14 +97,15 @@ def remove_favorite(
 
             item_name = result['item_name']
 
-            # Delete the favorite
-            cursor.execute('''
-                DELETE FROM favorites
-                WHERE user_id = ? AND item_type = ? AND item_id = ?
-            ''', (user_id, item_type, item_id))
-
-            conn.commit()
-            return True, f"{item_name} removed from favorites"
+        # Delete the favorite through the users.db writer thread
+        deleted = write_and_wait(DB_PATH, '''
+            DELETE FROM favorites
+            WHERE user_id = ? AND item_type = ? AND item_id = ?
+        ''', (user_id, item_type, item_id))
+        if not deleted:
+            return False, "Item not found in favorites"
+        FAVORITES.bump(user_id)
+        return True, f"{item_name} removed from favorites"
 
     except Exception as e:
         return False, f"Failed to remove favorite: {str(e)}"
@@ -315,9 +317,194 @@ def clear_user_favorites(user_id: int, item_type: Optional[str] = None) -> Tuple
             rows_deleted = cursor.rowcount
 
             if rows_deleted > 0:
+                FAVORITES.bump(user_id)
                 return True, f"{msg} ({rows_deleted} items removed)"
             else:
                 return True, "No favorites to clear"
 
     except Exception as e:
         return False, f"Failed to clear favorites: {str(e)}"
+
+
+# Item types and the matching keys of the client-side cache ('restaurant' -> 'restaurants')
+FAVORITE_TYPES = ('restaurant', 'hotel', 'attraction')
+
+# Catalog columns kept in item_data['card'] so favorite cards render without the catalog
+FAVORITE_CARD_COLUMNS = {
+    'restaurant': ['Restaurant_ID', 'Name', 'JapaneseName', 'FirstCategory', 'Station', 'TotalRating'],
+    'hotel': ['Hotel_ID', 'HotelName', 'Types', 'Rating', 'Address'],
+    'attraction': ['ID', 'Name', 'Type', 'Rating', 'Address', 'PriceLevel'],
+}
+
+
+def favorite_card(item_type: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    """Card snapshot of a catalog row (the FAVORITE_CARD_COLUMNS of its type)"""
+    return {column: item.get(column) for column in FAVORITE_CARD_COLUMNS[item_type]}
+
+
+def stored_card(item_data: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Card snapshot from a stored item_data JSON string (None if absent or unreadable)"""
+    if not item_data:
+        return None
+    try:
+        card = json.loads(item_data).get('card')
+    except (json.JSONDecodeError, AttributeError):
+        return None
+    return card if isinstance(card, dict) else None
+
+
+def cache_key(item_type: str) -> str:
+    """Client-side cache key for an item type"""
+    return f"{item_type}s"
+
+
+def cached_favorite_ids(favorites_cache: Optional[Dict[str, Any]], item_type: str) -> Set[int]:
+    """
+    Favorited IDs of one type from the client-side cache, as a set
+    Build once per render, then check each card in O(1)
+    """
+    ids = (favorites_cache or {}).get(cache_key(item_type)) or {}
+    return {int(item_id) for item_id in ids}
+
+
+def is_cached_favorite(favorites_cache: Optional[Dict[str, Any]], item_type: str, item_id: Any) -> bool:
+    """Whether the client-side cache marks an item as favorited"""
+    if not favorites_cache or item_id is None:
+        return False
+    ids = favorites_cache.get(cache_key(item_type)) or {}
+    return str(item_id) in ids
+
+
+class FavoritesService:
+    """
+    Favorites membership for the client-side 'user-favorites-cache' store
+
+    The store holds one object per item type keyed by item ID as a string
+    ({'restaurants': {'12': 1}, ...}), so membership is a key lookup on both
+    the server and in the browser. Each user has a version counter that is
+    bumped on every change. When the client's version matches the version
+    before a change and that change is the only one since (the version moved
+    by exactly one), callbacks send a small Patch delta; otherwise they send
+    a full snapshot. Versions are per process, so a cache built by another
+    worker never matches and is replaced by a snapshot.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._versions: Dict[int, int] = {}
+        # Versions start from the process start time so caches left over
+        # from a previous process never match
+        self._epoch = int(time.time() * 1000)
+
+    def version(self, user_id: int) -> int:
+        """Current favorites version of a user"""
+        with self._lock:
+            return self._versions.get(user_id, self._epoch)
+
+    def bump(self, user_id: int) -> int:
+        """Record a change to a user's favorites and return the new version"""
+        with self._lock:
+            version = self._versions.get(user_id, self._epoch) + 1
+            self._versions[user_id] = version
+            return version
+
+    def load_ids(self, user_id: int) -> Dict[str, List[int]]:
+        """
+        All favorited IDs of a user grouped by type, in one indexed query
+
+        Returns:
+            Dict: {'restaurant': [...], 'hotel': [...], 'attraction': [...]}
+        """
+        ids: Dict[str, List[int]] = {item_type: [] for item_type in FAVORITE_TYPES}
+        try:
+            with get_favorites_db_connection() as conn:
+                rows = conn.execute('''
+                    SELECT item_type, item_id FROM favorites
+                    WHERE user_id = ?
+                    ORDER BY item_type, item_id
+                ''', (user_id,)).fetchall()
+        except Exception as e:
+            print(f"Error fetching favorite IDs: {e}")
+            return ids
+        for item_type, item_id in rows:
+            ids.setdefault(item_type, []).append(item_id)
+        return ids
+
+    def snapshot(self, user_id: int) -> Dict[str, Any]:
+        """Full client-side cache for a user"""
+        version = self.version(user_id)
+        cache: Dict[str, Any] = {
+            cache_key(item_type): {str(item_id): 1 for item_id in item_ids}
+            for item_type, item_ids in self.load_ids(user_id).items()
+        }
+        cache['version'] = version
+        return cache
+
+    def _delta_version(self, user_id: int, client_version: Optional[int], base_version: int) -> Optional[int]:
+        """
+        Version to send with a Patch delta, or None when a full snapshot is needed
+
+        A delta is only valid when the client cache was at base_version and the
+        change being sent is the only one since; another change in between
+        (a concurrent request or the reconciler) would be missing from it.
+        """
+        expected = base_version + 1
+        if client_version != base_version or self.version(user_id) != expected:
+            return None
+        return expected
+
+    def toggle_update(
+        self,
+        user_id: int,
+        client_version: Optional[int],
+        base_version: int,
+        item_type: str,
+        item_id: int,
+        favorited: bool
+    ) -> Union[Patch, Dict[str, Any]]:
+        """
+        Cache update after one item was added or removed
+
+        Args:
+            user_id: User ID from session
+            client_version: 'version' of the cache the client sent
+            base_version: version() read before the change
+            item_type: 'restaurant', 'hotel', or 'attraction'
+            item_id: ID of the item
+            favorited: Whether the item is now favorited
+
+        Returns:
+            Patch delta when the client cache was current and this was the only
+            change since base_version, otherwise a full snapshot
+        """
+        version = self._delta_version(user_id, client_version, base_version)
+        if version is None:
+            return self.snapshot(user_id)
+        patch = Patch()
+        if favorited:
+            patch[cache_key(item_type)][str(item_id)] = 1
+        else:
+            del patch[cache_key(item_type)][str(item_id)]
+        patch['version'] = version
+        return patch
+
+    def clear_update(
+        self,
+        user_id: int,
+        client_version: Optional[int],
+        base_version: int,
+        item_type: Optional[str] = None
+    ) -> Union[Patch, Dict[str, Any]]:
+        """Cache update after clearing one type (or all types when item_type is None)"""
+        version = self._delta_version(user_id, client_version, base_version)
+        if version is None:
+            return self.snapshot(user_id)
+        patch = Patch()
+        for cleared in ([item_type] if item_type else FAVORITE_TYPES):
+            patch[cache_key(cleared)] = {}
+        patch['version'] = version
+        return patch
+
+
+# Shared instance used by the app callbacks
+FAVORITES = FavoritesService()
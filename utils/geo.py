@@ -0,0 +1,122 @@
+"""
+地理距離計算模組
+向量化的 Haversine 距離核心：一點對多點、多點對多點（距離矩陣），
+以及外接矩形預篩選；支援 float32 / float64 陣列
+"""
+import math
+from typing import Tuple
+
+import numpy as np
+
+# 地球半徑（公里）
+EARTH_RADIUS_KM = 6371.0
+
+# 每緯度約 111.2 公里
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180.0
+
+# 直線距離換算實際路程的繞路係數（交通時間估算用）
+ROAD_DETOUR_FACTOR = 1.3
+
+# 外接矩形：(min_lat, max_lat, min_lon, max_lon)
+BBox = Tuple[float, float, float, float]
+
+
+def _as_array(values, dtype) -> np.ndarray:
+    return np.asarray(values, dtype=dtype)
+
+
+def _haversine(lat1, lon1, lat2, lon2, dtype):
+    """在弧度上計算 Haversine 中心角（可廣播）"""
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    # 防止浮點數誤差導致 sqrt 內出現負數或大於 1
+    a = np.clip(a, 0, 1)
+    return (2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))).astype(dtype, copy=False)
+
+
+def haversine_km(lat1, lon1, lat2, lon2, dtype=np.float64):
+    """
+    兩組座標逐一配對的 Haversine 距離（公里），遵循 NumPy 廣播規則
+
+    Args:
+        lat1, lon1, lat2, lon2: 緯度 / 經度（度），可為純量或陣列
+        dtype: 計算與輸出的浮點型態
+
+    Returns:
+        float 或 ndarray: 距離（公里）
+    """
+    lat1, lon1, lat2, lon2 = (np.radians(_as_array(v, dtype)) for v in (lat1, lon1, lat2, lon2))
+    result = _haversine(lat1, lon1, lat2, lon2, dtype)
+    return float(result) if result.ndim == 0 else result
+
+
+def distances_from(lat: float, lon: float, lats, lons, dtype=np.float64) -> np.ndarray:
+    """
+    一點到多點的距離
+
+    Args:
+        lat, lon: 中心座標（度）
+        lats, lons: 目標座標陣列（度），NaN 會得到 NaN 距離
+        dtype: 計算與輸出的浮點型態
+
+    Returns:
+        ndarray: shape (N,) 的距離（公里）
+    """
+    return np.atleast_1d(haversine_km(lat, lon, lats, lons, dtype=dtype))
+
+
+def distance_matrix(lats1, lons1, lats2=None, lons2=None, dtype=np.float64) -> np.ndarray:
+    """
+    多點對多點的距離矩陣
+
+    Args:
+        lats1, lons1: 起點座標陣列（N 個）
+        lats2, lons2: 終點座標陣列（M 個）；省略時與起點相同（N×N）
+        dtype: 計算與輸出的浮點型態（大矩陣可用 float32 節省記憶體）
+
+    Returns:
+        ndarray: shape (N, M) 的距離（公里）
+    """
+    if lats2 is None or lons2 is None:
+        lats2, lons2 = lats1, lons1
+    lat1 = np.radians(_as_array(lats1, dtype))[:, None]
+    lon1 = np.radians(_as_array(lons1, dtype))[:, None]
+    lat2 = np.radians(_as_array(lats2, dtype))[None, :]
+    lon2 = np.radians(_as_array(lons2, dtype))[None, :]
+    return _haversine(lat1, lon1, lat2, lon2, dtype)
+
+
+def bounding_box(lat: float, lon: float, km: float) -> BBox:
+    """
+    以中心點與半徑計算外接矩形（用於距離計算前的預篩選）
+
+    Returns:
+        (min_lat, max_lat, min_lon, max_lon)
+    """
+    dlat = km / KM_PER_DEGREE
+    dlon = km / (KM_PER_DEGREE * max(math.cos(math.radians(lat)), 1e-6))
+    return lat - dlat, lat + dlat, lon - dlon, lon + dlon
+
+
+def bbox_mask(lats, lons, bbox: BBox) -> np.ndarray:
+    """座標是否落在外接矩形內（布林陣列，NaN 為 False）"""
+    min_lat, max_lat, min_lon, max_lon = bbox
+    lats = np.asarray(lats)
+    lons = np.asarray(lons)
+    return (lats >= min_lat) & (lats <= max_lat) & (lons >= min_lon) & (lons <= max_lon)
+
+
+def within_km(lat: float, lon: float, lats, lons, km: float, dtype=np.float64) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    半徑內的點：先以外接矩形預篩選，只對候選點計算距離
+
+    Returns:
+        (indices, distances): 半徑內點的索引與距離（未排序）
+    """
+    lats = np.asarray(lats)
+    lons = np.asarray(lons)
+    candidates = np.flatnonzero(bbox_mask(lats, lons, bounding_box(lat, lon, km)))
+    dist = distances_from(lat, lon, lats[candidates], lons[candidates], dtype=dtype)
+    inside = dist <= km
+    return candidates[inside], dist[inside]
@@ -1,7 +1,8 @@
 
-import sqlite3
 from datetime import time
 
+from utils.db_pool import get_connection, pooled_connection
+
 DATABASE_PATH = 'data/travel.db'
 
 class ItineraryManager:
@@ -16,8 +17,11 @@ class ItineraryManager:
             trip_id: The ID of the trip to manage.
         """
         self.trip_id = trip_id
-        self.conn = sqlite3.connect(DATABASE_PATH)
-        self.cursor = self.conn.cursor()
+
+    @property
+    def conn(self):
+        """The pooled read-write connection for the current thread."""
+        return get_connection(DATABASE_PATH)
 
     def _time_str_to_obj(self, time_str: str) -> time:
         """Converts a 'HH:MM' string to a datetime.time object."""
@@ -38,11 +42,11 @@ class ItineraryManager:
         Returns:
             True if there is an overlap, False otherwise.
         """
-        self.cursor.execute(
+        cursor = self.conn.execute(
             "SELECT start_time, end_time FROM activities WHERE trip_id = ? AND day = ?",
             (self.trip_id, day)
         )
-        activities = self.cursor.fetchall()
+        activities = cursor.fetchall()
 
         for activity in activities:
             existing_start = self._time_str_to_obj(activity[0])
@@ -79,15 +83,16 @@ class ItineraryManager:
         if self._check_overlap(day, start_time_obj, end_time_obj):
             raise ValueError(f"Time slot {start_time_str}-{end_time_str} on day {day} overlaps with an existing activity.")
 
-        self.cursor.execute(
-            """
-            INSERT INTO activities (trip_id, day, start_time, end_time, location_name, notes)
-            VALUES (?, ?, ?, ?, ?, ?)
-            """,
-            (self.trip_id, day, start_time_str, end_time_str, location_name, notes)
-        )
-        self.conn.commit()
-        activity_id = self.cursor.lastrowid
+        with pooled_connection(DATABASE_PATH) as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO activities (trip_id, day, start_time, end_time, location_name, notes)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                (self.trip_id, day, start_time_str, end_time_str, location_name, notes)
+            )
+            conn.commit()
+        activity_id = cursor.lastrowid
         return activity_id
 
     def get_day_itinerary(self, day: int) -> list[dict]:
@@ -100,13 +105,11 @@ class ItineraryManager:
         Returns:
             A list of activity dictionaries.
         """
-        self.cursor.execute(
+        cursor = self.conn.execute(
             "SELECT id, start_time, end_time, location_name, notes FROM activities WHERE trip_id = ? AND day = ? ORDER BY start_time",
             (self.trip_id, day)
         )
-        activities = self.cursor.fetchall()
-        columns = [desc[0] for desc in self.cursor.description]
-        return [dict(zip(columns, row)) for row in activities]
+        return [dict(row) for row in cursor.fetchall()]
 
     def get_full_itinerary(self) -> dict[int, list[dict]]:
         """
@@ -115,28 +118,17 @@ class ItineraryManager:
         Returns:
             A dictionary where keys are day numbers and values are lists of activities.
         """
-        self.cursor.execute(
+        cursor = self.conn.execute(
             "SELECT day, id, start_time, end_time, location_name, notes FROM activities WHERE trip_id = ? ORDER BY day, start_time",
             (self.trip_id,)
         )
         full_itinerary = {}
-        activities = self.cursor.fetchall()
-        
-        # Get column names for dict conversion
-        columns = [desc[0] for desc in self.cursor.description]
 
-        for row in activities:
-            activity_dict = dict(zip(columns, row))
+        for row in cursor.fetchall():
+            activity_dict = dict(row)
             day = activity_dict.pop('day')
             if day not in full_itinerary:
                 full_itinerary[day] = []
             full_itinerary[day].append(activity_dict)
             
         return full_itinerary
-
-    def __del__(self):
-        """
-        Destructor to ensure the database connection is closed.
-        """
-        if self.conn:
-            self.conn.close()
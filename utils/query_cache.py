@@ -0,0 +1,162 @@
+"""
+查詢結果快取模組
+以正規化後的查詢參數為鍵，保存搜尋結果（LRU 淘汰 + TTL 過期），
+目錄版本（catalog_version）變更時自動清空
+"""
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+import pandas as pd
+
+from utils import catalog
+
+
+class QueryCache:
+    """
+    有容量上限與存活時間的 LRU 快取
+
+    Attributes:
+        maxsize: 最多保存的結果數
+        ttl: 結果存活秒數
+        hits, misses, evictions, expirations: 統計計數
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+        self._version = catalog.catalog_version()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _check_version(self) -> None:
+        version = catalog.catalog_version()
+        if version != self._version:
+            self._entries.clear()
+            self._version = version
+
+    def lookup(self, key: Hashable) -> Tuple[bool, Any]:
+        """查詢快取，返回 (是否命中, 結果)"""
+        with self._lock:
+            self._check_version()
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def store(self, key: Hashable, value: Any) -> None:
+        """保存結果，超過容量時淘汰最久未使用的項目"""
+        with self._lock:
+            self._check_version()
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """清空快取（資料變更後呼叫）"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """快取統計"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+def _freeze(value: Any) -> Hashable:
+    """將參數轉為可雜湊的形式"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    return value
+
+
+def _copy(value: Any) -> Any:
+    # DataFrame 可被呼叫端修改，命中時返回副本；
+    # df.copy() 不複製儲存格內的物件，列表欄位（例如旅館 Types）需逐一複製
+    if not isinstance(value, pd.DataFrame):
+        return value
+    copied = value.copy()
+    for column in copied.columns[copied.dtypes == object]:
+        cells = copied[column].tolist()
+        if any(isinstance(cell, list) for cell in cells):
+            copied[column] = [list(cell) if isinstance(cell, list) else cell for cell in cells]
+    return copied
+
+
+def cached_query(cache: QueryCache, normalizers: Optional[Dict[str, Callable[[Any], Any]]] = None,
+                 fallback: Optional[Callable[[], Any]] = None):
+    """
+    查詢函數的快取裝飾器
+
+    參數先經 normalizers 正規化（未列出的參數原樣使用），
+    再以正規化後的參數呼叫原函數，因此等價的查詢共用同一筆快取
+
+    Args:
+        cache: 使用的 QueryCache
+        normalizers: 參數名稱 -> 正規化函數
+        fallback: 原函數拋出例外時返回 fallback() 的結果；錯誤結果不寫入快取，
+                  下次呼叫會重新查詢。None 代表照常拋出例外
+    """
+    normalizers = normalizers or {}
+
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = {
+                name: normalizers[name](value) if name in normalizers else value
+                for name, value in bound.arguments.items()
+            }
+            key = (func.__name__, _freeze(arguments))
+            hit, value = cache.lookup(key)
+            if not hit:
+                try:
+                    value = func(**arguments)
+                except Exception as e:
+                    if fallback is None:
+                        raise
+                    print(f"Error in {func.__name__}: {e}")
+                    return fallback()
+                cache.store(key, value)
+            return _copy(value)
+
+        wrapper.cache = cache
+        return wrapper
+
+    return decorator
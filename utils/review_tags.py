@@ -0,0 +1,227 @@
+"""
+評論標籤模組
+以單一編譯過的正規表示式（所有詞彙的 alternation）一次掃描評論文字，
+為每則評論產生標籤位元遮罩（中、英、日文的抱怨 / 稱讚詞彙），
+並提供依飯店彙總的標籤比例，圖表不需重新掃描文字；
+評論檔案的遮罩依檔案簽章快取，檔案未變更時不重新掃描
+"""
+import os
+import re
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 標籤 -> 詞彙（英文不分大小寫，以子字串比對）
+TAG_TERMS: Dict[str, Tuple[str, ...]] = {
+    # 抱怨
+    'dirty': ('dirty', 'filthy', 'unclean', 'not clean', 'stain', 'mould', 'mold', 'cockroach', 'bed bug',
+              '髒', '骯髒', '脏', '不乾淨', '不干净', '汚い', '不潔', 'カビ'),
+    'noisy': ('noisy', 'noise', 'loud', 'thin walls', '吵', '噪音', 'うるさい', '騒音'),
+    'rude': ('rude', 'unfriendly', 'unhelpful', 'impolite', '態度差', '态度差', '不親切', '失礼', '無愛想'),
+    'poor': ('poor', 'bad', 'terrible', 'worst', 'awful', 'horrible', 'disappoint',
+             '失望', '不佳', '很差', '糟糕', '最悪', '残念', 'ひどい'),
+    # 稱讚
+    'clean': ('clean', 'spotless', 'tidy', '乾淨', '干净', '整潔', '清潔', 'きれい', '綺麗'),
+    'friendly': ('friendly', 'helpful', 'kind staff', 'polite', '親切', '亲切', '友善', '熱情', '热情', '丁寧'),
+    'location': ('great location', 'good location', 'convenient', 'close to the station', 'walking distance',
+                 '交通方便', '方便', '便利', '駅近', '駅から近い'),
+    'great': ('great', 'excellent', 'amazing', 'wonderful', 'perfect', 'recommend',
+              '很棒', '推薦', '推荐', '滿意', '满意', '最高', '素晴らしい', 'おすすめ'),
+}
+
+NEGATIVE_TAGS = ('dirty', 'noisy', 'rude', 'poor')
+POSITIVE_TAGS = ('clean', 'friendly', 'location', 'great')
+
+TAG_BITS: Dict[str, int] = {tag: 1 << i for i, tag in enumerate(TAG_TERMS)}
+
+
+def tags_mask(tags: Iterable[str]) -> int:
+    """多個標籤合併後的位元遮罩"""
+    mask = 0
+    for tag in tags:
+        mask |= TAG_BITS[tag]
+    return mask
+
+
+NEGATIVE_MASK = tags_mask(NEGATIVE_TAGS)
+POSITIVE_MASK = tags_mask(POSITIVE_TAGS)
+
+
+def _trie_pattern(terms: Iterable[str]) -> str:
+    """
+    將詞彙組成前綴樹形式的正規表示式（共同前綴只比對一次）
+
+    選擇性後綴為貪婪比對，同一位置會優先匹配較長的詞
+    """
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[''] = {}
+
+    def build(node: dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{body})?' if '' in node else body
+
+    return build(trie)
+
+
+def _opposed(tags: set, other_tags: set) -> bool:
+    """兩組標籤是否一邊為抱怨、一邊為稱讚"""
+    return bool(
+        (tags & set(NEGATIVE_TAGS) and other_tags & set(POSITIVE_TAGS))
+        or (tags & set(POSITIVE_TAGS) and other_tags & set(NEGATIVE_TAGS))
+    )
+
+
+class ReviewTagger:
+    """
+    多詞彙評論標籤器
+
+    所有詞彙編譯成一個前綴樹形式的 alternation（較長的詞優先，例如 'not clean' 先於 'clean'），
+    文字轉成小寫後每則評論只掃描一次；同一個詞出現在多個標籤時，對應的位元全部設定
+
+    比對不重疊，因此較長的詞同時帶有它所包含的詞的標籤
+    （'great location' 設定 location 與 great）；但抱怨詞包含稱讚詞（或相反）時視為否定，
+    不帶入相反的標籤（'not clean'、'unfriendly' 只設定 dirty、rude）
+
+    Attributes:
+        pattern: 編譯後的正規表示式（比對小寫文字）
+        term_masks: 小寫詞彙 -> 位元遮罩
+    """
+
+    def __init__(self, tag_terms: Optional[Dict[str, Iterable[str]]] = None):
+        tag_terms = TAG_TERMS if tag_terms is None else tag_terms
+        self.tag_bits = {tag: 1 << i for i, tag in enumerate(tag_terms)}
+        term_tags: Dict[str, set] = {}
+        for tag, terms in tag_terms.items():
+            for term in terms:
+                term_tags.setdefault(term.lower(), set()).add(tag)
+
+        self.term_masks: Dict[str, int] = {}
+        for term, tags in term_tags.items():
+            tags = set(tags)
+            for other, other_tags in term_tags.items():
+                if other != term and other in term and not _opposed(tags, other_tags):
+                    tags |= other_tags
+            self.term_masks[term] = sum(self.tag_bits[tag] for tag in tags)
+        self.pattern = re.compile(_trie_pattern(self.term_masks))
+
+    def tag(self, texts) -> np.ndarray:
+        """
+        為評論文字產生標籤遮罩
+
+        Args:
+            texts: 評論文字（Series 或序列，NaN 視為空字串）
+
+        Returns:
+            ndarray: int64 遮罩，與輸入等長
+        """
+        texts = pd.Series(texts, dtype=object).fillna('').astype(str).reset_index(drop=True)
+        masks = np.zeros(len(texts), dtype=np.int64)
+        if texts.empty:
+            return masks
+        matches = texts.str.lower().str.findall(self.pattern).explode().dropna()
+        if matches.empty:
+            return masks
+        bits = matches.map(self.term_masks).to_numpy(dtype=np.int64)
+        np.bitwise_or.at(masks, matches.index.to_numpy(), bits)
+        return masks
+
+    def tag_names(self, mask: int) -> List[str]:
+        """遮罩包含的標籤名稱"""
+        return [tag for tag, bit in self.tag_bits.items() if mask & bit]
+
+
+_default_tagger: Optional[ReviewTagger] = None
+
+
+def get_tagger() -> ReviewTagger:
+    """預設詞彙的標籤器（第一次使用時編譯）"""
+    global _default_tagger
+    if _default_tagger is None:
+        _default_tagger = ReviewTagger()
+    return _default_tagger
+
+
+def tag_reviews(texts) -> np.ndarray:
+    """以預設詞彙為評論產生標籤遮罩（見 ReviewTagger.tag）"""
+    return get_tagger().tag(texts)
+
+
+_file_masks_lock = threading.Lock()
+# (檔案絕對路徑, 欄位名稱) -> (檔案簽章, 遮罩)
+_file_masks: Dict[Tuple[str, Optional[str]], Tuple[Tuple[int, int, int], np.ndarray]] = {}
+
+
+def tag_file_reviews(path: str, texts: pd.Series) -> np.ndarray:
+    """
+    為評論檔案中的文字欄位產生標籤遮罩（依檔案簽章快取）
+
+    檔案的修改時間與大小不變時直接返回上次的結果，不重新掃描文字
+
+    Args:
+        path: 評論檔案路徑（texts 由此檔案讀取）
+        texts: 評論文字欄位
+
+    Returns:
+        ndarray: int64 遮罩，與 texts 等長
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), texts.name)
+    signature = (stat.st_mtime_ns, stat.st_size, len(texts))
+    with _file_masks_lock:
+        entry = _file_masks.get(key)
+    if entry is not None and entry[0] == signature:
+        return entry[1].copy()
+    masks = tag_reviews(texts)
+    with _file_masks_lock:
+        _file_masks[key] = (signature, masks)
+    return masks.copy()
+
+
+def has_tags(masks, mask: int) -> np.ndarray:
+    """遮罩中是否含有任一指定標籤（布林陣列）"""
+    return (np.asarray(masks, dtype=np.int64) & mask) != 0
+
+
+def tag_counts(keys, masks, tags: Iterable[str] = TAG_TERMS) -> pd.DataFrame:
+    """
+    依群組（例如飯店）彙總標籤
+
+    Args:
+        keys: 每則評論的群組鍵
+        masks: 每則評論的標籤遮罩
+        tags: 要彙總的標籤
+
+    Returns:
+        DataFrame: 索引為群組鍵，欄位 review_count、<tag>（含該標籤的評論數）、
+                   negative / positive（含任一抱怨 / 稱讚標籤的評論數）
+    """
+    masks = np.asarray(masks, dtype=np.int64)
+    columns = {tag: (masks & TAG_BITS[tag]) != 0 for tag in tags}
+    columns['negative'] = has_tags(masks, NEGATIVE_MASK)
+    columns['positive'] = has_tags(masks, POSITIVE_MASK)
+    flags = pd.DataFrame(columns).astype(np.int64)
+    grouped = flags.groupby(np.asarray(keys), sort=True)
+    counts = grouped.sum()
+    counts.insert(0, 'review_count', grouped.size())
+    return counts
+
+
+def tag_ratios(keys, masks, tags: Iterable[str] = TAG_TERMS) -> pd.DataFrame:
+    """
+    依群組計算標籤比例（含該標籤的評論數 / 評論總數）
+
+    Returns:
+        DataFrame: 索引為群組鍵，欄位 review_count 與 <tag>_ratio、negative_ratio、positive_ratio
+    """
+    counts = tag_counts(keys, masks, tags)
+    ratios = counts.drop(columns='review_count').div(counts['review_count'], axis=0).add_suffix('_ratio')
+    return pd.concat([counts[['review_count']], ratios], axis=1)
@@ -0,0 +1,177 @@
+"""
+伺服器端資料存放模組
+大型 callback 結果保存在伺服器行程記憶體中，dcc.Store 只傳遞不透明的 token；
+提供 LRU 淘汰、TTL 過期、每個 session 的數量上限與命中統計
+
+資料只存在於建立它的行程：以多個 worker 執行時 token 只在原本的 worker 有效，
+因此存放的資料都必須可重建（由 store 中保存的小型參數重新查詢，或以 rebuild 函數重建），
+否則需要讓同一 session 固定由同一個 worker 處理（sticky session）
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+# 共用資料（所有 session 相同，例如地點名稱列表）的 token 前綴
+SHARED_PREFIX = 'shared:'
+
+
+class ServerStore:
+    """
+    以 token 存取的伺服器端資料
+
+    session 資料受 maxsize（全部）與 session_quota（每個 session）限制，
+    超過時淘汰最久未使用的項目；共用資料不過期、不計入上限
+
+    Attributes:
+        maxsize: 最多保存的 session 資料筆數
+        ttl: session 資料自最後一次存取起的存活秒數
+        session_quota: 每個 session 最多保存的筆數
+        hits, misses, puts, evictions, quota_evictions, expirations: 統計計數
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 1800.0, session_quota: int = 16,
+                 clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.session_quota = session_quota
+        self._clock = clock
+        self._lock = threading.Lock()
+        # token -> (session, 到期時間, 資料)
+        self._entries: 'OrderedDict[str, Tuple[Optional[str], float, Any]]' = OrderedDict()
+        # session -> 該 session 的 token（依最近使用排序）
+        self._sessions: Dict[Optional[str], 'OrderedDict[str, None]'] = {}
+        # 名稱 -> (版本, token, 資料)
+        self._shared: Dict[str, Tuple[Hashable, str, Any]] = {}
+        self._shared_tokens: Dict[str, Any] = {}
+        self.hits = 0
+        self.misses = 0
+        self.puts = 0
+        self.evictions = 0
+        self.quota_evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _remove(self, token: str) -> None:
+        session, _, _ = self._entries.pop(token)
+        tokens = self._sessions.get(session)
+        if tokens is not None:
+            tokens.pop(token, None)
+            if not tokens:
+                del self._sessions[session]
+
+    def put(self, value: Any, session: Optional[str] = None) -> str:
+        """
+        保存 session 資料
+
+        Args:
+            value: 任意 Python 物件（不經 JSON 序列化，取回時為同一物件）
+            session: session 識別碼，None 代表未識別的使用者（共用同一份配額）
+
+        Returns:
+            str: 放入 dcc.Store 的 token
+        """
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._entries[token] = (session, self._clock() + self.ttl, value)
+            tokens = self._sessions.setdefault(session, OrderedDict())
+            tokens[token] = None
+            self.puts += 1
+            while len(tokens) > self.session_quota:
+                self._remove(next(iter(tokens)))
+                self.quota_evictions += 1
+            while len(self._entries) > self.maxsize:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+        return token
+
+    def share(self, name: str, factory: Callable[[], Any], version: Hashable = None) -> str:
+        """
+        取得共用資料的 token（同名且同版本時不重新建立）
+
+        Args:
+            name: 資料名稱
+            factory: 建立資料的函數
+            version: 資料版本（例如目錄版本），變更時重新建立並產生新 token
+
+        Returns:
+            str: 放入 dcc.Store 的 token
+        """
+        with self._lock:
+            current = self._shared.get(name)
+            if current is not None and current[0] == version:
+                return current[1]
+        value = factory()
+        with self._lock:
+            current = self._shared.get(name)
+            if current is not None:
+                self._shared_tokens.pop(current[1], None)
+            token = f'{SHARED_PREFIX}{name}:{secrets.token_urlsafe(8)}'
+            self._shared[name] = (version, token, value)
+            self._shared_tokens[token] = value
+        return token
+
+    def get(self, token: Optional[str], default: Any = None) -> Any:
+        """
+        以 token 取回資料（並延長存活時間）
+
+        Returns:
+            保存的資料；token 無效、已淘汰或已過期時返回 default
+        """
+        if not isinstance(token, str):
+            return default
+        with self._lock:
+            if token in self._shared_tokens:
+                self.hits += 1
+                return self._shared_tokens[token]
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return default
+            session, expires_at, value = entry
+            now = self._clock()
+            if expires_at <= now:
+                self._remove(token)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._entries[token] = (session, now + self.ttl, value)
+            self._entries.move_to_end(token)
+            self._sessions[session].move_to_end(token)
+            self.hits += 1
+            return value
+
+    def discard(self, token: Optional[str]) -> None:
+        """刪除一筆 session 資料（不存在時忽略）"""
+        with self._lock:
+            if token in self._entries:
+                self._remove(token)
+
+    def clear(self) -> None:
+        """清空全部資料"""
+        with self._lock:
+            self._entries.clear()
+            self._sessions.clear()
+            self._shared.clear()
+            self._shared_tokens.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """存放統計"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'sessions': len(self._sessions),
+                'shared': len(self._shared),
+                'hits': self.hits,
+                'misses': self.misses,
+                'puts': self.puts,
+                'evictions': self.evictions,
+                'quota_evictions': self.quota_evictions,
+                'expirations': self.expirations,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
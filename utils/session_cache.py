@@ -0,0 +1,165 @@
+"""
+Session 快取模組
+以記憶體 LRU 快取 session_id -> (user_id, 到期時間)，取代每個 callback 都查詢 users.db；
+另提供在背景執行緒中定期執行清理工作的 PeriodicSweeper
+"""
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class SessionCache:
+    """
+    有容量上限的 session 快取
+
+    每筆資料保存到 session 本身到期或快取 TTL（以先到者為準）；
+    查無資料的 session_id 也會以較短的 miss_ttl 快取，避免重複查詢資料庫
+
+    Attributes:
+        maxsize: 最多保存的 session 數
+        ttl: 有效 session 在快取中的存活秒數（限制與資料庫不一致的時間；
+             多個 worker 時也是其他行程的登出生效前的最長延遲）
+        miss_ttl: 查無 / 已過期 session 的快取秒數
+        hits, misses, evictions: 統計計數
+    """
+
+    def __init__(self, maxsize: int = 4096, ttl: float = 5.0, miss_ttl: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic, now: Callable[[], datetime] = datetime.now):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self._clock = clock
+        self._now = now
+        self._lock = threading.Lock()
+        # session_id -> (user_id 或 None, session 到期時間, 快取到期時間)
+        self._entries: 'OrderedDict[str, Tuple[Optional[int], Optional[datetime], float]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def lookup(self, session_id: str) -> Tuple[bool, Optional[int]]:
+        """
+        查詢快取
+
+        Returns:
+            (是否命中, user_id)；命中但 session 已過期或不存在時 user_id 為 None
+        """
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            user_id, expires_at, cached_until = entry
+            if cached_until <= self._clock():
+                del self._entries[session_id]
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(session_id)
+            self.hits += 1
+            if user_id is not None and expires_at is not None and expires_at <= self._now():
+                return True, None
+            return True, user_id
+
+    def put(self, session_id: str, user_id: Optional[int], expires_at: Optional[datetime]) -> None:
+        """保存 session（user_id 為 None 代表查無資料）"""
+        ttl = self.ttl if user_id is not None else self.miss_ttl
+        with self._lock:
+            self._entries[session_id] = (user_id, expires_at, self._clock() + ttl)
+            self._entries.move_to_end(session_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, session_id: str) -> None:
+        """移除一筆 session（登出時呼叫）"""
+        with self._lock:
+            self._entries.pop(session_id, None)
+
+    def prune(self) -> int:
+        """移除已到期的項目，返回移除筆數"""
+        with self._lock:
+            now, clock = self._now(), self._clock()
+            expired = [
+                sid for sid, (user_id, expires_at, cached_until) in self._entries.items()
+                if cached_until <= clock or (expires_at is not None and expires_at <= now)
+            ]
+            for sid in expired:
+                del self._entries[sid]
+            return len(expired)
+
+    def clear(self) -> None:
+        """清空快取"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """快取統計"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class PeriodicSweeper:
+    """
+    背景執行緒，每隔 interval 秒執行一次 job（daemon 執行緒，不阻擋程式結束）
+
+    Attributes:
+        interval: 執行間隔（秒）
+        runs, failures: 執行與失敗次數
+    """
+
+    def __init__(self, job: Callable[[], Any], interval: float, name: str = 'sweeper'):
+        self.job = job
+        self.interval = interval
+        self.name = name
+        self.runs = 0
+        self.failures = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def run_once(self) -> None:
+        """執行一次 job（例外只記錄，不中斷背景執行緒）"""
+        try:
+            self.job()
+            self.runs += 1
+        except Exception as e:
+            self.failures += 1
+            print(f"[{self.name}] job failed: {e}")
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self) -> None:
+        """啟動背景執行緒（已在執行時忽略）"""
+        with self._lock:
+            if self.running:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """停止背景執行緒"""
+        with self._lock:
+            self._stop.set()
+            if self._thread is not None:
+                self._thread.join(timeout)
+            self._thread = None
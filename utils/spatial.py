@@ -0,0 +1,208 @@
+"""
+空間索引模組
+將餐廳、旅館、景點座標依經緯度網格分桶（每個目錄版本建立一次），
+提供 k_nearest、within_radius 與 places_in_bbox 查詢，只檢查附近網格內的點
+"""
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from utils import catalog
+from utils.geo import KM_PER_DEGREE, bbox_mask, bounding_box, distances_from
+
+# 網格大小（度），約 1.1 公里
+CELL_SIZE_DEG = 0.01
+
+# 各類資料來源
+POINT_SOURCES = {
+    'restaurant': 'restaurants',
+    'hotel': 'hotels',
+    'attraction': 'attractions',
+}
+
+
+class SpatialIndex:
+    """
+    經緯度網格索引
+
+    Attributes:
+        types: 每個點的類型（'restaurant' / 'hotel' / 'attraction'）
+        ids: 每個點在對應資料表中的 ID
+        lats, lons: 座標（度）
+    """
+
+    def __init__(self, types: Sequence[str], ids: Sequence[int], lats: Sequence[float], lons: Sequence[float],
+                 cell_size: float = CELL_SIZE_DEG):
+        self.types = np.asarray(types, dtype=object)
+        self.ids = np.asarray(ids, dtype=np.int64)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.cell_size = cell_size
+
+        buckets: Dict[Tuple[int, int], List[int]] = {}
+        for idx, cell in enumerate(zip(self._cell(self.lats), self._cell(self.lons))):
+            buckets.setdefault(cell, []).append(idx)
+        self._buckets = {cell: np.asarray(members, dtype=np.int64) for cell, members in buckets.items()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _cell(self, values):
+        return np.floor(np.asarray(values) / self.cell_size).astype(np.int64).tolist()
+
+    def _candidates(self, lat: float, lon: float, km: float) -> np.ndarray:
+        """半徑 km 的外接矩形所涵蓋網格中的點"""
+        return self._cells_in_bbox(*bounding_box(lat, lon, km))
+
+    def _cells_in_bbox(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float) -> np.ndarray:
+        """矩形範圍所涵蓋網格中的點"""
+        i0, i1 = math.floor(min_lat / self.cell_size), math.floor(max_lat / self.cell_size)
+        j0, j1 = math.floor(min_lon / self.cell_size), math.floor(max_lon / self.cell_size)
+
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(self._buckets):
+            # 範圍大於整個資料集時直接掃描全部
+            return np.arange(len(self.ids))
+
+        parts = [self._buckets[(i, j)] for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)
+                 if (i, j) in self._buckets]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def _mask(self, idx: np.ndarray, types: Optional[Iterable[str]],
+              exclude: Optional[Iterable[Tuple[str, int]]]) -> np.ndarray:
+        keep = np.ones(len(idx), dtype=bool)
+        if types:
+            keep &= np.isin(self.types[idx], list(types))
+        for item_type, item_id in (exclude or []):
+            keep &= ~((self.types[idx] == item_type) & (self.ids[idx] == int(item_id)))
+        return idx[keep]
+
+    def _results(self, idx: np.ndarray, dist: np.ndarray) -> List[Dict[str, Any]]:
+        return [
+            {'type': self.types[i], 'id': int(self.ids[i]), 'lat': float(self.lats[i]),
+             'lon': float(self.lons[i]), 'distance': float(d)}
+            for i, d in zip(idx, dist)
+        ]
+
+    def in_bbox(self, min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+                types: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+        """
+        查詢矩形範圍（地圖可視範圍）內的所有點
+
+        Args:
+            min_lat, max_lat, min_lon, max_lon: 範圍（度）
+            types: 限定類型，None 代表全部
+
+        Returns:
+            List[Dict]: {'type', 'id', 'lat', 'lon'}
+        """
+        bbox = (min_lat, max_lat, min_lon, max_lon)
+        idx = self._cells_in_bbox(*bbox)
+        idx = self._mask(idx[bbox_mask(self.lats[idx], self.lons[idx], bbox)], types, None)
+        return [
+            {'type': self.types[i], 'id': int(self.ids[i]), 'lat': float(self.lats[i]), 'lon': float(self.lons[i])}
+            for i in np.sort(idx)
+        ]
+
+    def within_radius(self, lat: float, lon: float, km: float, types: Optional[Iterable[str]] = None,
+                      exclude: Optional[Iterable[Tuple[str, int]]] = None) -> List[Dict[str, Any]]:
+        """
+        查詢半徑內的所有點（依距離排序）
+
+        Args:
+            lat, lon: 中心座標
+            km: 半徑（公里）
+            types: 限定類型，None 代表全部
+            exclude: 要排除的 (type, id)
+
+        Returns:
+            List[Dict]: {'type', 'id', 'lat', 'lon', 'distance'}
+        """
+        idx = self._mask(self._candidates(lat, lon, km), types, exclude)
+        dist = distances_from(lat, lon, self.lats[idx], self.lons[idx])
+        inside = dist <= km
+        idx, dist = idx[inside], dist[inside]
+        order = np.argsort(dist, kind='stable')
+        return self._results(idx[order], dist[order])
+
+    def k_nearest(self, lat: float, lon: float, k: int, types: Optional[Iterable[str]] = None,
+                  exclude: Optional[Iterable[Tuple[str, int]]] = None) -> List[Dict[str, Any]]:
+        """
+        查詢最近的 k 個點（逐步擴大搜尋半徑）
+
+        Args:
+            lat, lon: 中心座標
+            k: 返回數量
+            types: 限定類型，None 代表全部
+            exclude: 要排除的 (type, id)
+
+        Returns:
+            List[Dict]: {'type', 'id', 'lat', 'lon', 'distance'}，依距離排序
+        """
+        if k <= 0 or len(self.ids) == 0:
+            return []
+
+        km = self.cell_size * KM_PER_DEGREE
+        while True:
+            idx = self._candidates(lat, lon, km)
+            scanned_all = len(idx) == len(self.ids)
+            idx = self._mask(idx, types, exclude)
+            dist = distances_from(lat, lon, self.lats[idx], self.lons[idx])
+            # 半徑內的點已完整涵蓋；若數量足夠，最近的 k 個必在其中
+            if scanned_all or np.count_nonzero(dist <= km) >= k:
+                order = np.argsort(dist, kind='stable')[:k]
+                return self._results(idx[order], dist[order])
+            km *= 2
+
+
+def build_spatial_index() -> SpatialIndex:
+    """由目錄資料建立空間索引（略過沒有座標的資料）"""
+    types, ids, lats, lons = [], [], [], []
+    for item_type, table_name in POINT_SOURCES.items():
+        table = catalog.get_table(table_name)
+        df = table.df
+        if df.empty:
+            continue
+        df = df[df['Lat'].notna() & df['Long'].notna()]
+        types.extend([item_type] * len(df))
+        ids.extend(df[table.id_column].astype(int).tolist())
+        lats.extend(df['Lat'].astype(float).tolist())
+        lons.extend(df['Long'].astype(float).tolist())
+    return SpatialIndex(types, ids, lats, lons)
+
+
+_lock = threading.Lock()
+_index: Optional[SpatialIndex] = None
+_index_version: Optional[int] = None
+
+
+def get_spatial_index() -> SpatialIndex:
+    """取得目前目錄版本的空間索引（目錄變更後自動重建）"""
+    global _index, _index_version
+    version = catalog.catalog_version()
+    if _index is not None and _index_version == version:
+        return _index
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = build_spatial_index()
+            _index_version = version
+    return _index
+
+
+def k_nearest(lat: float, lon: float, k: int, types: Optional[Iterable[str]] = None,
+              exclude: Optional[Iterable[Tuple[str, int]]] = None) -> List[Dict[str, Any]]:
+    """最近的 k 個地點（見 SpatialIndex.k_nearest）"""
+    return get_spatial_index().k_nearest(lat, lon, k, types=types, exclude=exclude)
+
+
+def within_radius(lat: float, lon: float, km: float, types: Optional[Iterable[str]] = None,
+                  exclude: Optional[Iterable[Tuple[str, int]]] = None) -> List[Dict[str, Any]]:
+    """半徑內的地點（見 SpatialIndex.within_radius）"""
+    return get_spatial_index().within_radius(lat, lon, km, types=types, exclude=exclude)
+
+
+def places_in_bbox(min_lat: float, max_lat: float, min_lon: float, max_lon: float,
+                   types: Optional[Iterable[str]] = None) -> List[Dict[str, Any]]:
+    """矩形範圍內的地點（見 SpatialIndex.in_bbox）"""
+    return get_spatial_index().in_bbox(min_lat, max_lat, min_lon, max_lon, types=types)
@@ -0,0 +1,203 @@
+"""
+搜尋建議（自動完成）模組
+以記憶體中的二字元（bigram）倒排索引，對餐廳、旅館、景點的英文與日文名稱
+做前綴 / 中間字串比對，依評分加權分數返回前 k 筆，不需查詢 SQLite
+"""
+import math
+import threading
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence
+
+from utils import catalog
+
+# 各類資料的名稱、評分、評論數欄位與圖示
+ENTITY_FIELDS = {
+    'restaurant': {
+        'table': 'restaurants', 'name': 'Name', 'alt_name': 'JapaneseName',
+        'rating': 'TotalRating', 'reviews': 'ReviewNum', 'icon': 'fa-utensils',
+    },
+    'hotel': {
+        'table': 'hotels', 'name': 'HotelName', 'alt_name': None,
+        'rating': 'Rating', 'reviews': 'UserRatingsTotal', 'icon': 'fa-hotel',
+    },
+    'attraction': {
+        'table': 'attractions', 'name': 'Name', 'alt_name': None,
+        'rating': 'Rating', 'reviews': 'UserRatingsTotal', 'icon': 'fa-landmark',
+    },
+}
+
+# 比對類型（數字越小排序越前面）
+MATCH_PREFIX = 0        # 名稱開頭
+MATCH_WORD_PREFIX = 1   # 名稱中某個單字的開頭
+MATCH_INFIX = 2         # 名稱中間
+
+
+def normalize(text: Any) -> str:
+    """正規化名稱：NFKC（全形轉半形）、去除前後空白、不分大小寫"""
+    if text is None or (isinstance(text, float) and math.isnan(text)):
+        return ''
+    return unicodedata.normalize('NFKC', str(text)).strip().casefold()
+
+
+def _bigrams(text: str) -> set:
+    return {text[i:i + 2] for i in range(len(text) - 1)}
+
+
+def _score(rating: Any, reviews: Any) -> float:
+    """評分加權分數：評分 × log(1 + 評論數)"""
+    try:
+        rating = float(rating)
+        reviews = float(reviews)
+    except (TypeError, ValueError):
+        return 0.0
+    if math.isnan(rating) or math.isnan(reviews):
+        return 0.0
+    return rating * math.log1p(max(reviews, 0.0))
+
+
+class SuggestionIndex:
+    """
+    名稱自動完成索引
+
+    每筆資料保存正規化後的英文 / 日文名稱，bigram → 資料編號 的倒排表
+    讓每次查詢只需檢查少量候選
+    """
+
+    def __init__(self, entries: List[Dict[str, Any]]):
+        # 依分數由高到低排序，編號越小分數越高
+        self.entries = sorted(entries, key=lambda e: -e['score'])
+        self._postings: Dict[str, set] = {}
+        self._chars: Dict[str, set] = {}
+        for idx, entry in enumerate(self.entries):
+            for key in entry['keys']:
+                for gram in _bigrams(key):
+                    self._postings.setdefault(gram, set()).add(idx)
+                for ch in set(key):
+                    self._chars.setdefault(ch, set()).add(idx)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _candidates(self, query: str) -> set:
+        if len(query) == 1:
+            return self._chars.get(query, set())
+        grams = sorted(_bigrams(query), key=lambda g: len(self._postings.get(g, ())))
+        if not grams or grams[0] not in self._postings:
+            return set()
+        result = set(self._postings[grams[0]])
+        for gram in grams[1:]:
+            result &= self._postings.get(gram, set())
+            if not result:
+                break
+        return result
+
+    @staticmethod
+    def _match_type(query: str, keys: Sequence[str]) -> Optional[int]:
+        best = None
+        for key in keys:
+            pos = key.find(query)
+            if pos < 0:
+                continue
+            if pos == 0:
+                return MATCH_PREFIX
+            kind = MATCH_WORD_PREFIX if not key[pos - 1].isalnum() else MATCH_INFIX
+            best = kind if best is None else min(best, kind)
+        return best
+
+    def search(self, keyword: str, k: int = 8, types: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """
+        查詢名稱符合關鍵字的前 k 筆資料
+
+        Args:
+            keyword: 使用者輸入
+            k: 返回數量
+            types: 限定類型（'restaurant' / 'hotel' / 'attraction'），None 代表全部
+
+        Returns:
+            List[Dict]: 依 (比對類型, 分數) 排序的資料
+        """
+        query = normalize(keyword)
+        if not query:
+            return []
+
+        matches = []
+        for idx in self._candidates(query):
+            entry = self.entries[idx]
+            if types and entry['type'] not in types:
+                continue
+            kind = self._match_type(query, entry['keys'])
+            if kind is not None:
+                matches.append((kind, idx))
+
+        matches.sort()
+        return [self.entries[idx] for _, idx in matches[:k]]
+
+
+def build_suggestion_index() -> SuggestionIndex:
+    """由目錄資料建立自動完成索引"""
+    entries = []
+    for item_type, fields in ENTITY_FIELDS.items():
+        table = catalog.get_table(fields['table'])
+        if len(table) == 0:
+            continue
+        for row in table.df.to_dict('records'):
+            name = row.get(fields['name'])
+            alt_name = row.get(fields['alt_name']) if fields['alt_name'] else None
+            keys = [key for key in (normalize(name), normalize(alt_name)) if key]
+            if not keys:
+                continue
+            entries.append({
+                'type': item_type,
+                'id': row.get(table.id_column),
+                'name': name,
+                'alt_name': alt_name if isinstance(alt_name, str) and alt_name.strip() else None,
+                'icon': fields['icon'],
+                'score': _score(row.get(fields['rating']), row.get(fields['reviews'])),
+                'keys': keys,
+            })
+    return SuggestionIndex(entries)
+
+
+_lock = threading.Lock()
+_index: Optional[SuggestionIndex] = None
+_index_version: Optional[int] = None
+
+
+def get_suggestion_index() -> SuggestionIndex:
+    """取得目前目錄版本的自動完成索引（目錄變更後自動重建）"""
+    global _index, _index_version
+    version = catalog.catalog_version()
+    if _index is not None and _index_version == version:
+        return _index
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = build_suggestion_index()
+            _index_version = version
+    return _index
+
+
+def suggest(keyword: str, k: int = 8, types: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+    """
+    搜尋建議
+
+    Args:
+        keyword: 使用者輸入
+        k: 返回數量
+        types: 限定類型，None 代表全部
+
+    Returns:
+        List[Dict]: {'type', 'id', 'value', 'label', 'icon'}
+    """
+    suggestions = []
+    for entry in get_suggestion_index().search(keyword, k=k, types=types):
+        label = entry['name']
+        if entry['alt_name']:
+            label = f"{entry['name']} ({entry['alt_name']})"
+        suggestions.append({
+            'type': entry['type'],
+            'id': entry['id'],
+            'value': entry['name'],
+            'label': label,
+            'icon': entry['icon'],
+        })
+    return suggestions
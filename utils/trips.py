@@ -7,18 +7,17 @@ from datetime import datetime
 from typing import Optional, List, Dict, Any, Tuple
 from contextlib import contextmanager
 
+from utils.db_pool import pooled_connection
+from utils.write_behind import write_and_wait
+
 # Database path (same as auth.py and favorites.py)
 DB_PATH = './data/users.db'
 
 @contextmanager
 def get_trips_db_connection():
-    """Database connection context manager for trip operations"""
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
+    """Pooled database connection context manager for trip operations"""
+    with pooled_connection(DB_PATH) as conn:
         yield conn
-    finally:
-        conn.close()
 
 
 def create_trip(
@@ -133,26 +132,15 @@ def add_item_to_trip(
         (success: bool, message: str)
     """
     try:
-        with get_trips_db_connection() as conn:
-            cursor = conn.cursor()
-
-            # Get current max order for this day
-            cursor.execute('''
-                SELECT COALESCE(MAX(order_in_day), 0) as max_order
-                FROM trip_items
-                WHERE trip_id = ? AND day_number = ?
-            ''', (trip_id, day_number))
-
-            max_order = cursor.fetchone()['max_order']
-            new_order = max_order + 1
-
-            cursor.execute('''
-                INSERT INTO trip_items (trip_id, item_type, item_id, item_name, day_number, order_in_day, notes, time, cost)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (trip_id, item_type, item_id, item_name, day_number, new_order, notes, time, cost))
-
-            conn.commit()
-            return True, f"{item_name} added to Day {day_number}"
+        # Next order for this day is computed inside the INSERT, so the
+        # statement stays atomic when batched by the users.db writer thread
+        write_and_wait(DB_PATH, '''
+            INSERT INTO trip_items (trip_id, item_type, item_id, item_name, day_number, order_in_day, notes, time, cost)
+            SELECT ?, ?, ?, ?, ?, COALESCE(MAX(order_in_day), 0) + 1, ?, ?, ?
+            FROM trip_items
+            WHERE trip_id = ? AND day_number = ?
+        ''', (trip_id, item_type, item_id, item_name, day_number, notes, time, cost, trip_id, day_number))
+        return True, f"{item_name} added to Day {day_number}"
 
     except Exception as e:
         return False, f"Failed to add item: {str(e)}"
@@ -0,0 +1,222 @@
+"""
+延後寫入佇列模組
+每個資料庫一個寫入執行緒，將佇列中的寫入以批次交易提交（group commit），
+同一個 key 尚未寫入的更新會合併為一次（只用於後寫者為準的寫入）；
+呼叫端取得 Future 作為提交完成的確認，需要等待提交的寫入不會等待 linger
+"""
+import atexit
+import itertools
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from utils.db_pool import pooled_connection
+
+# 預設等待寫入確認的秒數
+WRITE_TIMEOUT = 10.0
+
+
+class WriteBehindQueue:
+    """
+    單一寫入執行緒的批次寫入佇列
+
+    每批寫入在一個 BEGIN IMMEDIATE 交易中執行，每個語句各自包在 SAVEPOINT 內，
+    單一語句失敗只會讓該語句的 Future 收到例外；COMMIT 完成後才設定結果
+
+    Attributes:
+        db_path: 資料庫路徑
+        batch_size: 每批最多的語句數
+        linger: 取得第一筆寫入後等待更多寫入的秒數
+        submitted, coalesced, committed, failed, batches: 統計計數
+    """
+
+    def __init__(self, db_path: str, batch_size: int = 256, linger: float = 0.002):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.linger = linger
+        self._cond = threading.Condition()
+        # key -> (sql, params, future)；sql 為 None 代表 flush 的界線
+        self._pending: 'OrderedDict[Hashable, Tuple[Optional[str], Sequence[Any], Future]]' = OrderedDict()
+        self._seq = itertools.count()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        # 佇列中有呼叫端正在等待的寫入時，寫入執行緒不等待 linger
+        self._urgent = False
+        self.submitted = 0
+        self.coalesced = 0
+        self.committed = 0
+        self.failed = 0
+        self.batches = 0
+
+    def submit(self, sql: Optional[str], params: Sequence[Any] = (), key: Optional[Hashable] = None,
+               urgent: bool = False) -> Future:
+        """
+        加入一筆寫入
+
+        Args:
+            sql: 寫入語句
+            params: 參數
+            key: 合併鍵；佇列中已有同 key 且尚未寫入的項目時丟棄舊的語句，改用新的語句與參數，
+                 移到佇列尾端（維持與其他寫入的提交順序），並返回同一個 Future。
+                 只適用於新寫入完全取代舊寫入的情況（例如同一使用者的 last_login）
+            urgent: 呼叫端會立即等待結果；寫入執行緒不等待 linger 直接提交
+
+        Returns:
+            Future: 提交後 result() 為 cursor.rowcount，失敗時 result() 拋出例外
+        """
+        with self._cond:
+            if self._stopping:
+                raise RuntimeError(f"write queue for {self.db_path} is stopped")
+            self.submitted += 1
+            if urgent:
+                self._urgent = True
+            if key is not None and key in self._pending:
+                _, _, future = self._pending[key]
+                self._pending[key] = (sql, params, future)
+                self._pending.move_to_end(key)
+                self.coalesced += 1
+                if urgent:
+                    self._cond.notify()
+                return future
+            future = Future()
+            self._pending[key if key is not None else ('seq', next(self._seq))] = (sql, params, future)
+            self._ensure_thread()
+            self._cond.notify()
+            return future
+
+    def flush(self, timeout: Optional[float] = WRITE_TIMEOUT) -> None:
+        """等待目前佇列中的寫入全部提交"""
+        self.submit(None, urgent=True).result(timeout)
+
+    def pending(self) -> int:
+        with self._cond:
+            return len(self._pending)
+
+    def _ensure_thread(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._run, name=f'write-behind:{os.path.basename(self.db_path)}', daemon=True
+            )
+            self._thread.start()
+
+    def _take_batch(self) -> Optional[List[Tuple[Optional[str], Sequence[Any], Future]]]:
+        with self._cond:
+            while not self._pending and not self._stopping:
+                self._cond.wait()
+            if not self._pending:
+                return None
+            if len(self._pending) < self.batch_size and self.linger > 0 and not self._stopping and not self._urgent:
+                # submit(urgent=True) 會 notify，提早結束等待
+                self._cond.wait(self.linger)
+            batch = []
+            while self._pending and len(batch) < self.batch_size:
+                batch.append(self._pending.popitem(last=False)[1])
+            self._urgent = self._urgent and bool(self._pending)
+            return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            self._write(batch)
+
+    def _write(self, batch: List[Tuple[Optional[str], Sequence[Any], Future]]) -> None:
+        results: List[Tuple[Future, Any, Optional[BaseException]]] = []
+        try:
+            with pooled_connection(self.db_path) as conn:
+                conn.execute('BEGIN IMMEDIATE')
+                for sql, params, future in batch:
+                    if sql is None:
+                        results.append((future, None, None))
+                        continue
+                    conn.execute('SAVEPOINT write_behind')
+                    try:
+                        rowcount = conn.execute(sql, params).rowcount
+                        conn.execute('RELEASE write_behind')
+                        results.append((future, rowcount, None))
+                    except sqlite3.Error as e:
+                        conn.execute('ROLLBACK TO write_behind')
+                        conn.execute('RELEASE write_behind')
+                        results.append((future, None, e))
+                conn.commit()
+        except Exception as e:
+            # 整批交易失敗（例如資料庫鎖定逾時）：所有寫入都回報失敗
+            self.failed += len(batch)
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        for future, result, error in results:
+            if error is not None:
+                self.failed += 1
+                future.set_exception(error)
+            else:
+                self.committed += 1
+                future.set_result(result)
+
+    def stop(self, timeout: Optional[float] = WRITE_TIMEOUT) -> None:
+        """寫完佇列中的項目後停止寫入執行緒"""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """佇列統計"""
+        with self._cond:
+            return {
+                'db_path': self.db_path,
+                'pending': len(self._pending),
+                'submitted': self.submitted,
+                'coalesced': self.coalesced,
+                'committed': self.committed,
+                'failed': self.failed,
+                'batches': self.batches,
+            }
+
+
+_queues_lock = threading.Lock()
+_queues: Dict[str, WriteBehindQueue] = {}
+
+
+def get_write_queue(db_path: str) -> WriteBehindQueue:
+    """取得資料庫的寫入佇列（每個資料庫檔案一個）"""
+    key = os.path.abspath(db_path)
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = _queues[key] = WriteBehindQueue(db_path)
+        return queue
+
+
+def enqueue_write(db_path: str, sql: str, params: Sequence[Any] = (), key: Optional[Hashable] = None) -> Future:
+    """加入延後寫入（不等待提交；需要確認時對返回的 Future 呼叫 result()）"""
+    return get_write_queue(db_path).submit(sql, params, key=key)
+
+
+def write_and_wait(db_path: str, sql: str, params: Sequence[Any] = (), timeout: Optional[float] = WRITE_TIMEOUT) -> Any:
+    """加入寫入並等待提交，返回 rowcount（失敗時拋出原本的例外；不等待 linger）"""
+    return get_write_queue(db_path).submit(sql, params, urgent=True).result(timeout)
+
+
+def write_queue_stats() -> List[Dict[str, Any]]:
+    """所有寫入佇列的統計"""
+    with _queues_lock:
+        queues = list(_queues.values())
+    return [queue.stats() for queue in queues]
+
+
+@atexit.register
+def _drain_queues() -> None:
+    # 程式結束前寫完佇列中的項目
+    with _queues_lock:
+        queues = list(_queues.values())
+    for queue in queues:
+        queue.stop()